@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Local JSON API
+Version: 1.0
+Developer Engine data service for the Analyst Engine (Project 1)
+
+Endpoints (GET unless noted, JSON responses):
+- /health                      Service status and cache stats
+- /v1/reading?datetime=&palace=&method=&chart_type=
+- /v1/palaces?datetime=&method=&chart_type=
+- /v1/bazi?date=YYYY-MM-DD&hour=
+- /v1/scan?start=&end=&palaces=1,2&method=&step_hours=
+- /v1/find?palace=6&door=Open&star=Heart&start=&end=
+- /metrics                     Stage timing histograms (Prometheus text)
+
+POST /v1/fanout takes a JSON body {"datetime", "method", "chart_type",
+"profiles": [...]} and scores every BaZi profile against one chart.
+POST /v1/validate takes {"documents": [...]} and checks each against
+Universal Schema v2.0.
+
+Add raw=0 to /v1/reading to return a chart_ref instead of the raw chart.
+Add timings=1 to /v1/reading to include per-stage milliseconds in the
+response metadata. Start with --timings to record process-wide histograms.
+
+Runs on the Python standard library only:
+    python api_server.py --port 8765 --workers 8
+
+HTTP/1.1 keep-alive, gzip responses (when accepted), one shared cached
+engine and a bounded worker pool.
+"""
+
+import argparse
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Callable
+from urllib.parse import urlparse, parse_qs
+
+from core.qmdj_engine import (
+    SGT,
+    generate_qmdj_reading,
+    generate_all_palace_readings,
+    summarize_palace_readings,
+    get_shared_engine
+)
+from core.qmdj_plates import CHART_TYPES
+from core.audit_log import audit_reading, get_audit_log
+from core.bazi_engine import get_bazi_profile
+from core.bulk_export import reading_to_row
+from core.formation_query import COMPONENTS, normalize_condition, find_occurrences
+from core.metrics import enable_timings, render_prometheus
+from core.profile_fanout import score_profiles
+from core.schema import validate_documents
+
+API_VERSION = "1.0"
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 512
+
+# Upper bound on points returned by one range scan
+MAX_SCAN_POINTS = 5000
+
+# Longest window (days) searched by one formation query
+MAX_FIND_DAYS = 366 * 5
+
+# Most profiles scored by one fan-out request
+MAX_FANOUT_PROFILES = 10000
+
+# Most documents checked by one validation request
+MAX_VALIDATE_DOCUMENTS = 50000
+
+# Largest accepted POST body (bytes)
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+# Seconds an idle keep-alive connection may hold a worker
+IDLE_TIMEOUT = 3
+
+# Seconds a client may take to send the rest of a started request
+REQUEST_TIMEOUT = 30
+
+# Seconds a new connection waits for a free worker before getting a 503
+ACCEPT_WAIT_SECONDS = 0.5
+
+
+class APIError(Exception):
+    """Client error returned as a JSON 4xx response"""
+    
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================================================
+# PARAMETER PARSING
+# ============================================================================
+
+def _param(params: Dict[str, List[str]], name: str, default: Optional[str] = None) -> str:
+    values = params.get(name)
+    if values:
+        return values[0]
+    if default is None:
+        raise APIError(f"Missing parameter: {name}")
+    return default
+
+
+def _parse_datetime(value: str) -> datetime:
+    """
+    Parse ISO datetime into Singapore time. Naive values are taken as
+    Singapore time; aware ones (Z, +00:00, ...) are converted, since the
+    engine charts the wall-clock hour and day.
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise APIError(f"Invalid datetime: {value}")
+    return dt.astimezone(SGT) if dt.tzinfo else dt.replace(tzinfo=SGT)
+
+
+def _parse_chart_type(params: Dict[str, List[str]]) -> str:
+    chart_type = _param(params, "chart_type", "hour")
+    if chart_type not in CHART_TYPES:
+        raise APIError(f"chart_type must be one of {', '.join(CHART_TYPES)}")
+    return chart_type
+
+
+def _parse_int(value: str, name: str, low: int, high: int) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise APIError(f"Invalid {name}: {value}")
+    if not low <= number <= high:
+        raise APIError(f"{name} must be between {low} and {high}")
+    return number
+
+
+# ============================================================================
+# ENDPOINT HANDLERS
+# ============================================================================
+
+@lru_cache(maxsize=4096)
+def _cached_bazi_profile(year: int, month: int, day: int, hour: int) -> Dict:
+    return get_bazi_profile(year, month, day, hour)
+
+
+def handle_health(params: Dict[str, List[str]]) -> Dict:
+    engine = get_shared_engine()
+    return {
+        "status": "ok",
+        "api_version": API_VERSION,
+        "kinqimen_available": engine.kinqimen_available,
+        "chart_cache": engine.cache.stats() if engine.cache else None,
+        "kinqimen_breaker": engine.breaker.stats(),
+        "chart_inflight": engine.inflight.stats(),
+        "bazi_cache": _cached_bazi_profile.cache_info()._asdict(),
+        "disk_cache": engine.disk_cache.stats() if engine.disk_cache else None,
+        "audit_log": get_audit_log().stats() if get_audit_log() else None
+    }
+
+
+def handle_reading(params: Dict[str, List[str]]) -> Dict:
+    date = _parse_datetime(_param(params, "datetime", datetime.now(SGT).isoformat()))
+    palace = _parse_int(_param(params, "palace", "5"), "palace", 1, 9)
+    method = _parse_int(_param(params, "method", "1"), "method", 1, 2)
+    include_timings = _param(params, "timings", "0") == "1"
+    include_raw_chart = _param(params, "raw", "1") == "1"
+    reading = generate_qmdj_reading(date, palace=palace, method=method,
+                                    include_timings=include_timings,
+                                    include_raw_chart=include_raw_chart,
+                                    chart_type=_parse_chart_type(params))
+    audit_reading(reading, "api:reading")
+    return reading
+
+
+def handle_palaces(params: Dict[str, List[str]]) -> Dict:
+    date = _parse_datetime(_param(params, "datetime", datetime.now(SGT).isoformat()))
+    method = _parse_int(_param(params, "method", "1"), "method", 1, 2)
+    chart_type = _parse_chart_type(params)
+    readings = generate_all_palace_readings(date, method, include_raw_chart=False,
+                                            chart_type=chart_type)
+    for reading in readings.values():
+        audit_reading(reading, "api:palaces")
+    return {
+        "datetime": date.isoformat(),
+        "method": method,
+        "chart_type": chart_type,
+        "metadata": readings[5]["metadata"],
+        "palaces": summarize_palace_readings(readings)
+    }
+
+
+def handle_bazi(params: Dict[str, List[str]]) -> Dict:
+    try:
+        birth = datetime.strptime(_param(params, "date"), "%Y-%m-%d")
+    except ValueError:
+        raise APIError("date must be YYYY-MM-DD")
+    hour = _parse_int(_param(params, "hour", "12"), "hour", 0, 23)
+    return _cached_bazi_profile(birth.year, birth.month, birth.day, hour)
+
+
+def handle_scan(params: Dict[str, List[str]]) -> Dict:
+    start = _parse_datetime(_param(params, "start"))
+    end = _parse_datetime(_param(params, "end"))
+    method = _parse_int(_param(params, "method", "1"), "method", 1, 2)
+    step_hours = _parse_int(_param(params, "step_hours", "2"), "step_hours", 1, 24 * 30)
+    palaces = [
+        _parse_int(p, "palace", 1, 9)
+        for p in _param(params, "palaces", "1,2,3,4,5,6,7,8,9").split(",") if p
+    ]
+    
+    if end < start:
+        raise APIError("end must not be before start")
+    steps = int((end - start) / timedelta(hours=step_hours)) + 1
+    if steps * len(palaces) > MAX_SCAN_POINTS:
+        raise APIError(f"Scan too large: {steps * len(palaces)} points (max {MAX_SCAN_POINTS})")
+    
+    results = []
+    step = timedelta(hours=step_hours)
+    current = start
+    while current <= end:
+        readings = generate_all_palace_readings(current, method, include_raw_chart=False)
+        for palace_num in palaces:
+            results.append(reading_to_row(readings[palace_num]))
+            audit_reading(readings[palace_num], "api:scan")
+        current += step
+    
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "method": method,
+        "count": len(results),
+        "results": results
+    }
+
+
+def handle_find(params: Dict[str, List[str]]) -> Dict:
+    start = _parse_datetime(_param(params, "start", datetime.now(SGT).isoformat()))
+    end = _parse_datetime(_param(params, "end", (start + timedelta(days=182)).isoformat()))
+    if end < start:
+        raise APIError("end must not be before start")
+    if (end - start).days > MAX_FIND_DAYS:
+        raise APIError(f"Window too large (max {MAX_FIND_DAYS} days)")
+    
+    palace = _param(params, "palace")
+    try:
+        conditions = [
+            normalize_condition(palace, component, params[component][0])
+            for component in COMPONENTS if component in params
+        ]
+    except ValueError as e:
+        raise APIError(str(e))
+    if not conditions:
+        raise APIError(f"Give at least one of: {', '.join(COMPONENTS)}")
+    
+    results = find_occurrences(conditions, start, end)
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "conditions": [c._asdict() for c in conditions],
+        "count": len(results),
+        "results": results
+    }
+
+
+def handle_fanout(body: Dict) -> Dict:
+    profiles = body.get("profiles")
+    if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+        raise APIError("profiles must be a list of objects")
+    if len(profiles) > MAX_FANOUT_PROFILES:
+        raise APIError(f"Too many profiles: {len(profiles)} (max {MAX_FANOUT_PROFILES})")
+    
+    params = {
+        key: [str(body[key])] for key in ("datetime", "method", "chart_type") if key in body
+    }
+    date = _parse_datetime(_param(params, "datetime", datetime.now(SGT).isoformat()))
+    method = _parse_int(_param(params, "method", "1"), "method", 1, 2)
+    chart_type = _parse_chart_type(params)
+    include_palace_scores = bool(body.get("palace_scores", False))
+    
+    results = score_profiles(date, profiles, method, chart_type,
+                             include_palace_scores=include_palace_scores)
+    return {
+        "datetime": date.isoformat(),
+        "method": method,
+        "chart_type": chart_type,
+        "count": len(results),
+        "results": results
+    }
+
+
+def handle_validate(body: Dict) -> Dict:
+    documents = body.get("documents")
+    if not isinstance(documents, list):
+        raise APIError("documents must be a list")
+    if len(documents) > MAX_VALIDATE_DOCUMENTS:
+        raise APIError(f"Too many documents: {len(documents)} (max {MAX_VALIDATE_DOCUMENTS})")
+    return validate_documents(documents).as_dict()
+
+
+ROUTES: Dict[str, Callable[[Dict[str, List[str]]], Dict]] = {
+    "/health": handle_health,
+    "/v1/reading": handle_reading,
+    "/v1/palaces": handle_palaces,
+    "/v1/bazi": handle_bazi,
+    "/v1/scan": handle_scan,
+    "/v1/find": handle_find
+}
+
+POST_ROUTES: Dict[str, Callable[[Dict], Dict]] = {
+    "/v1/fanout": handle_fanout,
+    "/v1/validate": handle_validate
+}
+
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """JSON request handler with keep-alive and gzip support"""
+    
+    protocol_version = "HTTP/1.1"
+    server_version = f"MingQimenAPI/{API_VERSION}"
+    timeout = REQUEST_TIMEOUT
+    
+    def handle_one_request(self):
+        # Short wait for the next request line; a started request gets longer
+        self.connection.settimeout(IDLE_TIMEOUT)
+        super().handle_one_request()
+    
+    def parse_request(self) -> bool:
+        self.connection.settimeout(REQUEST_TIMEOUT)
+        return super().parse_request()
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") == "/metrics":
+            self._send_body(render_prometheus().encode("utf-8"), 200,
+                            "text/plain; version=0.0.4; charset=utf-8")
+            return
+        
+        handler = ROUTES.get(url.path.rstrip("/") or "/")
+        
+        if handler is None:
+            self._send_json({"error": f"Not found: {url.path}"}, 404)
+            return
+        
+        try:
+            payload = handler(parse_qs(url.query))
+            self._send_json(payload, 200)
+        except APIError as e:
+            self._send_json({"error": str(e)}, e.status)
+        except Exception as e:
+            self._send_json({"error": f"Internal error: {e}"}, 500)
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        handler = POST_ROUTES.get(url.path.rstrip("/"))
+        
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json({"error": "Invalid Content-Length"}, 400)
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json({"error": f"Body too large (max {MAX_BODY_BYTES} bytes)"}, 413)
+            return
+        raw_body = self.rfile.read(length) if length else b""
+        
+        if handler is None:
+            self._send_json({"error": f"Not found: {url.path}"}, 404)
+            return
+        
+        try:
+            try:
+                body = json.loads(raw_body or b"{}")
+            except ValueError:
+                raise APIError("Body must be JSON")
+            if not isinstance(body, dict):
+                raise APIError("Body must be a JSON object")
+            self._send_json(handler(body), 200)
+        except APIError as e:
+            self._send_json({"error": str(e)}, e.status)
+        except Exception as e:
+            self._send_json({"error": f"Internal error: {e}"}, 500)
+    
+    def _send_json(self, payload: Dict, status: int) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self._send_body(body, status, "application/json; charset=utf-8")
+    
+    def _send_body(self, body: bytes, status: int, content_type: str) -> None:
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        if accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            encoding = "gzip"
+        else:
+            encoding = None
+        
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if self.server.saturated():
+            # Every worker is taken: free this one for waiting clients
+            self.close_connection = True
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server that handles connections on a bounded thread pool.
+    When every worker is busy, a new connection waits up to
+    ACCEPT_WAIT_SECONDS for a free slot and is then answered with 503.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, address, handler_class, workers: int = 8, verbose: bool = False):
+        super().__init__(address, handler_class)
+        self.verbose = verbose
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self._slots = threading.BoundedSemaphore(workers)
+        self._workers = workers
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+    
+    def saturated(self) -> bool:
+        """True when every worker holds a connection"""
+        return self._busy >= self._workers
+    
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(timeout=ACCEPT_WAIT_SECONDS):
+            self._reject(request)
+            return
+        with self._busy_lock:
+            self._busy += 1
+        try:
+            self._pool.submit(self._process_in_worker, request, client_address)
+        except Exception:
+            self._release_slot()
+            self.shutdown_request(request)
+    
+    def _reject(self, request) -> None:
+        """Answer 503 on the accept thread without reading the request"""
+        body = json.dumps({"error": "Server busy, retry shortly"}).encode("utf-8")
+        try:
+            request.settimeout(1.0)
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Type: application/json; charset=utf-8\r\n"
+                b"Retry-After: 1\r\n"
+                b"Connection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
+                + body
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def _release_slot(self) -> None:
+        with self._busy_lock:
+            self._busy -= 1
+        self._slots.release()
+    
+    def _process_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._release_slot()
+    
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8765,
+               workers: int = 8, verbose: bool = False) -> None:
+    """Start the API server and serve until interrupted"""
+    get_shared_engine()  # Warm the shared engine before accepting requests
+    server = PooledHTTPServer((host, port), APIRequestHandler, workers=workers, verbose=verbose)
+    print(f"Ming Qimen API v{API_VERSION} listening on http://{host}:{port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ming Qimen local JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--timings", action="store_true",
+                        help="Record per-stage timing histograms (served at /metrics)")
+    args = parser.parse_args()
+    
+    if args.timings:
+        enable_timings()
+    run_server(args.host, args.port, args.workers, args.verbose)
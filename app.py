@@ -12,6 +12,8 @@ Features:
 import streamlit as st
 from datetime import datetime
 
+from core.snapshot_service import get_snapshot_service, SGT
+
 # ============================================================
 # PAGE CONFIG
 # ============================================================
@@ -185,19 +187,45 @@ with st.sidebar:
 st.markdown('<h1 class="main-title">🌟 Ming Qimen 明奇门</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Qi Men Dun Jia Analysis System • 奇门遁甲分析系统</p>', unsafe_allow_html=True)
 
-# Current cosmic energy card
-now = datetime.now()
+# Current cosmic energy card (shared snapshot, never waits on the engine)
+now = datetime.now(SGT)
 hour_str = now.strftime("%H:%M")
 date_str = now.strftime("%A, %B %d, %Y")
 
+snapshot = get_snapshot_service().get_snapshot()
+window = snapshot.window_for(now) if snapshot else None
+
+if window:
+    best = window.summaries[0]
+    energy_html = f"""
+    <div style="margin-top: 1rem; color: #FFD700;">
+        {window.chinese_hour} • {window.structure} Ju {window.ju_number} • {window.solar_term}
+    </div>
+    <div style="margin-top: 0.5rem; color: #fff;">
+        Best topic now: {best['icon']} {best['topic']} ({best['score']}/10) • {best['door']} Door + {best['star']} Star
+    </div>
+    """
+    if window is snapshot.current:
+        upcoming = snapshot.next
+        next_best = upcoming.summaries[0]
+        energy_html += f"""
+    <div style="margin-top: 0.5rem; color: #888; font-size: 0.9rem;">
+        Next ({upcoming.start.strftime('%H:%M')}): {next_best['icon']} {next_best['topic']} ({next_best['score']}/10)
+    </div>
+    """
+else:
+    energy_html = """
+    <div style="margin-top: 1rem; color: #FFD700;">
+        Generate a chart to see today's formation →
+    </div>
+    """
+
 st.markdown(f"""
 <div class="energy-card">
     <div style="color: #888; font-size: 1rem;">CURRENT COSMIC ENERGY</div>
     <div class="time-display">{hour_str}</div>
     <div style="color: #666;">{date_str}</div>
-    <div style="margin-top: 1rem; color: #FFD700;">
-        Generate a chart to see today's formation →
-    </div>
+    {energy_html}
 </div>
 """, unsafe_allow_html=True)
 
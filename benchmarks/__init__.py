@@ -0,0 +1 @@
+# Ming Qimen Benchmarks
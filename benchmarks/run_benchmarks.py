@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Benchmark Suite v1.0
+Throughput benchmarks for the QMDJ and BaZi engines with regression gates
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # run and print
+    python benchmarks/run_benchmarks.py --save baseline.json  # record a baseline
+    python benchmarks/run_benchmarks.py --compare baseline.json --max-regression 10
+
+With --compare, the run exits with status 1 when any benchmark's
+throughput drops more than --max-regression percent below the baseline.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# Add repository root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.qmdj_engine import (
+    SGT,
+    QMDJEngine,
+    ChartProcessor,
+    get_all_palaces_summary,
+    get_shared_engine
+)
+from core.bazi_engine import calculate_bazi_profile
+from core.bazi_calculator_core import generate_complete_bazi_export
+
+# Default allowed throughput drop before a benchmark counts as regressed
+DEFAULT_MAX_REGRESSION = 10.0
+
+DEFAULT_REPEAT = 5
+
+# ============================================================================
+# FIXED INPUT SETS
+# ============================================================================
+
+# 48 chart times spread over a year and across every shichen
+CHART_TIMES = [
+    datetime(2024, 1, 1, 0, 30, tzinfo=SGT) + timedelta(days=7 * i, hours=3 * i)
+    for i in range(48)
+]
+
+# 40 birth datetimes (year, month, day, hour)
+BIRTH_DATES = [
+    (1950 + i, (i % 12) + 1, (i * 7 % 28) + 1, (i * 5) % 24)
+    for i in range(40)
+]
+
+BRANCH_ORDER = "子丑寅卯辰巳午未申酉戌亥"
+
+QMDJ_ELEMENTS = {
+    "heaven_stem": "Wood",
+    "earth_stem": "Water",
+    "door": "Metal",
+    "star": "Fire",
+    "deity": "Earth"
+}
+
+
+def _chart_args(dt: datetime) -> Dict:
+    return {"year": dt.year, "month": dt.month, "day": dt.day,
+            "hour": dt.hour, "minute": dt.minute}
+
+
+def _export_pillars(profile: Dict) -> Dict:
+    """Convert a bazi_engine profile's pillars to the calculator core shape"""
+    pillars = {}
+    for name in ["year", "month", "day", "hour"]:
+        pillar = profile["four_pillars"][name]
+        pillars[name] = {
+            "stem": pillar["stem"],
+            "branch": {**pillar["branch"], "index": BRANCH_ORDER.index(pillar["branch"]["chinese"])}
+        }
+    return pillars
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+# Each benchmark is a setup function returning (callable, ops_per_call).
+# The callable runs the whole input set once; setup work is not timed.
+
+def bench_get_chart_kinqimen():
+    engine = QMDJEngine()
+    if not engine.kinqimen_available:
+        return None
+    
+    def run():
+        for dt in CHART_TIMES:
+            engine.get_chart(**_chart_args(dt), method=1)
+    return run, len(CHART_TIMES)
+
+
+def bench_get_chart_fallback():
+    engine = QMDJEngine()
+    
+    def run():
+        for dt in CHART_TIMES:
+            engine._fallback_chart(**_chart_args(dt), method=1)
+    return run, len(CHART_TIMES)
+
+
+def bench_full_palace_data():
+    engine = QMDJEngine()
+    charts = [engine.get_chart(**_chart_args(dt), method=1) for dt in CHART_TIMES]
+    
+    def run():
+        for chart in charts:
+            for palace_num in range(1, 10):
+                ChartProcessor(chart, palace_num).get_full_palace_data()
+    return run, len(charts) * 9
+
+
+def bench_all_palaces_summary():
+    cache = get_shared_engine().cache
+    
+    def run():
+        # Start cold so every call includes chart generation
+        if cache is not None:
+            cache.clear()
+        for dt in CHART_TIMES:
+            get_all_palaces_summary(dt, method=1)
+    return run, len(CHART_TIMES)
+
+
+def bench_bazi_profile():
+    def run():
+        for birth in BIRTH_DATES:
+            calculate_bazi_profile(*birth)
+    return run, len(BIRTH_DATES)
+
+
+def bench_bazi_export():
+    jobs = []
+    for birth in BIRTH_DATES:
+        profile = calculate_bazi_profile(*birth)
+        jobs.append((profile["day_master"]["chinese"], _export_pillars(profile)))
+    
+    def run():
+        for dm, pillars in jobs:
+            generate_complete_bazi_export(dm, pillars, QMDJ_ELEMENTS)
+    return run, len(jobs)
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "qmdj.get_chart.kinqimen": bench_get_chart_kinqimen,
+    "qmdj.get_chart.fallback": bench_get_chart_fallback,
+    "qmdj.chart_processor.full_palace_data": bench_full_palace_data,
+    "qmdj.get_all_palaces_summary": bench_all_palaces_summary,
+    "bazi.calculate_bazi_profile": bench_bazi_profile,
+    "bazi.generate_complete_bazi_export": bench_bazi_export
+}
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_benchmark(setup: Callable, repeat: int) -> Optional[Dict]:
+    """Time one benchmark; returns None when it is not applicable here"""
+    prepared = setup()
+    if prepared is None:
+        return None
+    func, ops = prepared
+    
+    func()  # Warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    
+    best = min(timings)
+    return {
+        "ops": ops,
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(timings), 6),
+        "ops_per_sec": round(ops / best, 2) if best > 0 else float("inf")
+    }
+
+
+def run_all(repeat: int = DEFAULT_REPEAT, only: Optional[str] = None) -> Dict:
+    """Run the suite and return results in baseline JSON format"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and only not in name:
+            continue
+        result = run_benchmark(setup, repeat)
+        results[name] = result if result is not None else {"skipped": True}
+    
+    return {
+        "meta": {
+            "created_at": datetime.now(SGT).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "kinqimen_available": QMDJEngine().kinqimen_available,
+            "repeat": repeat
+        },
+        "benchmarks": results
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Return a list of regression messages (empty when within budget)"""
+    failures = []
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or base.get("skipped") or result.get("skipped"):
+            continue
+        
+        change = (result["ops_per_sec"] - base["ops_per_sec"]) / base["ops_per_sec"] * 100
+        result["change_pct"] = round(change, 1)
+        if change < -max_regression:
+            failures.append(
+                f"{name}: {result['ops_per_sec']:.0f} ops/s vs baseline "
+                f"{base['ops_per_sec']:.0f} ops/s ({change:+.1f}%, limit -{max_regression}%)"
+            )
+    return failures
+
+
+def print_table(report: Dict) -> None:
+    print(f"{'Benchmark':<42} {'ops/s':>12} {'best (ms)':>11} {'change':>8}")
+    print("-" * 76)
+    for name, result in report["benchmarks"].items():
+        if result.get("skipped"):
+            print(f"{name:<42} {'skipped':>12}")
+            continue
+        change = f"{result['change_pct']:+.1f}%" if "change_pct" in result else ""
+        print(f"{name:<42} {result['ops_per_sec']:>12.1f} {result['best_s'] * 1000:>11.2f} {change:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ming Qimen benchmark suite")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Timed passes per benchmark (best pass is reported)")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Allowed throughput drop in percent (default 10)")
+    args = parser.parse_args(argv)
+    
+    report = run_all(args.repeat, args.only)
+    
+    failures = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(report, baseline, args.max_regression)
+    
+    print_table(report)
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline saved to {args.save}")
+    
+    if failures:
+        print("\nThroughput regressions:")
+        for message in failures:
+            print(f"  ✗ {message}")
+        return 1
+    
+    if args.compare:
+        print(f"\n✓ No benchmark regressed more than {args.max_regression}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
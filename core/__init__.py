@@ -1,9 +1,24 @@
 # Ming Qimen Core Module - Phase 5
 from .qmdj_engine import (
     QMDJEngine,
+    ChartCache,
+    CircuitBreaker,
+    SingleFlight,
     ChartProcessor,
+    get_shared_engine,
+    chart_key,
+    shichen_hour,
     generate_qmdj_reading,
+    generate_all_palace_readings,
+    summarize_palace_readings,
     get_all_palaces_summary,
+    make_chart_ref,
+    resolve_raw_chart,
+    chart_id,
+    chart_id_parts,
+    reading_id,
+    reading_id_parts,
+    parse_ju,
     PALACE_INFO,
     PALACE_TOPICS,
     STEMS,
@@ -16,8 +31,25 @@ from .qmdj_engine import (
     get_chinese_hour
 )
 
+from .qmdj_plates import CHART_TYPES
+
+from .sexagenary_calendar import (
+    FourPillars,
+    four_pillars,
+    ganzhi,
+    ganzhi_name,
+    ganzhi_index,
+    day_index,
+    hour_index,
+    day_indices,
+    term_indices,
+    solar_term_index,
+    is_term_start
+)
+
 from .bazi_engine import (
     calculate_bazi_profile,
+    get_bazi_profile,
     calculate_four_pillars,
     calculate_day_master_strength,
     determine_useful_gods,
@@ -33,12 +65,103 @@ from .bazi_engine import (
     PROFILE_TYPES
 )
 
+from .bulk_export import (
+    export_rows,
+    iter_history_rows,
+    iter_reading_rows,
+    iter_range_readings,
+    EXPORT_FORMATS
+)
+
+from .formation_query import (
+    FormationCondition,
+    normalize_condition,
+    find_occurrences
+)
+
+from .formations import (
+    detect_formations,
+    FORMATION_CATALOG
+)
+
+from .profile_fanout import (
+    profile_signature,
+    profile_hash,
+    score_profiles,
+    score_profiles_for_chart
+)
+
+from .month_planner import (
+    MonthPlanner,
+    get_shared_planner
+)
+
+from .disk_cache import (
+    DiskCache,
+    get_disk_cache
+)
+
+from .audit_log import (
+    AuditLog,
+    get_audit_log,
+    iter_audit_records
+)
+
+from .history_store import (
+    HistoryStore,
+    get_history_store,
+    import_history
+)
+
+from .schema import (
+    build_document,
+    iter_documents,
+    validate_document,
+    validate_documents,
+    SCHEMA_VERSION
+)
+
+from .chart_image import (
+    PalaceGridRenderer,
+    render_palace_grid,
+    render_reading_grid
+)
+
+from .report_builder import (
+    ReportJob,
+    build_report,
+    build_reports,
+    write_reports_zip
+)
+
+from .metrics import (
+    enable_timings,
+    get_metrics,
+    render_prometheus,
+    reset_metrics
+)
+
 __all__ = [
     # QMDJ
     'QMDJEngine',
+    'ChartCache',
+    'CircuitBreaker',
+    'SingleFlight',
     'ChartProcessor', 
+    'get_shared_engine',
+    'chart_key',
+    'shichen_hour',
     'generate_qmdj_reading',
+    'generate_all_palace_readings',
+    'summarize_palace_readings',
     'get_all_palaces_summary',
+    'make_chart_ref',
+    'resolve_raw_chart',
+    'chart_id',
+    'chart_id_parts',
+    'reading_id',
+    'reading_id_parts',
+    'parse_ju',
     'PALACE_INFO',
     'PALACE_TOPICS',
     'STEMS',
@@ -49,8 +172,22 @@ __all__ = [
     'calculate_strength',
     'strength_to_friendly',
     'get_chinese_hour',
+    'CHART_TYPES',
+    # Sexagenary calendar
+    'FourPillars',
+    'four_pillars',
+    'ganzhi',
+    'ganzhi_name',
+    'ganzhi_index',
+    'day_index',
+    'hour_index',
+    'day_indices',
+    'term_indices',
+    'solar_term_index',
+    'is_term_start',
     # BaZi
     'calculate_bazi_profile',
+    'get_bazi_profile',
     'calculate_four_pillars',
     'calculate_day_master_strength',
     'determine_useful_gods',
@@ -63,5 +200,57 @@ __all__ = [
     'BRANCHES_PINYIN',
     'BRANCHES_ANIMAL',
     'TEN_GODS_ENGLISH',
-    'PROFILE_TYPES'
+    'PROFILE_TYPES',
+    # Export
+    'export_rows',
+    'iter_history_rows',
+    'iter_reading_rows',
+    'iter_range_readings',
+    'EXPORT_FORMATS',
+    # Formation query
+    'FormationCondition',
+    'normalize_condition',
+    'find_occurrences',
+    # Formations
+    'detect_formations',
+    'FORMATION_CATALOG',
+    # Profile fan-out
+    'profile_signature',
+    'profile_hash',
+    'score_profiles',
+    'score_profiles_for_chart',
+    # Month planner
+    'MonthPlanner',
+    'get_shared_planner',
+    # Disk cache
+    'DiskCache',
+    'get_disk_cache',
+    # Audit log
+    'AuditLog',
+    'get_audit_log',
+    'iter_audit_records',
+    # History store
+    'HistoryStore',
+    'get_history_store',
+    'import_history',
+    # Universal Schema
+    'build_document',
+    'iter_documents',
+    'validate_document',
+    'validate_documents',
+    'SCHEMA_VERSION',
+    # Chart images
+    'PalaceGridRenderer',
+    'render_palace_grid',
+    'render_reading_grid',
+    # Client reports
+    'ReportJob',
+    'build_report',
+    'build_reports',
+    'write_reports_zip',
+    # Metrics
+    'enable_timings',
+    'get_metrics',
+    'render_prometheus',
+    'reset_metrics'
 ]
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Audit Log v1.0
+Append-only record of every reading served
+
+This module provides:
+1. AuditLog - NDJSON writer with gzip segments and a background flusher
+2. iter_segments() / iter_audit_records() - lazy readers for replay and analytics
+3. get_audit_log() - process-wide log, enabled by environment variable
+
+record() only puts the event on a queue; a background thread encodes and
+writes batches, so request latency does not depend on the disk. Each batch
+is appended as its own gzip member, which keeps every flushed batch
+readable after a crash (a torn last member is skipped by the reader).
+Segments (readings-YYYYMMDD-NNNN.ndjson.gz) rotate when they pass a size
+limit or the day (Singapore time) changes.
+
+The log is best-effort: when the queue is full, events are dropped and
+counted instead of blocking the caller.
+
+Enable it with:
+    MING_QIMEN_AUDIT_LOG=1                   (default directory)
+    MING_QIMEN_AUDIT_LOG=/var/log/ming_qimen
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+from datetime import date as Date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .qmdj_engine import SGT
+from .bulk_export import reading_to_row
+
+# Segment size that triggers rotation (compressed bytes)
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Longest an event waits in memory before it is written (seconds)
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Most events written as one gzip member
+MAX_BATCH = 2000
+
+# Events held in memory before new ones are dropped
+MAX_QUEUE = 100000
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "ming_qimen", "audit")
+
+SEGMENT_PATTERN = re.compile(r"^readings-(\d{8})-(\d{4})\.ndjson\.gz$")
+
+_STOP = object()
+
+
+class _FlushRequest:
+    """Queue marker: set once every event queued before it is on disk"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _segment_name(day: Date, sequence: int) -> str:
+    return f"readings-{day:%Y%m%d}-{sequence:04d}.ndjson.gz"
+
+
+def _event_day(event: Dict) -> Date:
+    return datetime.fromtimestamp(event["ts"], SGT).date()
+
+
+# ============================================================================
+# WRITER
+# ============================================================================
+
+class AuditLog:
+    """
+    Append-only NDJSON log in rotating gzip segments.
+    
+    Args:
+        directory: Where segments are written (created if missing)
+        segment_bytes: Rotate once the current segment reaches this size
+        flush_interval: Longest delay between record() and the write
+        max_queue: Events buffered before record() starts dropping
+    """
+    
+    def __init__(self, directory: str = DEFAULT_DIRECTORY,
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_queue: int = MAX_QUEUE):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._segment_day: Optional[Date] = None
+        self._segment_sequence = -1
+        self._segment_size = 0
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.segments_opened = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+    
+    def record(self, event: Dict) -> bool:
+        """
+        Queue one JSON-serializable event (a "ts" is added when missing).
+        Never blocks; returns False when the event was dropped.
+        """
+        event.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.recorded += 1
+        return True
+    
+    def record_reading(self, reading: Dict, source: str) -> bool:
+        """Queue a processed reading as a flat row (see bulk_export.reading_to_row)"""
+        row = reading_to_row(reading)
+        row["source"] = source
+        return self.record(row)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything recorded so far is written"""
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write what is queued and stop the background thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+    
+    def stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "segment": (_segment_name(self._segment_day, self._segment_sequence)
+                        if self._segment_day else None),
+            "queued": self._queue.qsize(),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "segments_opened": self.segments_opened
+        }
+    
+    # ------------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------------
+    
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[Dict] = []
+            flushes: List[_FlushRequest] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            # Drain whatever else is waiting, up to one batch
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _FlushRequest):
+                    flushes.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            
+            if batch:
+                self._write_batch(batch)
+            for request in flushes:
+                request.done.set()
+    
+    def _write_batch(self, batch: List[Dict]) -> None:
+        """Append the batch, one gzip member per (segment, day) run"""
+        start = 0
+        while start < len(batch):
+            day = _event_day(batch[start])
+            end = start + 1
+            while end < len(batch) and _event_day(batch[end]) == day:
+                end += 1
+            
+            lines = []
+            for event in batch[start:end]:
+                try:
+                    lines.append(json.dumps(event, ensure_ascii=False, default=str,
+                                            separators=(",", ":")))
+                except (TypeError, ValueError):
+                    self.errors += 1
+            if lines:
+                self._append(day, ("\n".join(lines) + "\n").encode("utf-8"), len(lines))
+            start = end
+    
+    def _append(self, day: Date, payload: bytes, count: int) -> None:
+        if day != self._segment_day or self._segment_size >= self.segment_bytes:
+            self._rotate(day)
+        member = gzip.compress(payload, mtime=0)
+        path = os.path.join(self.directory, _segment_name(day, self._segment_sequence))
+        try:
+            with open(path, "ab") as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.errors += 1
+            print(f"Audit log write failed: {e}")
+            return
+        self._segment_size += len(member)
+        self.written += count
+    
+    def _rotate(self, day: Date) -> None:
+        """Continue today's last segment if it has room, else start a new one"""
+        if day != self._segment_day:
+            existing = [int(m.group(2)) for m in map(SEGMENT_PATTERN.match, os.listdir(self.directory))
+                        if m and m.group(1) == f"{day:%Y%m%d}"]
+            self._segment_day = day
+            self._segment_sequence = max(existing, default=0)
+            path = os.path.join(self.directory, _segment_name(day, self._segment_sequence))
+            self._segment_size = os.path.getsize(path) if os.path.exists(path) else 0
+            if self._segment_size < self.segment_bytes:
+                self.segments_opened += 1
+                return
+        self._segment_sequence += 1
+        self._segment_size = 0
+        self.segments_opened += 1
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def iter_segments(directory: str = DEFAULT_DIRECTORY, since: Optional[Date] = None,
+                  until: Optional[Date] = None) -> Iterator[str]:
+    """Segment paths in write order, optionally limited to a day range (inclusive)"""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        match = SEGMENT_PATTERN.match(name)
+        if not match:
+            continue
+        day = datetime.strptime(match.group(1), "%Y%m%d").date()
+        if (since and day < since) or (until and day > until):
+            continue
+        yield os.path.join(directory, name)
+
+
+def iter_segment_records(path: str) -> Iterator[Dict]:
+    """Events of one segment, decoded line by line; stops at a torn tail"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+    except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError):
+        # The last member was cut short by a crash; everything before it was yielded
+        return
+
+
+def iter_audit_records(directory: str = DEFAULT_DIRECTORY, since: Optional[Date] = None,
+                       until: Optional[Date] = None,
+                       sources: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """
+    Replay logged events lazily, oldest segment first.
+    
+    Args:
+        directory: Log directory
+        since, until: Day range (Singapore time, inclusive); whole segments
+            outside it are skipped unopened
+        sources: Keep only events whose "source" is listed
+    """
+    sources = set(sources) if sources else None
+    for path in iter_segments(directory, since, until):
+        for event in iter_segment_records(path):
+            if sources is None or event.get("source") in sources:
+                yield event
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_audit_log: Optional[AuditLog] = None
+_audit_log_loaded = False
+_audit_log_lock = threading.Lock()
+
+
+def get_audit_log() -> Optional[AuditLog]:
+    """
+    Return the process-wide audit log, or None unless MING_QIMEN_AUDIT_LOG
+    is set. Queued events are written at interpreter exit.
+    """
+    global _audit_log, _audit_log_loaded
+    if not _audit_log_loaded:
+        with _audit_log_lock:
+            if not _audit_log_loaded:
+                setting = os.environ.get("MING_QIMEN_AUDIT_LOG", "")
+                if setting and setting != "0":
+                    directory = DEFAULT_DIRECTORY if setting == "1" else setting
+                    try:
+                        _audit_log = AuditLog(directory)
+                        atexit.register(_audit_log.close)
+                    except OSError as e:
+                        print(f"Audit log disabled: {e}")
+                _audit_log_loaded = True
+    return _audit_log
+
+
+def audit_reading(reading: Dict, source: str) -> None:
+    """Record a served reading when the audit log is enabled"""
+    log = get_audit_log()
+    if log is not None:
+        log.record_reading(reading, source)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import tempfile
+    from .qmdj_engine import generate_all_palace_readings
+    
+    readings = generate_all_palace_readings(datetime.now(SGT), include_raw_chart=False)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log = AuditLog(tmp, segment_bytes=32 * 1024)
+        
+        started = time.perf_counter()
+        for i in range(20000):
+            log.record_reading(readings[i % 9 + 1], "demo")
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"20000 record() calls in {elapsed:.0f} ms (caller side)")
+        
+        log.flush()
+        log.close()
+        segments = list(iter_segments(tmp))
+        size = sum(os.path.getsize(path) for path in segments)
+        print(f"{len(segments)} segments, {size // 1024} KB - {log.stats()}")
+        
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_audit_records(tmp))
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"Replayed {count} events in {elapsed:.0f} ms")
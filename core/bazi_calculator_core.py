@@ -17,6 +17,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import json
 
+from .sexagenary_calendar import HOUR_BRANCH
+
 # =============================================================================
 # CONSTANTS: HEAVENLY STEMS (天干)
 # =============================================================================
@@ -271,13 +273,8 @@ def get_branch_by_pinyin(pinyin: str) -> Optional[Dict]:
     return None
 
 def get_hour_branch(hour: int) -> Dict:
-    """Get earthly branch for a given hour (0-23)"""
-    # Zi hour: 23:00-00:59
-    if hour == 23 or hour == 0:
-        return EARTHLY_BRANCHES[0]  # Zi
-    # Other hours
-    branch_index = ((hour + 1) // 2) % 12
-    return EARTHLY_BRANCHES[branch_index]
+    """Get earthly branch for a given hour (0-23); 23:00-00:59 is Zi"""
+    return EARTHLY_BRANCHES[HOUR_BRANCH[hour % 24]]
 
 def get_season(month_branch_index: int) -> str:
     """Get season from month branch index"""
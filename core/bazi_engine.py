@@ -11,12 +11,18 @@ This module provides:
 5. Special structures detection
 """
 
-from datetime import datetime, timedelta, timezone
+from datetime import date as Date, datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple, Any
 
+from .disk_cache import get_disk_cache
+from .sexagenary_calendar import day_index, four_pillars, hour_index
+
 # Singapore timezone
 SGT = timezone(timedelta(hours=8))
 
+# Bump when profile calculation changes; the disk cache version
+BAZI_ENGINE_VERSION = "1.2"
+
 # ============================================================================
 # CONSTANTS
 # ============================================================================
@@ -49,55 +55,6 @@ HIDDEN_STEMS = {
     "亥": ["壬", "甲"]
 }
 
-# Month Branch by Solar Term (节气)
-# Each month starts around the 4th-8th of the Western month
-MONTH_BRANCHES = {
-    1: 2,   # 寅 (Tiger) - starts around Feb 4 (立春)
-    2: 3,   # 卯 (Rabbit) - starts around Mar 6 (惊蛰)
-    3: 4,   # 辰 (Dragon) - starts around Apr 5 (清明)
-    4: 5,   # 巳 (Snake) - starts around May 6 (立夏)
-    5: 6,   # 午 (Horse) - starts around Jun 6 (芒种)
-    6: 7,   # 未 (Goat) - starts around Jul 7 (小暑)
-    7: 8,   # 申 (Monkey) - starts around Aug 8 (立秋)
-    8: 9,   # 酉 (Rooster) - starts around Sep 8 (白露)
-    9: 10,  # 戌 (Dog) - starts around Oct 8 (寒露)
-    10: 11, # 亥 (Pig) - starts around Nov 7 (立冬)
-    11: 0,  # 子 (Rat) - starts around Dec 7 (大雪)
-    12: 1   # 丑 (Ox) - starts around Jan 6 (小寒)
-}
-
-# Solar term approximate start days (for month boundary)
-SOLAR_TERM_DAYS = {
-    1: 6,   # 小寒 around Jan 6
-    2: 4,   # 立春 around Feb 4
-    3: 6,   # 惊蛰 around Mar 6
-    4: 5,   # 清明 around Apr 5
-    5: 6,   # 立夏 around May 6
-    6: 6,   # 芒种 around Jun 6
-    7: 7,   # 小暑 around Jul 7
-    8: 8,   # 立秋 around Aug 8
-    9: 8,   # 白露 around Sep 8
-    10: 8,  # 寒露 around Oct 8
-    11: 7,  # 立冬 around Nov 7
-    12: 7   # 大雪 around Dec 7
-}
-
-# Hour Branch mapping (Chinese 2-hour periods)
-HOUR_BRANCHES = {
-    (23, 1): 0,   # 子 Zi
-    (1, 3): 1,    # 丑 Chou
-    (3, 5): 2,    # 寅 Yin
-    (5, 7): 3,    # 卯 Mao
-    (7, 9): 4,    # 辰 Chen
-    (9, 11): 5,   # 巳 Si
-    (11, 13): 6,  # 午 Wu
-    (13, 15): 7,  # 未 Wei
-    (15, 17): 8,  # 申 Shen
-    (17, 19): 9,  # 酉 You
-    (19, 21): 10, # 戌 Xu
-    (21, 23): 11  # 亥 Hai
-}
-
 # Ten Gods (十神) - relationship from Day Master perspective
 TEN_GODS = {
     "same_yang": "比肩",      # Companion (Friend)
@@ -184,21 +141,13 @@ def get_branch_index(branch: str) -> int:
     return 0
 
 
-def calculate_year_pillar(year: int) -> Tuple[int, int]:
+def calculate_year_pillar(year: int, month: int, day: int) -> Tuple[int, int]:
     """
-    Calculate Year Pillar stem and branch indices.
-    Based on the 60-year cycle (六十甲子).
-    Year starts at 立春 (Feb 4 approx), but we simplify to Jan 1 here.
+    Calculate Year Pillar stem and branch indices for a date.
+    The year starts at 立春, so dates before it belong to the previous year.
     """
-    # The cycle: 1984 was 甲子 (Jia-Zi) year
-    # Stem cycles every 10, Branch cycles every 12
-    base_year = 1984
-    diff = year - base_year
-    
-    stem_idx = diff % 10
-    branch_idx = diff % 12
-    
-    return stem_idx, branch_idx
+    p = four_pillars(year, month, day)
+    return p.year % 10, p.year % 12
 
 
 def calculate_month_pillar(year: int, month: int, day: int) -> Tuple[int, int]:
@@ -206,84 +155,23 @@ def calculate_month_pillar(year: int, month: int, day: int) -> Tuple[int, int]:
     Calculate Month Pillar stem and branch indices.
     Month changes at solar terms, not calendar months.
     """
-    # Determine the Chinese month based on solar terms
-    solar_term_day = SOLAR_TERM_DAYS.get(month, 6)
-    
-    # Adjust month if before solar term
-    if day < solar_term_day:
-        month = month - 1 if month > 1 else 12
-        if month == 12:
-            year -= 1
-    
-    # Get branch for this Chinese month
-    # Chinese month 1 (寅) starts around Feb 4
-    chinese_month = ((month - 2) % 12) + 1 if month >= 2 else ((month + 10) % 12) + 1
-    branch_idx = (chinese_month + 1) % 12  # 寅=2 for month 1
-    
-    # Simplified: Month 1 (寅 month) branch index is 2
-    branch_idx = (month + 1) % 12 if month >= 2 else (month + 13) % 12
-    
-    # Calculate stem based on year stem
-    # Rule: 甲己年起丙寅, 乙庚年起戊寅, etc.
-    year_stem_idx, _ = calculate_year_pillar(year)
-    year_stem_group = year_stem_idx % 5  # 甲己=0, 乙庚=1, 丙辛=2, 丁壬=3, 戊癸=4
-    
-    # Starting stem for 寅 month based on year stem
-    month_stem_starts = [2, 4, 6, 8, 0]  # 丙, 戊, 庚, 壬, 甲
-    start_stem = month_stem_starts[year_stem_group]
-    
-    # Calculate this month's stem
-    month_offset = (month - 2) % 12 if month >= 2 else (month + 10) % 12
-    stem_idx = (start_stem + month_offset) % 10
-    
-    return stem_idx, branch_idx
+    p = four_pillars(year, month, day)
+    return p.month % 10, p.month % 12
 
 
 def calculate_day_pillar(year: int, month: int, day: int) -> Tuple[int, int]:
-    """
-    Calculate Day Pillar stem and branch indices.
-    Uses the day count from a known reference date.
-    """
-    # Reference: Jan 1, 1900 was 甲戌 (Jia-Xu) day
-    # Stem index: 0 (甲), Branch index: 10 (戌)
-    from datetime import date
-    
-    ref_date = date(1900, 1, 1)
-    ref_stem = 0   # 甲
-    ref_branch = 10  # 戌
-    
-    target_date = date(year, month, day)
-    days_diff = (target_date - ref_date).days
-    
-    stem_idx = (ref_stem + days_diff) % 10
-    branch_idx = (ref_branch + days_diff) % 12
-    
-    return stem_idx, branch_idx
+    """Calculate Day Pillar stem and branch indices"""
+    gz = day_index(Date(year, month, day))
+    return gz % 10, gz % 12
 
 
 def calculate_hour_pillar(year: int, month: int, day: int, hour: int) -> Tuple[int, int]:
     """
     Calculate Hour Pillar stem and branch indices.
+    23:00 is the 子 hour of the same day (the day pillar does not change).
     """
-    # Get hour branch
-    branch_idx = 0
-    if hour == 23 or hour < 1:
-        branch_idx = 0  # 子
-    else:
-        branch_idx = ((hour + 1) // 2) % 12
-    
-    # Calculate hour stem based on day stem
-    # Rule: 甲己日起甲子时, 乙庚日起丙子时, etc.
-    day_stem_idx, _ = calculate_day_pillar(year, month, day)
-    day_stem_group = day_stem_idx % 5  # 甲己=0, 乙庚=1, 丙辛=2, 丁壬=3, 戊癸=4
-    
-    # Starting stem for 子 hour based on day stem
-    hour_stem_starts = [0, 2, 4, 6, 8]  # 甲, 丙, 戊, 庚, 壬
-    start_stem = hour_stem_starts[day_stem_group]
-    
-    stem_idx = (start_stem + branch_idx) % 10
-    
-    return stem_idx, branch_idx
+    gz = hour_index(day_index(Date(year, month, day)), hour)
+    return gz % 10, gz % 12
 
 
 def get_pillar_info(stem_idx: int, branch_idx: int) -> Dict:
@@ -317,16 +205,14 @@ def calculate_four_pillars(year: int, month: int, day: int, hour: int) -> Dict:
     Returns:
         Dict with year, month, day, hour pillars and metadata
     """
-    year_stem, year_branch = calculate_year_pillar(year)
-    month_stem, month_branch = calculate_month_pillar(year, month, day)
-    day_stem, day_branch = calculate_day_pillar(year, month, day)
-    hour_stem, hour_branch = calculate_hour_pillar(year, month, day, hour)
+    p = four_pillars(year, month, day, hour, late_zi_next_day=False)
+    day_stem = p.day % 10
     
     return {
-        "year": get_pillar_info(year_stem, year_branch),
-        "month": get_pillar_info(month_stem, month_branch),
-        "day": get_pillar_info(day_stem, day_branch),
-        "hour": get_pillar_info(hour_stem, hour_branch),
+        "year": get_pillar_info(p.year % 10, p.year % 12),
+        "month": get_pillar_info(p.month % 10, p.month % 12),
+        "day": get_pillar_info(day_stem, p.day % 12),
+        "hour": get_pillar_info(p.hour % 10, p.hour % 12),
         "day_master": {
             "chinese": HEAVENLY_STEMS[day_stem],
             "pinyin": STEMS_PINYIN[day_stem],
@@ -717,6 +603,23 @@ def calculate_bazi_profile(year: int, month: int, day: int, hour: int) -> Dict:
     return profile
 
 
+def get_bazi_profile(year: int, month: int, day: int, hour: int) -> Dict:
+    """
+    calculate_bazi_profile() backed by the shared disk cache, when enabled
+    (see disk_cache). Treat the result as read-only.
+    """
+    cache = get_disk_cache()
+    if cache is None:
+        return calculate_bazi_profile(year, month, day, hour)
+    
+    key = f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}"
+    profile = cache.get("bazi_profile", BAZI_ENGINE_VERSION, key)
+    if profile is None:
+        profile = calculate_bazi_profile(year, month, day, hour)
+        cache.put("bazi_profile", BAZI_ENGINE_VERSION, key, profile)
+    return profile
+
+
 def format_pillars_display(profile: Dict) -> str:
     """Format Four Pillars for display"""
     fp = profile["four_pillars"]
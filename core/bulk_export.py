@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Bulk Export v1.0
+Streaming export of reading history and generated readings
+
+This module provides:
+1. Generators that flatten history entries and readings into export rows
+2. NDJSON, JSON array and CSV writers that encode one row at a time
+3. XLSX writer using openpyxl write-only mode
+4. A single export_rows() entry point used by the Export and History pages
+
+Rows are pulled from generators and written straight to a binary file
+object, so memory use does not grow with the size of the export.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Iterable, Iterator, BinaryIO
+
+from .qmdj_engine import generate_all_palace_readings
+from .formations import formation_names
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Columns of a history entry (as built on the Chart page)
+HISTORY_FIELDS = [
+    "date", "time", "palace", "topic", "score", "verdict", "door", "star",
+    "chart_id", "reading_id"
+]
+
+# Columns of a flattened reading
+READING_FIELDS = [
+    "date", "time", "chinese_hour", "method", "structure", "ju_number",
+    "solar_term", "palace", "palace_name", "topic", "heaven_stem",
+    "earth_stem", "star", "door", "deity", "component_total", "score",
+    "verdict", "formations", "chart_id", "reading_id"
+]
+
+# Supported output formats
+EXPORT_FORMATS = {
+    "ndjson": {"label": "NDJSON", "extension": "ndjson", "mime": "application/x-ndjson"},
+    "json": {"label": "JSON", "extension": "json", "mime": "application/json"},
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv"},
+    "xlsx": {
+        "label": "Excel (XLSX)",
+        "extension": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    }
+}
+
+
+# ============================================================================
+# ROW GENERATORS
+# ============================================================================
+
+def iter_history_rows(analyses: Iterable[Dict]) -> Iterator[Dict]:
+    """Yield history entries as export rows (one dict per entry)"""
+    for entry in analyses:
+        yield {field: entry.get(field, "") for field in HISTORY_FIELDS}
+
+
+def reading_to_row(reading: Dict) -> Dict:
+    """Flatten a processed reading into a single export row"""
+    meta = reading["metadata"]
+    palace = reading["palace"]
+    comp = reading["components"]
+    scores = reading["scores"]
+    
+    return {
+        "date": meta["date"],
+        "time": meta["time"],
+        "chinese_hour": meta["chinese_hour"],
+        "method": meta["method"],
+        "structure": meta["structure"],
+        "ju_number": meta["ju_number"],
+        "solar_term": meta["solar_term"],
+        "palace": palace["number"],
+        "palace_name": palace["name"],
+        "topic": palace["topic"],
+        "heaven_stem": comp["heaven_stem"]["character"],
+        "earth_stem": comp["earth_stem"]["character"],
+        "star": comp["star"]["name"],
+        "door": comp["door"]["friendly_name"],
+        "deity": comp["deity"]["name"],
+        "component_total": scores["component_total"],
+        "score": scores["normalized"],
+        "verdict": scores["verdict"],
+        "formations": formation_names(reading.get("formations", [])),
+        "chart_id": meta.get("chart_id"),
+        "reading_id": meta.get("reading_id")
+    }
+
+
+def iter_reading_rows(readings: Iterable[Dict]) -> Iterator[Dict]:
+    """Yield flattened rows for an iterable of processed readings"""
+    for reading in readings:
+        yield reading_to_row(reading)
+
+
+def iter_range_readings(
+    start: datetime,
+    end: datetime,
+    palaces: Optional[List[int]] = None,
+    method: int = 1,
+    step: timedelta = timedelta(hours=2)
+) -> Iterator[Dict]:
+    """
+    Lazily generate readings for every step between start and end (inclusive).
+    
+    Args:
+        start, end: Time range to cover
+        palaces: Palace numbers to read at each step (default: all 9)
+        method: 1 = Chai Bu, 2 = Zhi Run
+        step: Interval between readings (default: one shichen)
+    
+    Yields:
+        Processed readings, one at a time
+    """
+    palaces = palaces or list(range(1, 10))
+    current = start
+    while current <= end:
+        # One chart and formation pass per step, shared by its palaces
+        readings = generate_all_palace_readings(current, method, include_raw_chart=False)
+        for palace_num in palaces:
+            yield readings[palace_num]
+        current += step
+
+
+# ============================================================================
+# ENCODERS
+# ============================================================================
+
+def iter_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON, one line per row"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_json_array(rows: Iterable[Dict]) -> Iterator[str]:
+    """Encode rows as a JSON array without building the full list"""
+    yield "["
+    first = True
+    for row in rows:
+        prefix = "\n  " if first else ",\n  "
+        first = False
+        yield prefix + json.dumps(row, ensure_ascii=False, default=str)
+    yield "\n]\n" if not first else "]\n"
+
+
+def iter_csv(rows: Iterable[Dict], fields: List[str]) -> Iterator[str]:
+    """
+    Encode rows as CSV with a header line.
+    A single small buffer is reused, so each chunk is one encoded row.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    
+    writer.writeheader()
+    yield buffer.getvalue()
+    
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def _write_chunks(chunks: Iterable[str], fileobj: BinaryIO) -> None:
+    """Write text chunks to a binary file object as UTF-8"""
+    for chunk in chunks:
+        fileobj.write(chunk.encode("utf-8"))
+
+
+def write_xlsx(rows: Iterable[Dict], fileobj: BinaryIO, fields: List[str],
+               sheet_title: str = "Export") -> None:
+    """
+    Write rows to an XLSX workbook using openpyxl write-only mode.
+    Write-only worksheets stream rows to disk instead of keeping cells in memory.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError(f"openpyxl is required for XLSX export: {e}")
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(fields)
+    
+    for row in rows:
+        sheet.append([row.get(field, "") for field in fields])
+    
+    workbook.save(fileobj)
+
+
+def export_rows(rows: Iterable[Dict], fmt: str, fileobj: BinaryIO,
+                fields: Optional[List[str]] = None,
+                sheet_title: str = "Export") -> None:
+    """
+    Stream rows into fileobj in the requested format.
+    
+    Args:
+        rows: Iterable (ideally a generator) of flat dicts
+        fmt: One of EXPORT_FORMATS ("ndjson", "json", "csv", "xlsx")
+        fileobj: Binary file object opened for writing
+        fields: Column order for CSV/XLSX (required for those formats)
+        sheet_title: Worksheet name for XLSX
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    
+    if fmt in ("csv", "xlsx") and not fields:
+        raise ValueError(f"{fmt} export needs a list of fields")
+    
+    if fmt == "ndjson":
+        _write_chunks(iter_ndjson(rows), fileobj)
+    elif fmt == "json":
+        _write_chunks(iter_json_array(rows), fileobj)
+    elif fmt == "csv":
+        _write_chunks(iter_csv(rows, fields), fileobj)
+    else:
+        write_xlsx(rows, fileobj, fields, sheet_title)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+    from .qmdj_engine import SGT
+    
+    start = datetime.now(SGT).replace(minute=0, second=0, microsecond=0)
+    end = start + timedelta(hours=6)
+    
+    rows = iter_reading_rows(iter_range_readings(start, end, palaces=[1, 5, 9]))
+    out = sys.stdout.buffer
+    export_rows(rows, "csv", out, fields=READING_FIELDS)
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Chart Image Renderer v1.0
+PNG images of the nine-palace (Luo Shu) grid
+
+This module provides:
+1. render_palace_grid() - PNG bytes of a chart with one palace highlighted
+2. render_reading_grid() - the same for a (full or slim) reading
+3. An LRU of finished PNGs keyed by (chart id, highlighted palace)
+
+Drawing uses matplotlib's Agg canvas directly (no pyplot, no global
+backend switch) on one figure whose artists are created once; a render
+only updates colors and texts. A lock serializes access because Agg is
+not thread-safe. Chart pages, exports and reports share the LRU, so an
+image is drawn once.
+
+Chinese characters need a CJK font; when none is installed the grid is
+labelled with the English names instead.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import FancyBboxPatch
+from matplotlib import font_manager
+
+from .qmdj_engine import (
+    PALACE_INFO,
+    PALACE_TOPICS,
+    STEMS,
+    STAR_MAPPING,
+    DOOR_MAPPING,
+    DOOR_FRIENDLY,
+    DEITY_MAPPING,
+    chart_id,
+    resolve_raw_chart
+)
+
+# Luo Shu arrangement, top row first: [4,9,2], [3,5,7], [8,1,6]
+GRID_LAYOUT = ((4, 9, 2), (3, 5, 7), (8, 1, 6))
+
+# Rendered PNGs kept in memory
+DEFAULT_IMAGE_CACHE_SIZE = 256
+
+# Figure size (inches) and resolution
+FIGURE_SIZE = (6.0, 6.0)
+DPI = 100
+
+# Fonts tried for Chinese labels, in order
+CJK_FONTS = (
+    "Noto Sans CJK SC", "Noto Sans CJK TC", "Noto Sans SC", "Noto Sans TC",
+    "Source Han Sans SC", "WenQuanYi Zen Hei", "Microsoft YaHei", "SimHei",
+    "PingFang SC", "Heiti TC", "Arial Unicode MS"
+)
+
+# Colors matching the Chart page
+BACKGROUND = "#0e1117"
+CELL = "#1e1e1e"
+CELL_SELECTED = "#0d47a1"
+BORDER = "#444444"
+BORDER_SELECTED = "#FFD700"
+TITLE = "#FFD700"
+MUTED = "#888888"
+TEXT = "#FFFFFF"
+LABEL_COLORS = {"sky": "#90CAF9", "deity": "#A5D6A7", "star": "#FFCC80",
+                "door": "#CE93D8", "earth": "#EF9A9A"}
+
+
+def _find_cjk_font() -> Optional[str]:
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    for name in CJK_FONTS:
+        if name in installed:
+            return name
+    return None
+
+
+_CJK_FONT = _find_cjk_font()
+
+
+def chart_image_id(raw_chart: Dict):
+    """
+    Identity of what the grid shows: the content-addressed chart id, or
+    the raw structure strings for charts without one
+    """
+    cid = chart_id(raw_chart)
+    if cid is not None:
+        return cid
+    return (raw_chart.get("排盤方式", ""), raw_chart.get("排局", ""), raw_chart.get("干支", ""))
+
+
+# ============================================================================
+# DRAWING
+# ============================================================================
+
+def _labels(raw_chart: Dict, palace_chinese: str) -> Dict[str, str]:
+    """Cell text for one palace, in Chinese when a CJK font is available"""
+    sky = raw_chart.get("天盤", {}).get(palace_chinese, "")
+    earth = raw_chart.get("地盤", {}).get(palace_chinese, "")
+    star = raw_chart.get("星", {}).get(palace_chinese, "")
+    door = raw_chart.get("門", {}).get(palace_chinese, "")
+    deity = raw_chart.get("神", {}).get(palace_chinese, "") if palace_chinese != "中" else ""
+    
+    if _CJK_FONT:
+        return {"sky": sky or "-", "deity": deity or "-", "star": star or "-",
+                "door": door or "-", "earth": earth or "-"}
+    
+    door_english = DOOR_MAPPING.get(door, {}).get("english", "")
+    return {
+        "sky": STEMS.get(sky, {}).get("pinyin", "-"),
+        "deity": DEITY_MAPPING.get(deity, {}).get("english", "-"),
+        "star": STAR_MAPPING.get(star, {}).get("english", "-"),
+        "door": DOOR_FRIENDLY.get(door_english, door_english) or "-",
+        "earth": STEMS.get(earth, {}).get("pinyin", "-")
+    }
+
+
+_ROW_LABELS = {
+    True: {"sky": "天", "deity": "神", "star": "星", "door": "門", "earth": "地"},
+    False: {"sky": "Sky", "deity": "Deity", "star": "Star", "door": "Door", "earth": "Earth"}
+}
+
+
+# Value slots inside a cell: (label key, x offset, y offset)
+_SLOTS = (("sky", 0.28, 0.58), ("deity", 0.72, 0.58),
+          ("star", 0.28, 0.40), ("door", 0.72, 0.40), ("earth", 0.5, 0.20))
+
+
+class _GridFigure:
+    """
+    One figure with every artist created up front. A render only changes
+    cell colors and value texts, then redraws the canvas.
+    """
+    
+    def __init__(self):
+        self.figure = Figure(figsize=FIGURE_SIZE, dpi=DPI, facecolor=BACKGROUND)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_axes((0, 0, 1, 1))
+        ax.set_xlim(0, 3)
+        ax.set_ylim(0, 3)
+        ax.axis("off")
+        
+        font = {"family": _CJK_FONT} if _CJK_FONT else {}
+        row_labels = _ROW_LABELS[bool(_CJK_FONT)]
+        self.cells = {}
+        self.values = {}
+        
+        for row, palaces in enumerate(GRID_LAYOUT):
+            for col, palace_num in enumerate(palaces):
+                info = PALACE_INFO[palace_num]
+                topic = PALACE_TOPICS[palace_num]
+                x, y = col, 2 - row
+                
+                self.cells[palace_num] = ax.add_patch(FancyBboxPatch(
+                    (x + 0.04, y + 0.04), 0.92, 0.92,
+                    boxstyle="round,pad=0,rounding_size=0.06",
+                    facecolor=CELL, edgecolor=BORDER, linewidth=1
+                ))
+                ax.text(x + 0.5, y + 0.86, f"{info['name']} ({palace_num}) {topic['topic']}",
+                        ha="center", va="center", color=TITLE, fontsize=9, fontweight="bold")
+                ax.text(x + 0.5, y + 0.76, f"{info['direction']} | {info['element']}",
+                        ha="center", va="center", color=MUTED, fontsize=7)
+                
+                for key, dx, dy in _SLOTS:
+                    ax.text(x + dx - 0.04, y + dy, row_labels[key], ha="right", va="center",
+                            color=LABEL_COLORS[key], fontsize=8, **font)
+                    self.values[(palace_num, key)] = ax.text(
+                        x + dx, y + dy, "", ha="left", va="center",
+                        color=TEXT, fontsize=9, **font
+                    )
+    
+    def render(self, raw_chart: Dict, selected_palace: Optional[int]) -> bytes:
+        for palace_num, cell in self.cells.items():
+            selected = palace_num == selected_palace
+            cell.set_facecolor(CELL_SELECTED if selected else CELL)
+            cell.set_edgecolor(BORDER_SELECTED if selected else BORDER)
+            cell.set_linewidth(3 if selected else 1)
+            
+            labels = _labels(raw_chart, PALACE_INFO[palace_num]["chinese"])
+            for key, _, _ in _SLOTS:
+                self.values[(palace_num, key)].set_text(labels[key])
+        
+        buffer = io.BytesIO()
+        self.canvas.print_png(buffer)
+        return buffer.getvalue()
+
+
+# ============================================================================
+# RENDERER & CACHE
+# ============================================================================
+
+class PalaceGridRenderer:
+    """Renders grids on one reused Agg figure and keeps an LRU of PNG bytes"""
+    
+    def __init__(self, cache_size: int = DEFAULT_IMAGE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._images: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._grid: Optional[_GridFigure] = None
+        self._render_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _get(self, key: Tuple) -> Optional[bytes]:
+        with self._cache_lock:
+            png = self._images.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return png
+    
+    def _put(self, key: Tuple, png: bytes) -> None:
+        with self._cache_lock:
+            self._images[key] = png
+            self._images.move_to_end(key)
+            while len(self._images) > self.cache_size:
+                self._images.popitem(last=False)
+    
+    def render(self, raw_chart: Dict, selected_palace: Optional[int] = None,
+               image_id=None) -> bytes:
+        """PNG bytes of the grid; drawn only on a cache miss"""
+        key = (image_id if image_id is not None else chart_image_id(raw_chart), selected_palace)
+        png = self._get(key)
+        if png is not None:
+            return png
+        
+        with self._render_lock:
+            if self._grid is None:
+                self._grid = _GridFigure()
+            png = self._grid.render(raw_chart, selected_palace)
+        
+        self._put(key, png)
+        return png
+    
+    def stats(self) -> Dict:
+        with self._cache_lock:
+            return {"size": len(self._images), "max_size": self.cache_size,
+                    "hits": self.hits, "misses": self.misses,
+                    "cjk_font": _CJK_FONT}
+
+
+_renderer: Optional[PalaceGridRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PalaceGridRenderer:
+    """Return the process-wide renderer, creating it once"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PalaceGridRenderer()
+    return _renderer
+
+
+def render_palace_grid(raw_chart: Dict, selected_palace: Optional[int] = None,
+                       image_id=None) -> bytes:
+    """PNG of the nine-palace grid, cached by (chart id, selected palace)"""
+    return get_renderer().render(raw_chart, selected_palace, image_id)
+
+
+def render_reading_grid(reading: Dict) -> bytes:
+    """PNG of the grid for a reading, with its palace highlighted"""
+    return render_palace_grid(resolve_raw_chart(reading), reading["palace"]["number"],
+                              reading["metadata"].get("chart_id"))
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+    from datetime import datetime
+    from .qmdj_engine import get_shared_engine, SGT
+    
+    now = datetime.now(SGT)
+    chart = get_shared_engine().get_chart(now.year, now.month, now.day, now.hour)
+    
+    started = time.perf_counter()
+    png = render_palace_grid(chart, 6)
+    first = (time.perf_counter() - started) * 1000
+    
+    started = time.perf_counter()
+    for palace in range(1, 10):
+        render_palace_grid(chart, palace)
+    nine = (time.perf_counter() - started) * 1000
+    
+    started = time.perf_counter()
+    render_palace_grid(chart, 6)
+    cached = (time.perf_counter() - started) * 1000
+    
+    print(f"First render {first:.1f} ms ({len(png)} bytes), nine palaces {nine:.1f} ms, "
+          f"cached {cached:.3f} ms")
+    print(get_renderer().stats())
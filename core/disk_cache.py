@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Disk Cache v1.0
+Persistent cache shared by every worker process on a host
+
+This module provides:
+1. DiskCache - SQLite (WAL mode) key/value store with TTL and size eviction
+2. get_disk_cache() - process-wide instance, enabled by environment variable
+
+Entries live under (namespace, version, key). Callers derive the version
+from whatever produced the value (engine version, plate table hash, ...),
+so an upgrade never serves stale entries. Rows of another version are
+dropped once no process has written that version for a while, so workers
+still running the previous release during a rolling deploy keep their
+entries. Values are stored as JSON.
+
+WAL mode lets readers in other processes proceed while one process writes.
+The cache is best-effort: a busy or unwritable database turns into a miss
+or a skipped write, never an error for the caller.
+
+Enable it with:
+    MING_QIMEN_DISK_CACHE=1                  (default path)
+    MING_QIMEN_DISK_CACHE=/path/cache.sqlite3
+Optional: MING_QIMEN_DISK_CACHE_TTL (seconds), MING_QIMEN_DISK_CACHE_MAX (entries)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Entries older than this are treated as missing (seconds)
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+# Entries kept before the oldest are evicted
+DEFAULT_MAX_ENTRIES = 200000
+
+# Writes between eviction passes (per process)
+EVICT_EVERY = 500
+
+# Seconds without writes after which another version counts as superseded
+SUPERSEDED_AFTER_SECONDS = 24 * 3600
+
+# Seconds a connection waits for a lock before giving up
+BUSY_TIMEOUT_SECONDS = 2.0
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ming_qimen", "cache.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (namespace, version, key)
+);
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+"""
+
+
+class DiskCache:
+    """
+    SQLite-backed cache safe for concurrent readers and writers.
+    
+    Args:
+        path: Database file (created with its directory if missing)
+        ttl_seconds: Age after which entries are ignored and evicted
+        max_entries: Size bound enforced by evicting the oldest entries
+    """
+    
+    def __init__(self, path: str = DEFAULT_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, namespace: str, version: str, key: str) -> Optional[Any]:
+        """Stored value, or None when missing, expired or unreadable"""
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM entries WHERE namespace = ? AND version = ? AND key = ?"
+                " AND created >= ?",
+                (namespace, version, key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            value = json.loads(row[0])
+        except ValueError:
+            # Corrupt row: drop it and recompute
+            self.misses += 1
+            try:
+                self._connection().execute(
+                    "DELETE FROM entries WHERE namespace = ? AND version = ? AND key = ?",
+                    (namespace, version, key)
+                )
+            except sqlite3.Error:
+                self.errors += 1
+            return None
+        self.hits += 1
+        return value
+    
+    def put(self, namespace: str, version: str, key: str, value: Any) -> bool:
+        """Store a JSON-serializable value; returns False when the write was skipped"""
+        try:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return False
+        
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries (namespace, version, key, value, created)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (namespace, version, key, payload, time.time())
+            )
+        except sqlite3.Error:
+            self.errors += 1
+            return False
+        
+        with self._lock:
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= EVICT_EVERY
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict({namespace: version})
+        return True
+    
+    def evict(self, current_versions: Optional[Dict[str, str]] = None) -> int:
+        """
+        Drop expired entries, entries of superseded versions and, past
+        max_entries, the oldest entries. Returns the number removed.
+        
+        A version other than the current one is superseded only when
+        nothing has been written to it for SUPERSEDED_AFTER_SECONDS, so
+        processes on different releases never wipe each other's entries.
+        """
+        conn = None
+        removed = 0
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute("DELETE FROM entries WHERE created < ?",
+                                  (time.time() - self.ttl_seconds,))
+            removed += cursor.rowcount
+            for namespace, version in (current_versions or {}).items():
+                cursor = conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND version != ?"
+                    " AND version NOT IN (SELECT version FROM entries"
+                    " WHERE namespace = ? AND created >= ?)",
+                    (namespace, version, namespace, time.time() - SUPERSEDED_AFTER_SECONDS)
+                )
+                removed += cursor.rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor = conn.execute(
+                    "DELETE FROM entries WHERE rowid IN"
+                    " (SELECT rowid FROM entries ORDER BY created LIMIT ?)",
+                    (excess,)
+                )
+                removed += cursor.rowcount
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.errors += 1
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+        return removed
+    
+    def clear(self, namespace: Optional[str] = None) -> None:
+        conn = self._connection()
+        if namespace is None:
+            conn.execute("DELETE FROM entries")
+        else:
+            conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+    
+    def stats(self) -> Dict:
+        try:
+            size = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {
+            "path": self.path,
+            "size": size,
+            "max_size": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_disk_cache: Optional[DiskCache] = None
+_disk_cache_loaded = False
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """
+    Return the process-wide disk cache, or None unless MING_QIMEN_DISK_CACHE
+    is set. A cache that cannot be opened is reported once and disabled.
+    """
+    global _disk_cache, _disk_cache_loaded
+    if not _disk_cache_loaded:
+        with _disk_cache_lock:
+            if not _disk_cache_loaded:
+                setting = os.environ.get("MING_QIMEN_DISK_CACHE", "")
+                if setting and setting != "0":
+                    path = DEFAULT_PATH if setting == "1" else setting
+                    try:
+                        _disk_cache = DiskCache(
+                            path,
+                            ttl_seconds=float(os.environ.get(
+                                "MING_QIMEN_DISK_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                            max_entries=int(os.environ.get(
+                                "MING_QIMEN_DISK_CACHE_MAX", DEFAULT_MAX_ENTRIES))
+                        )
+                    except (sqlite3.Error, OSError, ValueError) as e:
+                        print(f"Disk cache disabled: {e}")
+                _disk_cache_loaded = True
+    return _disk_cache
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(os.path.join(tmp, "cache.sqlite3"), max_entries=1000)
+        
+        started = time.perf_counter()
+        for i in range(2000):
+            cache.put("demo", "v1", f"key-{i}", {"n": i, "text": "明奇门"})
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"2000 writes in {elapsed:.0f} ms")
+        
+        cache.evict({"demo": "v1"})
+        print(cache.get("demo", "v1", "key-1999"), cache.get("demo", "v1", "key-0"))
+        print(cache.get("demo", "v2", "key-1999"))
+        print(cache.stats())
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Formation Query v1.0
+Find when a chart configuration occurs
+
+This module provides:
+1. FormationIndex - inverted index (palace, component, value) → layout ids
+2. CalendarIndex - which layout is active in each shichen, per year
+3. find_occurrences() - answer "when does X land in palace Y" queries
+
+Hour charts come from a finite set of plate layouts (2 Dun x 9 Ju x 60
+ganzhi, see qmdj_plates). A query intersects the layout sets of its
+conditions, then looks up when those layouts are active in the calendar
+index, so no chart is generated for the search window.
+
+Layouts follow the table-driven engine; when kinqimen is installed its
+charts may differ in edge cases (term boundaries, Zhi Run method).
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date as Date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, NamedTuple
+
+from .qmdj_engine import (
+    SGT,
+    PALACE_INFO,
+    STAR_MAPPING,
+    DOOR_MAPPING,
+    DOOR_FRIENDLY,
+    DEITY_MAPPING
+)
+from .qmdj_plates import (
+    LAYOUT_COUNT,
+    PLATE_TABLE,
+    TERM_JU,
+    hour_pillars,
+    layout_id,
+    layout_from_id,
+    yuan_index
+)
+from .sexagenary_calendar import (
+    HOUR_GANZHI,
+    SOLAR_TERMS,
+    day_indices,
+    ganzhi_name,
+    term_indices
+)
+from .snapshot_service import shichen_start
+
+# Component name → PlateSet attribute
+COMPONENTS = {
+    "heaven_stem": "sky",
+    "earth_stem": "earth",
+    "star": "stars",
+    "door": "doors",
+    "deity": "deities"
+}
+
+# Upper bound on occurrences returned by one query
+MAX_RESULTS = 10000
+
+_PALACE_NUMBERS = {info["chinese"]: num for num, info in PALACE_INFO.items()}
+
+
+class FormationCondition(NamedTuple):
+    """One component value required in one palace"""
+    palace: int
+    component: str
+    value: str
+
+
+# ============================================================================
+# VALUE NORMALIZATION
+# ============================================================================
+
+def _aliases() -> Dict[str, Dict[str, str]]:
+    """Accepted spellings (code, Chinese name, English name) per component"""
+    aliases = {"star": {}, "door": {}, "deity": {}}
+    for kind, mapping in (("star", STAR_MAPPING), ("door", DOOR_MAPPING), ("deity", DEITY_MAPPING)):
+        for code, info in mapping.items():
+            if kind == "door" and code not in "開休生傷杜景死驚":
+                continue  # Simplified-character duplicates
+            names = [code, info["chinese"], info["english"]]
+            if kind == "door":
+                names.append(DOOR_FRIENDLY.get(info["english"], info["english"]))
+            for name in names:
+                aliases[kind][name.lower()] = code
+    return aliases
+
+
+_ALIASES = _aliases()
+
+
+def normalize_condition(palace, component: str, value: str) -> FormationCondition:
+    """
+    Build a condition from friendly input.
+    
+    Args:
+        palace: Palace number (1-9) or Chinese name (e.g. 乾)
+        component: heaven_stem, earth_stem, star, door or deity
+        value: Chart code (開), Chinese name (開門) or English name (Open)
+    """
+    if component not in COMPONENTS:
+        raise ValueError(f"Unknown component: {component}")
+    
+    if isinstance(palace, str) and not palace.isdigit():
+        if palace not in _PALACE_NUMBERS:
+            raise ValueError(f"Unknown palace: {palace}")
+        palace = _PALACE_NUMBERS[palace]
+    palace = int(palace)
+    if not 1 <= palace <= 9:
+        raise ValueError("palace must be between 1 and 9")
+    
+    if component in _ALIASES:
+        code = _ALIASES[component].get(value.strip().lower())
+        if code is None:
+            raise ValueError(f"Unknown {component}: {value}")
+    else:
+        code = value.strip()
+    
+    return FormationCondition(palace, component, code)
+
+
+# ============================================================================
+# FORMATION INDEX
+# ============================================================================
+
+class FormationIndex:
+    """Inverted index from (palace, component, value) to layout ids"""
+    
+    def __init__(self):
+        postings: Dict[Tuple[int, str, str], set] = {}
+        for plate_id in range(LAYOUT_COUNT):
+            is_yang, ju, gz = layout_from_id(plate_id)
+            plates = PLATE_TABLE[(is_yang, ju)][gz]
+            for component, attr in COMPONENTS.items():
+                for palace_name, value in getattr(plates, attr).items():
+                    palace = _PALACE_NUMBERS[palace_name]
+                    postings.setdefault((palace, component, value), set()).add(plate_id)
+        
+        self._postings: Dict[Tuple[int, str, str], FrozenSet[int]] = {
+            key: frozenset(ids) for key, ids in postings.items()
+        }
+    
+    def lookup(self, condition: FormationCondition) -> FrozenSet[int]:
+        return self._postings.get(tuple(condition), frozenset())
+    
+    def match(self, conditions: Iterable[FormationCondition]) -> FrozenSet[int]:
+        """Layout ids satisfying every condition (smallest sets intersected first)"""
+        sets = sorted((self.lookup(c) for c in conditions), key=len)
+        if not sets:
+            return frozenset()
+        result = sets[0]
+        for ids in sets[1:]:
+            result = result & ids
+            if not result:
+                break
+        return result
+
+
+# ============================================================================
+# CALENDAR INDEX
+# ============================================================================
+
+class CalendarIndex:
+    """
+    Which layout is active in each shichen, built one year at a time.
+    
+    For each year the index maps layout id → sorted shichen start times,
+    so a date range is two bisects per layout.
+    """
+    
+    def __init__(self, max_years: int = 32):
+        self._year = lru_cache(maxsize=max_years)(self._build_year)
+    
+    @staticmethod
+    def _build_year(year: int) -> Dict[int, Tuple[datetime, ...]]:
+        occurrences: Dict[int, List[datetime]] = {}
+        first = Date(year, 1, 1)
+        days = (Date(year + 1, 1, 1) - first).days
+        
+        # Pillars for the whole year in two batch calls; one extra day
+        # because the 23:00 shichen takes the next day's pillar
+        day_codes = day_indices(first, days + 1)
+        terms = term_indices(first, days)
+        
+        for i in range(days):
+            is_yang, ju_numbers = TERM_JU[terms[i]]
+            day = first + timedelta(days=i)
+            for hour in range(1, 24, 2):
+                day_idx = day_codes[i + 1] if hour == 23 else day_codes[i]
+                plate_id = layout_id(is_yang, ju_numbers[yuan_index(day_idx)],
+                                     HOUR_GANZHI[day_idx % 5][hour])
+                occurrences.setdefault(plate_id, []).append(
+                    datetime(day.year, day.month, day.day, hour, tzinfo=SGT))
+        
+        return {plate_id: tuple(times) for plate_id, times in occurrences.items()}
+    
+    def year(self, year: int) -> Dict[int, Tuple[datetime, ...]]:
+        return self._year(year)
+    
+    def occurrences(self, plate_ids: Iterable[int], start: datetime,
+                    end: datetime) -> List[Tuple[datetime, int]]:
+        """(shichen start, layout id) pairs overlapping [start, end], sorted by time"""
+        first = shichen_start(start)
+        results = []
+        for year in range(first.year, end.year + 1):
+            calendar = self.year(year)
+            for plate_id in plate_ids:
+                times = calendar.get(plate_id, ())
+                lo = bisect_left(times, first)
+                hi = bisect_right(times, end)
+                results.extend((moment, plate_id) for moment in times[lo:hi])
+        results.sort()
+        return results
+
+
+# ============================================================================
+# SHARED INSTANCES & QUERIES
+# ============================================================================
+
+_formation_index: Optional[FormationIndex] = None
+_calendar_index: Optional[CalendarIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_formation_index() -> FormationIndex:
+    """Return the process-wide formation index, building it once"""
+    global _formation_index
+    if _formation_index is None:
+        with _index_lock:
+            if _formation_index is None:
+                _formation_index = FormationIndex()
+    return _formation_index
+
+
+def get_calendar_index() -> CalendarIndex:
+    """Return the process-wide calendar index"""
+    global _calendar_index
+    if _calendar_index is None:
+        with _index_lock:
+            if _calendar_index is None:
+                _calendar_index = CalendarIndex()
+    return _calendar_index
+
+
+def find_occurrences(
+    conditions: Iterable[FormationCondition],
+    start: datetime,
+    end: datetime,
+    limit: int = MAX_RESULTS
+) -> List[Dict]:
+    """
+    Find every shichen between start and end whose Hour chart meets all conditions.
+    
+    Args:
+        conditions: FormationCondition list (see normalize_condition)
+        start, end: Search window (naive datetimes are taken as Singapore time)
+        limit: Maximum number of occurrences returned
+    
+    Returns:
+        List of dicts with start, end, ganzhi, structure, ju_number and layout_id
+    """
+    start = start if start.tzinfo else start.replace(tzinfo=SGT)
+    end = end if end.tzinfo else end.replace(tzinfo=SGT)
+    
+    plate_ids = get_formation_index().match(conditions)
+    if not plate_ids:
+        return []
+    
+    results = []
+    for moment, plate_id in get_calendar_index().occurrences(plate_ids, start, end)[:limit]:
+        is_yang, ju, gz = layout_from_id(plate_id)
+        p = hour_pillars(moment.year, moment.month, moment.day, moment.hour)
+        results.append({
+            "start": moment,
+            "end": moment + timedelta(hours=2),
+            "ganzhi": ganzhi_name(gz),
+            "structure": "陽遁" if is_yang else "陰遁",
+            "ju_number": ju,
+            "solar_term": SOLAR_TERMS[p.term],
+            "layout_id": plate_id
+        })
+    return results
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    now = datetime.now(SGT)
+    query = [
+        normalize_condition("乾", "door", "Open"),
+        normalize_condition("乾", "star", "Heart")
+    ]
+    hits = find_occurrences(query, now, now + timedelta(days=182))
+    print(f"Open Door + Heart Star in Qian: {len(hits)} shichen in the next 6 months")
+    for hit in hits[:10]:
+        print(f"  {hit['start']:%Y-%m-%d %H:%M} {hit['ganzhi']}時 {hit['structure']}{hit['ju_number']}局")
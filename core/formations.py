@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Formation Detector v1.0
+Compiled 格局 (formation) detection for all nine palaces
+
+This module provides:
+1. A rule catalog: stem combinations, Escape (遁) patterns, door and star
+   positions, Six Yi punishment, Void (空亡) and Horse (驛馬)
+2. Rules compiled into a lookup table keyed by component codes
+3. detect_formations() - every palace of a chart checked in one pass
+
+Each rule is anchored on one (component, value) fact; the rest of its
+conditions are residual checks. A palace presents about eight facts, so
+detection is a handful of dict lookups per palace.
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Tuple, NamedTuple
+
+from .qmdj_engine import (
+    PALACE_INFO,
+    STAR_MAPPING,
+    DOOR_MAPPING,
+    ELEMENT_CONTROLS
+)
+from .qmdj_plates import HOME_STARS, HOME_DOORS
+from .sexagenary_calendar import BRANCH_CHARS
+
+# Opposite palaces (反吟)
+OPPOSITE_PALACE = {1: 9, 9: 1, 2: 8, 8: 2, 3: 7, 7: 3, 4: 6, 6: 4}
+
+# Earthly branches held by each outer palace
+PALACE_BRANCHES = {
+    1: "子", 8: "丑寅", 3: "卯", 4: "辰巳",
+    9: "午", 2: "未申", 7: "酉", 6: "戌亥"
+}
+
+# Six Yi punishment (六儀擊刑): stem → palace where it is punished
+SIX_YI_PUNISHMENT = {"戊": 3, "己": 2, "庚": 8, "辛": 9, "壬": 4, "癸": 4}
+
+AUSPICIOUS_DOORS = "開休生"
+
+# Door code (traditional or simplified, e.g. 开) → traditional code used by the rules
+TRADITIONAL_DOORS = {code: info["chinese"][0] for code, info in DOOR_MAPPING.items()}
+
+
+class Formation(NamedTuple):
+    """One catalog entry; conditions map component → accepted values"""
+    key: str
+    name: str
+    chinese: str
+    nature: str
+    description: str
+    conditions: Tuple[Tuple[str, FrozenSet[str]], ...]
+    
+    def as_dict(self) -> Dict:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "chinese": self.chinese,
+            "nature": self.nature,
+            "description": self.description
+        }
+
+
+def _rule(key: str, name: str, chinese: str, nature: str, description: str,
+          **conditions: Iterable[str]) -> Formation:
+    return Formation(
+        key, name, chinese, nature, description,
+        tuple((component, frozenset(values)) for component, values in conditions.items())
+    )
+
+
+# ============================================================================
+# RULE CATALOG
+# ============================================================================
+# Components: sky, earth (stems), star, door, deity (chart codes),
+# palace (palace number as text), void and horse ("1" when present).
+
+def _stem_pair_rules() -> List[Formation]:
+    pairs = [
+        ("dragon_returns", "Dragon Returns", "青龍返首", "Auspicious",
+         "Strong support for bold moves and leadership.", "戊", "丙"),
+        ("bird_falls_nest", "Bird Falls into Nest", "飛鳥跌穴", "Auspicious",
+         "Opportunities arrive with little effort.", "丙", "戊"),
+        ("dragon_escapes", "Dragon Escapes", "青龍逃走", "Inauspicious",
+         "Resources slip away; guard assets and agreements.", "乙", "辛"),
+        ("tiger_runs_wild", "Tiger Runs Wild", "白虎猖狂", "Inauspicious",
+         "Aggressive opposition; avoid confrontation.", "辛", "乙"),
+        ("serpent_writhes", "Serpent Writhes", "螣蛇夭矯", "Inauspicious",
+         "Anxiety and entanglement; keep plans simple.", "癸", "丁"),
+        ("bird_plunges", "Bird Plunges into River", "朱雀投江", "Inauspicious",
+         "Documents and words go astray; double-check communication.", "丁", "癸"),
+        ("metal_enters_fire", "Metal Enters Fire", "太白入熒", "Inauspicious",
+         "Competitors press in; defend rather than attack.", "庚", "丙"),
+        ("fire_enters_metal", "Fire Enters Metal", "熒入太白", "Inauspicious",
+         "Losses from outside forces; stay cautious.", "丙", "庚"),
+        ("hidden_palace", "Hidden Palace", "伏宮格", "Inauspicious",
+         "Obstruction to authority; delay major decisions.", "庚", "戊"),
+        ("flying_palace", "Flying Palace", "飛宮格", "Inauspicious",
+         "Leadership is challenged; avoid disputes.", "戊", "庚"),
+        ("great_obstruction", "Great Obstruction", "大格", "Inauspicious",
+         "Travel and movement meet blockages.", "庚", "癸"),
+        ("punishment_obstruction", "Punishment Obstruction", "刑格", "Inauspicious",
+         "Legal or official trouble; follow the rules closely.", "庚", "己"),
+        ("upper_obstruction", "Upper Obstruction", "上格", "Inauspicious",
+         "Plans stall; wait for clearer timing.", "庚", "壬"),
+        ("yi_geng_harmony", "Yi Geng Harmony", "乙庚合", "Auspicious",
+         "Cooperation and agreements come together.", "乙", "庚"),
+        ("bing_xin_harmony", "Bing Xin Harmony", "丙辛合", "Auspicious",
+         "Authority and resources combine well.", "丙", "辛"),
+        ("ding_ren_harmony", "Ding Ren Harmony", "丁壬合", "Auspicious",
+         "Hidden help and good timing align.", "丁", "壬"),
+    ]
+    return [
+        _rule(key, name, chinese, nature, description, sky=sky, earth=earth)
+        for key, name, chinese, nature, description, sky, earth in pairs
+    ]
+
+
+def _escape_rules() -> List[Formation]:
+    good = AUSPICIOUS_DOORS
+    return [
+        _rule("heaven_escape", "Heaven Escape", "天遁", "Auspicious",
+              "Excellent for important undertakings and petitions.",
+              sky="丙", door="生", earth="丁"),
+        _rule("earth_escape", "Earth Escape", "地遁", "Auspicious",
+              "Good for building, property and securing position.",
+              sky="乙", door="開", earth="己"),
+        _rule("human_escape", "Human Escape", "人遁", "Auspicious",
+              "Good for seeking help, negotiation and recruiting.",
+              sky="丁", door="休", deity="陰"),
+        _rule("spirit_escape", "Spirit Escape", "神遁", "Auspicious",
+              "Good for bold, visible moves.",
+              sky="丙", door="生", deity="天"),
+        _rule("ghost_escape", "Ghost Escape", "鬼遁", "Auspicious",
+              "Good for research, strategy and discreet action.",
+              sky="丁", door="杜", deity="地"),
+        _rule("wind_escape", "Wind Escape", "風遁", "Auspicious",
+              "Good for spreading influence and messages.",
+              sky="乙", door=good, palace="4"),
+        _rule("cloud_escape", "Cloud Escape", "雲遁", "Auspicious",
+              "Good for gathering support and resources.",
+              sky="乙", door=good, earth="辛"),
+        _rule("dragon_escape", "Dragon Escape", "龍遁", "Auspicious",
+              "Good for travel, water and trade matters.",
+              sky="乙", door=good, palace="1"),
+    ]
+
+
+def _position_rules() -> List[Formation]:
+    rules = []
+    
+    # Door oppression (門迫): the door's element controls the palace element
+    for code, info in DOOR_MAPPING.items():
+        if TRADITIONAL_DOORS[code] != code:
+            continue  # Simplified-character duplicates
+        palaces = [
+            str(num) for num, palace in PALACE_INFO.items()
+            if ELEMENT_CONTROLS.get(info["element"]) == palace["element"] and num != 5
+        ]
+        if palaces:
+            rules.append(_rule(
+                f"door_oppression_{code}", "Door Oppression", "門迫", "Inauspicious",
+                f"{info['english']} Door is pressed by its palace; its effect is weakened.",
+                door=code, palace=palaces
+            ))
+    
+    # Hidden chant (伏吟) and opposing chant (反吟) of doors and stars
+    for palace, code in HOME_DOORS.items():
+        rules.append(_rule(
+            f"door_fuyin_{code}", "Door Stagnation", "門伏吟", "Inauspicious",
+            "Doors sit at home; matters stall and repeat.",
+            door=code, palace=str(palace)
+        ))
+        rules.append(_rule(
+            f"door_fanyin_{code}", "Door Reversal", "門反吟", "Inauspicious",
+            "Doors face their opposite; expect reversals.",
+            door=code, palace=str(OPPOSITE_PALACE[palace])
+        ))
+    for palace, code in HOME_STARS.items():
+        if palace == 5 or code not in STAR_MAPPING:
+            continue
+        rules.append(_rule(
+            f"star_fuyin_{code}", "Star Stagnation", "星伏吟", "Inauspicious",
+            "Stars sit at home; progress is slow.",
+            star=code, palace=str(palace)
+        ))
+        rules.append(_rule(
+            f"star_fanyin_{code}", "Star Reversal", "星反吟", "Inauspicious",
+            "Stars face their opposite; plans change suddenly.",
+            star=code, palace=str(OPPOSITE_PALACE[palace])
+        ))
+    
+    # Six Yi punishment (六儀擊刑)
+    for stem, palace in SIX_YI_PUNISHMENT.items():
+        rules.append(_rule(
+            f"six_yi_punishment_{stem}", "Six Yi Punishment", "六儀擊刑", "Inauspicious",
+            "The heaven stem is punished in this palace; avoid conflict.",
+            sky=stem, palace=str(palace)
+        ))
+    
+    return rules
+
+
+def _void_horse_rules() -> List[Formation]:
+    return [
+        _rule("void", "Void", "空亡", "Inauspicious",
+              "This palace is empty this period; results may not materialise.",
+              void="1"),
+        _rule("auspicious_door_void", "Auspicious Door in Void", "吉門落空", "Inauspicious",
+              "A good door falls into emptiness; promising leads may fade.",
+              void="1", door=AUSPICIOUS_DOORS),
+        _rule("horse", "Travelling Horse", "驛馬", "Neutral",
+              "Movement and change; good for travel and fast action.",
+              horse="1"),
+    ]
+
+
+FORMATION_CATALOG: Tuple[Formation, ...] = tuple(
+    _stem_pair_rules() + _escape_rules() + _position_rules() + _void_horse_rules()
+)
+
+
+# ============================================================================
+# COMPILATION
+# ============================================================================
+
+# Anchor preference: most selective components first
+_ANCHOR_ORDER = ("sky", "earth", "star", "deity", "door", "palace", "void", "horse")
+
+
+class _CompiledRule(NamedTuple):
+    residual: Tuple[Tuple[str, FrozenSet[str]], ...]
+    result: Dict
+
+
+def _compile(catalog: Iterable[Formation]) -> Dict[Tuple[str, str], Tuple[_CompiledRule, ...]]:
+    """Index each rule under every value of its anchor component"""
+    table: Dict[Tuple[str, str], List[_CompiledRule]] = {}
+    for rule in catalog:
+        conditions = dict(rule.conditions)
+        anchor = next(c for c in _ANCHOR_ORDER if c in conditions)
+        residual = tuple(
+            (component, values) for component, values in rule.conditions
+            if component != anchor
+        )
+        compiled = _CompiledRule(residual, rule.as_dict())
+        for value in conditions[anchor]:
+            table.setdefault((anchor, value), []).append(compiled)
+    return {key: tuple(rules) for key, rules in table.items()}
+
+
+_RULE_TABLE = _compile(FORMATION_CATALOG)
+
+
+# ============================================================================
+# DETECTION
+# ============================================================================
+
+def _branches(value) -> str:
+    """Branch characters from a chart field (string, list or dict)"""
+    if isinstance(value, dict):
+        value = "".join(str(v) for v in value.values())
+    elif isinstance(value, (list, tuple)):
+        value = "".join(str(v) for v in value)
+    return "".join(ch for ch in str(value or "") if ch in BRANCH_CHARS)
+
+
+def _flagged_palaces(branches: str) -> FrozenSet[int]:
+    return frozenset(
+        palace for palace, held in PALACE_BRANCHES.items()
+        if any(branch in held for branch in branches)
+    )
+
+
+def detect_formations(raw_chart: Dict) -> Dict[int, List[Dict]]:
+    """
+    Detect formations in every palace of a raw chart.
+    
+    Returns:
+        Dict of palace number (1-9) -> list of formation dicts
+        (key, name, chinese, nature, description). The dicts are shared
+        between calls and must be treated as read-only.
+    """
+    sky = raw_chart.get("天盤", {})
+    earth = raw_chart.get("地盤", {})
+    stars = raw_chart.get("星", {})
+    doors = {
+        name: TRADITIONAL_DOORS.get(code, code)
+        for name, code in raw_chart.get("門", {}).items()
+    }
+    deities = raw_chart.get("神", {})
+    
+    void_palaces = _flagged_palaces(_branches(raw_chart.get("旬空", "")))
+    horse_palaces = _flagged_palaces(_branches(raw_chart.get("馬星", {}).get("驛馬", "")))
+    
+    found: Dict[int, List[Dict]] = {}
+    for palace, info in PALACE_INFO.items():
+        name = info["chinese"]
+        facts = {
+            "sky": sky.get(name, ""),
+            "earth": earth.get(name, ""),
+            "star": stars.get(name, ""),
+            "door": doors.get(name, ""),
+            "deity": deities.get(name, ""),
+            "palace": str(palace),
+            "void": "1" if palace in void_palaces else "0",
+            "horse": "1" if palace in horse_palaces else "0"
+        }
+        
+        matches = []
+        for fact in facts.items():
+            for rule in _RULE_TABLE.get(fact, ()):
+                if all(facts[component] in values for component, values in rule.residual):
+                    matches.append(rule.result)
+        found[palace] = matches
+    
+    return found
+
+
+def formation_names(formations: List[Dict]) -> str:
+    """Compact text form for exports, e.g. "青龍返首 Dragon Returns; 驛馬 Travelling Horse" """
+    return "; ".join(f"{f['chinese']} {f['name']}" for f in formations)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    from datetime import datetime
+    from .qmdj_engine import SGT, get_shared_engine
+    
+    now = datetime.now(SGT)
+    chart = get_shared_engine().get_chart(now.year, now.month, now.day, now.hour, now.minute)
+    print(f"{len(FORMATION_CATALOG)} rules compiled into {len(_RULE_TABLE)} keys")
+    for palace, formations in detect_formations(chart).items():
+        print(f"Palace {palace}: {formation_names(formations) or '-'}")
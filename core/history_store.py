@@ -0,0 +1,516 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - History Store v1.0
+Persistent reading history and streaming re-import of exported files
+
+This module provides:
+1. HistoryStore - SQLite (WAL mode) table of history entries keyed by reading id
+2. iter_json_records() - incremental reader for NDJSON, JSON arrays and single objects
+3. history_entry() - validates a history row, reading row or v2.0 document
+4. import_history() - batched, deduplicating import with progress and error counts
+5. get_history_store() - process-wide store, enabled by environment variable
+
+Files are never loaded whole: NDJSON is decoded line by line, and JSON
+arrays are decoded element by element with JSONDecoder.raw_decode over a
+sliding text buffer. Entries are written in batches, one transaction per
+batch, and an entry already stored for the same reading id and date is
+counted as a duplicate instead of being written twice (the Chart page
+applies the same rule to session history).
+
+Accepted inputs: History page exports, bulk reading exports, Universal
+Schema v2.0 documents (single, NDJSON or array) and audit log segments
+(.ndjson.gz).
+
+Enable the store with:
+    MING_QIMEN_HISTORY_DB=1                  (default path)
+    MING_QIMEN_HISTORY_DB=/path/history.sqlite3
+"""
+
+import gzip
+import io
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .qmdj_engine import READING_ID_SPAN, reading_id_parts
+from .schema import SCHEMA_VERSION, is_valid_document
+from .bulk_export import HISTORY_FIELDS
+
+# Entries written per transaction during an import
+DEFAULT_BATCH_SIZE = 1000
+
+# Characters read from the file at a time
+READ_CHUNK_CHARS = 64 * 1024
+
+# Individual problems kept in an import report (counts are always exact)
+MAX_REPORTED_ERRORS = 100
+
+# Seconds a connection waits for a lock before giving up
+BUSY_TIMEOUT_SECONDS = 5.0
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ming_qimen", "history.sqlite3")
+
+# Largest valid reading id (exclusive); profile codes run 0-5760
+READING_ID_LIMIT = 5761 * READING_ID_SPAN
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    reading_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    palace INTEGER NOT NULL,
+    topic TEXT,
+    score REAL,
+    verdict TEXT,
+    door TEXT,
+    star TEXT,
+    chart_id INTEGER NOT NULL,
+    source TEXT,
+    added REAL NOT NULL,
+    PRIMARY KEY (reading_id, date)
+);
+CREATE INDEX IF NOT EXISTS history_when ON history (date, time);
+"""
+
+_INSERT = (
+    "INSERT OR IGNORE INTO history (reading_id, date, time, palace, topic, score, verdict,"
+    " door, star, chart_id, source, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class HistoryStore:
+    """
+    SQLite-backed reading history shared by every session and worker.
+    
+    Args:
+        path: Database file (created with its directory if missing)
+    """
+    
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def add_many(self, entries: List[Dict], source: str = "") -> int:
+        """
+        Insert validated history entries in one transaction, skipping those
+        already stored. Returns the number actually inserted.
+        """
+        if not entries:
+            return 0
+        added = time.time()
+        rows = [(e["reading_id"], e["date"], e["time"], e["palace"], e.get("topic"),
+                 e.get("score"), e.get("verdict"), e.get("door"), e.get("star"),
+                 e["chart_id"], source, added) for e in entries]
+        
+        conn = self._connection()
+        before = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(_INSERT, rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+    
+    def add(self, entry: Dict, source: str = "") -> bool:
+        """Insert one history entry; False when it was already stored"""
+        return self.add_many([entry], source) == 1
+    
+    def iter_entries(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        """History entries, newest first, fetched lazily"""
+        sql = "SELECT " + ", ".join(HISTORY_FIELDS) + " FROM history ORDER BY date DESC, time DESC"
+        params: Tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        cursor = self._connection().execute(sql, params)
+        for row in cursor:
+            yield dict(zip(HISTORY_FIELDS, row))
+    
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    
+    def summary(self) -> Dict:
+        """Totals for the History page, computed in SQL"""
+        conn = self._connection()
+        total, average, favorable, scored = conn.execute(
+            "SELECT COUNT(*), AVG(score), SUM(score >= 6), COUNT(score) FROM history"
+        ).fetchone()
+        topic = conn.execute(
+            "SELECT topic FROM history GROUP BY topic ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        return {
+            "total": total,
+            "average_score": average,
+            "favorable": favorable or 0,
+            "scored": scored,
+            "top_topic": topic[0] if topic else None
+        }
+    
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM history")
+    
+    def stats(self) -> Dict:
+        try:
+            size = self.count()
+        except sqlite3.Error:
+            size = None
+        return {"path": self.path, "size": size}
+
+
+# ============================================================================
+# STREAMING READERS
+# ============================================================================
+
+class ImportFileError(ValueError):
+    """Unrecoverable problem in an import file (e.g. a broken JSON array)"""
+
+
+def _open_text(fileobj: BinaryIO) -> io.TextIOBase:
+    """Text view of an uploaded binary file; gzip (audit segments) is detected"""
+    head = fileobj.read(2)
+    fileobj.seek(0)
+    if head == b"\x1f\x8b":
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+
+def _iter_lines(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """NDJSON: one value per non-empty line; bad lines yield their error"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, ImportFileError(f"invalid JSON: {e.msg}")
+
+
+def _iter_values(text: io.TextIOBase, buffer: str, in_array: bool) -> Iterator[Tuple[int, object]]:
+    """
+    Decode consecutive JSON values from a sliding buffer. With in_array the
+    values are the elements of one top-level array ("[" already consumed).
+    """
+    decoder = json.JSONDecoder()
+    position = 0
+    index = 0
+    eof = False
+    
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = text.read(READ_CHUNK_CHARS)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+    
+    expect_separator = False
+    while True:
+        # Skip whitespace and, inside an array, the separating comma
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position < len(buffer):
+                break
+            if not fill():
+                break
+        if position >= len(buffer):
+            if in_array:
+                yield index + 1, ImportFileError("unterminated JSON array")
+            return
+        
+        char = buffer[position]
+        if in_array and char == "]":
+            return
+        if in_array and expect_separator:
+            if char != ",":
+                yield index + 1, ImportFileError(f"expected ',' between array elements, found {char!r}")
+                return
+            position += 1
+            expect_separator = False
+            continue
+        
+        # Decode one value, reading more text until it is complete
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if not eof and fill():
+                    continue
+                yield index + 1, ImportFileError(f"invalid JSON: {e.msg}")
+                return
+            if end == len(buffer) and not eof and fill():
+                # A number or literal may continue in the next chunk
+                continue
+            break
+        
+        index += 1
+        yield index, value
+        position = end
+        expect_separator = True
+
+
+def iter_json_records(fileobj: BinaryIO) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (line or element number, value) from an export file without
+    loading it whole. Values that could not be decoded are yielded as
+    ImportFileError instances; a broken JSON array ends the stream.
+    
+    The layout is detected from the first line: "[" starts a JSON array,
+    a lone "{" a pretty-printed object (single v2.0 export), anything else
+    is NDJSON.
+    """
+    text = _open_text(fileobj)
+    try:
+        first = text.readline()
+        stripped = first.lstrip()
+        if stripped.startswith("["):
+            yield from _iter_values(text, stripped[1:], in_array=True)
+        elif stripped.rstrip() == "{":
+            yield from _iter_values(text, stripped, in_array=False)
+        else:
+            yield from _iter_lines(itertools.chain([first], text))
+    finally:
+        # Leave the caller's file open
+        text.detach()
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def _integer(value: object, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    return value
+
+
+def history_entry(record: object) -> Dict:
+    """
+    History entry (HISTORY_FIELDS) for an imported record: a History page
+    row, a bulk reading row, an audit event or a v2.0 document.
+    Raises ValueError naming the first problem.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    
+    if "schema_version" in record:
+        if record.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"unsupported schema_version {record.get('schema_version')!r}")
+        if not is_valid_document(record):
+            raise ValueError("document does not match Universal Schema v2.0")
+        meta = record["metadata"]
+        qmdj = record["qmdj_data"]
+        date, _, clock = meta["date_time"].partition(" ")
+        record = {
+            "date": date,
+            "time": clock,
+            "palace": qmdj["palace_analyzed"]["number"],
+            "topic": qmdj["palace_analyzed"]["topic"],
+            "score": record["synthesis"]["qmdj_score"],
+            "verdict": record["synthesis"]["verdict"],
+            "door": qmdj["components"]["door"]["name"],
+            "star": qmdj["components"]["star"]["name"],
+            "chart_id": meta["chart_id"],
+            "reading_id": meta["reading_id"]
+        }
+    
+    if record.get("reading_id") is None:
+        raise ValueError("missing reading_id (exported before content ids)")
+    rid = _integer(record["reading_id"], "reading_id")
+    if not 0 <= rid < READING_ID_LIMIT:
+        raise ValueError(f"reading_id {rid} out of range")
+    chart, palace, _ = reading_id_parts(rid)
+    
+    if record.get("palace") is not None and _integer(record["palace"], "palace") != palace:
+        raise ValueError(f"palace {record['palace']} does not match reading_id {rid}")
+    if record.get("chart_id") is not None and _integer(record["chart_id"], "chart_id") != chart:
+        raise ValueError(f"chart_id {record['chart_id']} does not match reading_id {rid}")
+    
+    date = record.get("date")
+    if not isinstance(date, str) or not _DATE_PATTERN.match(date):
+        raise ValueError(f"invalid date {date!r}")
+    
+    score = record.get("score")
+    if score is not None:
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 10:
+            raise ValueError(f"invalid score {score!r}")
+    
+    entry = {field: record.get(field) for field in HISTORY_FIELDS}
+    entry.update(reading_id=rid, chart_id=chart, palace=palace, date=date,
+                 time=str(record.get("time") or ""))
+    return entry
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+class ImportReport(NamedTuple):
+    """Counts of an import (also passed to the progress callback)"""
+    records: int      # values decoded from the file
+    imported: int     # new entries written
+    duplicates: int   # entries already stored (or repeated in the file)
+    invalid: int      # values that failed decoding or validation
+    errors: List[str]  # first MAX_REPORTED_ERRORS problems, "where: what"
+    
+    def as_dict(self) -> Dict:
+        return self._asdict()
+
+
+def import_history(
+    fileobj: BinaryIO,
+    add_many: Callable[[List[Dict]], int],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[ImportReport, int], None]] = None
+) -> ImportReport:
+    """
+    Stream an export file into a history sink.
+    
+    Args:
+        fileobj: Binary file object (NDJSON, JSON array, v2.0 document or .ndjson.gz)
+        add_many: Writes one batch and returns how many entries were new,
+            e.g. HistoryStore.add_many
+        batch_size: Entries per add_many call (one transaction for the store)
+        progress: Called after each batch with the report so far and the
+            number of bytes consumed
+    
+    Returns:
+        ImportReport with exact counts
+    """
+    records = imported = duplicates = invalid = 0
+    errors: List[str] = []
+    batch: List[Dict] = []
+    
+    def report() -> ImportReport:
+        return ImportReport(records, imported, duplicates, invalid, list(errors))
+    
+    def write() -> None:
+        nonlocal imported, duplicates
+        count = add_many(batch)
+        imported += count
+        duplicates += len(batch) - count
+        batch.clear()
+        if progress:
+            try:
+                consumed = fileobj.tell()
+            except (OSError, ValueError):
+                consumed = 0
+            progress(report(), consumed)
+    
+    for where, value in iter_json_records(fileobj):
+        records += 1
+        try:
+            if isinstance(value, ImportFileError):
+                raise value
+            batch.append(history_entry(value))
+        except ValueError as e:
+            invalid += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"#{where}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            write()
+    
+    if batch:
+        write()
+    return report()
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_history_store: Optional[HistoryStore] = None
+_history_store_loaded = False
+_history_store_lock = threading.Lock()
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """
+    Return the process-wide history store, or None unless
+    MING_QIMEN_HISTORY_DB is set. A store that cannot be opened is
+    reported once and disabled.
+    """
+    global _history_store, _history_store_loaded
+    if not _history_store_loaded:
+        with _history_store_lock:
+            if not _history_store_loaded:
+                setting = os.environ.get("MING_QIMEN_HISTORY_DB", "")
+                if setting and setting != "0":
+                    path = DEFAULT_PATH if setting == "1" else setting
+                    try:
+                        _history_store = HistoryStore(path)
+                    except (sqlite3.Error, OSError) as e:
+                        print(f"History store disabled: {e}")
+                _history_store_loaded = True
+    return _history_store
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import tempfile
+    from datetime import datetime, timedelta
+    from .qmdj_engine import SGT
+    from .bulk_export import export_rows, iter_range_readings, iter_reading_rows, READING_FIELDS
+    
+    start = datetime.now(SGT).replace(minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=30)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        exports = {}
+        for fmt in ("ndjson", "json"):
+            path = os.path.join(tmp, f"readings.{fmt}")
+            with open(path, "wb") as f:
+                export_rows(iter_reading_rows(iter_range_readings(start, end)), fmt, f,
+                            fields=READING_FIELDS)
+            exports[fmt] = path
+        with open(exports["ndjson"], "ab") as f:
+            f.write(b'{"broken": \n[1, 2]\n')
+        
+        store = HistoryStore(os.path.join(tmp, "history.sqlite3"))
+        for fmt, path in exports.items():
+            started = time.perf_counter()
+            with open(path, "rb") as f:
+                result = import_history(f, store.add_many)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{fmt}: {result.records} records in {elapsed:.0f} ms - imported "
+                  f"{result.imported}, duplicates {result.duplicates}, invalid {result.invalid}")
+            for error in result.errors:
+                print(f"  {error}")
+        print(store.summary())
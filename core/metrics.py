@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Stage Timing Metrics v1.0
+Opt-in hot-path instrumentation for reading generation
+
+This module provides:
+1. stage_timer() - monotonic timer context around one pipeline stage
+2. Per-process histograms of stage durations
+3. get_metrics() dict and render_prometheus() text exposition
+
+Timing is off by default. Enable it with enable_timings() or by setting
+the MING_QIMEN_TIMINGS=1 environment variable. When disabled (and no
+per-call timings dict is requested) stage_timer() returns a shared no-op
+context, so the hot path pays almost nothing.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS: Tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000
+)
+
+# Stages recorded by generate_qmdj_reading and QMDJEngine.get_chart
+STAGES = (
+    "engine_construction",
+    "chart_cache_lookup",
+    "chart_coalesced_wait",
+    "kinqimen_pan",
+    "fallback_generation",
+    "chart_processing",
+    "metadata_formatting",
+    "total"
+)
+
+_enabled = os.environ.get("MING_QIMEN_TIMINGS", "") == "1"
+
+
+def enable_timings(enabled: bool = True) -> None:
+    """Turn process-wide stage timing on or off"""
+    global _enabled
+    _enabled = enabled
+
+
+def timings_enabled() -> bool:
+    return _enabled
+
+
+# ============================================================================
+# HISTOGRAMS
+# ============================================================================
+
+class StageHistogram:
+    """Cumulative-bucket histogram of one stage's durations (milliseconds)"""
+    
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+            for i, bound in enumerate(BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for count in self.bucket_counts:
+                running += count
+                cumulative.append(running)
+            return {
+                "count": self.count,
+                "sum_ms": round(self.total_ms, 4),
+                "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0.0,
+                "max_ms": round(self.max_ms, 4),
+                "buckets": dict(zip(BUCKETS_MS, cumulative))
+            }
+
+
+_histograms: Dict[str, StageHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def _histogram(stage: str) -> StageHistogram:
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, StageHistogram())
+    return hist
+
+
+def record_stage(stage: str, elapsed_ms: float) -> None:
+    """Add one observation to a stage histogram"""
+    _histogram(stage).observe(elapsed_ms)
+
+
+# ============================================================================
+# TIMERS
+# ============================================================================
+
+class _StageTimer:
+    """Context manager timing one stage with time.perf_counter (monotonic)"""
+    
+    __slots__ = ("stage", "timings", "start")
+    
+    def __init__(self, stage: str, timings: Optional[Dict]):
+        self.stage = stage
+        self.timings = timings
+        self.start = 0.0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        if _enabled:
+            record_stage(self.stage, elapsed_ms)
+        if self.timings is not None:
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0.0) + elapsed_ms, 4)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def stage_timer(stage: str, timings: Optional[Dict] = None):
+    """
+    Time a pipeline stage.
+    
+    Args:
+        stage: Stage name (see STAGES)
+        timings: Optional per-call dict; elapsed milliseconds are added under stage
+    
+    Returns a context manager. Observations go to the process histograms
+    only while timing is enabled.
+    """
+    if not _enabled and timings is None:
+        return _NOOP_TIMER
+    return _StageTimer(stage, timings)
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def get_metrics() -> Dict:
+    """Return all stage histograms as a plain dict"""
+    with _histograms_lock:
+        stages = list(_histograms.items())
+    return {
+        "enabled": _enabled,
+        "stages": {name: hist.snapshot() for name, hist in stages}
+    }
+
+
+def render_prometheus(prefix: str = "ming_qimen_reading_stage") -> str:
+    """Render stage histograms in the Prometheus text exposition format"""
+    metric = f"{prefix}_duration_ms"
+    lines = [
+        f"# HELP {metric} Time spent in each reading generation stage (milliseconds).",
+        f"# TYPE {metric} histogram"
+    ]
+    
+    for stage, data in sorted(get_metrics()["stages"].items()):
+        for bound, count in data["buckets"].items():
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {data["count"]}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {data["sum_ms"]}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {data["count"]}')
+    
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Drop all recorded observations"""
+    with _histograms_lock:
+        _histograms.clear()
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Month Planner v1.0
+Best shichen and palace for each day of a calendar month
+
+This module provides:
+1. DayPlan / ShichenPick - the best window of a day and its runner-ups
+2. MonthPlanner - lazy, cached day-by-day evaluation
+3. get_shared_planner() - one planner per process (shares the chart engine)
+
+Days are evaluated only when asked for and kept in an LRU, so a page that
+shows one week at a time pays for that week only. Palace scores depend on
+the chart layout alone (Dun, Ju and hour stem-branch), and a month uses far
+fewer layouts than shichen, so scores are kept per layout and shared across
+days, topics and profiles. Solar-term and Ju boundaries come from the
+cached calendar in qmdj_plates.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, NamedTuple
+import calendar
+
+from .qmdj_engine import (
+    SGT,
+    PALACE_INFO,
+    PALACE_TOPICS,
+    ChartProcessor,
+    QMDJEngine,
+    chart_id,
+    get_chinese_hour,
+    get_shared_engine
+)
+from .profile_fanout import ChartElements, profile_hash, profile_signature, structure_adjustment
+
+# One sample hour inside each of the day's twelve shichen (子 through 亥)
+SAMPLE_HOURS = tuple(range(0, 24, 2))
+
+# Finished days kept per planner
+DEFAULT_DAY_CACHE_SIZE = 2048
+
+# Runner-up windows kept per day
+ALTERNATIVES = 3
+
+
+class ShichenPick(NamedTuple):
+    """One scored (shichen, palace) window"""
+    start: datetime
+    end: datetime
+    chinese_hour: str
+    palace: int
+    score: float
+    qmdj_score: float
+    alignment_score: Optional[float]
+    verdict: str
+
+
+class DayPlan(NamedTuple):
+    """Best window of one day for a topic (and profile)"""
+    day: Date
+    day_ganzhi: str
+    solar_term: str
+    structure: str
+    best: ShichenPick
+    alternatives: Tuple[ShichenPick, ...]
+    
+    def as_dict(self) -> Dict:
+        best = self.best
+        return {
+            "date": self.day.isoformat(),
+            "day_ganzhi": self.day_ganzhi,
+            "solar_term": self.solar_term,
+            "structure": self.structure,
+            "start": best.start.strftime("%H:%M"),
+            "end": best.end.strftime("%H:%M"),
+            "chinese_hour": best.chinese_hour,
+            "palace": best.palace,
+            "topic": PALACE_TOPICS[best.palace]["topic"],
+            "score": best.score,
+            "qmdj_score": best.qmdj_score,
+            "alignment_score": best.alignment_score,
+            "verdict": best.verdict
+        }
+
+
+def _layout_key(raw_chart: Dict):
+    """Plates depend only on method, Dun/Ju and the hour stem-branch (the chart id)"""
+    cid = chart_id(raw_chart)
+    if cid is not None:
+        return cid
+    return (raw_chart.get("排盤方式", ""), raw_chart.get("排局", ""), raw_chart.get("干支", "")[-3:])
+
+
+# ============================================================================
+# PLANNER
+# ============================================================================
+
+class MonthPlanner:
+    """
+    Lazily evaluated month calendar.
+    
+    Args:
+        method: 1 = Chai Bu, 2 = Zhi Run
+        engine: Chart engine (default: the shared, cached engine)
+        cache_days: Finished days kept in the LRU
+    """
+    
+    def __init__(self, method: int = 1, engine: Optional[QMDJEngine] = None,
+                 cache_days: int = DEFAULT_DAY_CACHE_SIZE):
+        self.method = method
+        self.engine = engine or get_shared_engine()
+        self.cache_days = cache_days
+        self._days: "OrderedDict[Tuple, DayPlan]" = OrderedDict()
+        self._layouts: Dict[object, Tuple[Tuple[Tuple[float, str], ...], ChartElements]] = {}
+        self._lock = threading.Lock()
+    
+    def _layout(self, raw_chart: Dict) -> Tuple[Tuple[Tuple[float, str], ...], ChartElements]:
+        """(score, verdict) per palace and element counts, computed once per layout"""
+        key = _layout_key(raw_chart)
+        entry = self._layouts.get(key)
+        if entry is None:
+            scores = []
+            for palace_num in PALACE_INFO:
+                result = ChartProcessor(raw_chart, palace_num).get_scores()
+                scores.append((result["normalized"], result["verdict"]))
+            entry = (tuple(scores), ChartElements(raw_chart))
+            # At most one entry per layout (2 x 9 x 60 per method), so no eviction
+            self._layouts[key] = entry
+        return entry
+    
+    def _evaluate(self, day: Date, palaces: Tuple[int, ...],
+                  profile: Optional[Dict]) -> DayPlan:
+        signature = profile_signature(profile) if profile else None
+        adjustment = structure_adjustment(profile) if profile else 0.0
+        
+        picks: List[ShichenPick] = []
+        for hour in SAMPLE_HOURS:
+            raw_chart = self.engine.get_chart(day.year, day.month, day.day, hour,
+                                              method=self.method)
+            scores, elements = self._layout(raw_chart)
+            alignment = elements.raw_scores(signature, palaces) if signature else None
+            
+            start = datetime(day.year, day.month, day.day, hour, tzinfo=SGT)
+            start -= timedelta(hours=(hour + 1) % 2)
+            chinese_hour = get_chinese_hour(hour)[0]
+            for palace_num in palaces:
+                qmdj_score, verdict = scores[palace_num - 1]
+                if alignment is None:
+                    align_score = None
+                    score = qmdj_score
+                else:
+                    align_score = round(max(0, min(10, alignment[palace_num] + adjustment)), 1)
+                    score = round((qmdj_score + align_score) / 2, 1)
+                picks.append(ShichenPick(start, start + timedelta(hours=2), chinese_hour,
+                                         palace_num, score, qmdj_score, align_score, verdict))
+        
+        # Highest score first; earlier windows win ties
+        picks.sort(key=lambda pick: (-pick.score, pick.start, pick.palace))
+        
+        # Day pillar and term from the 午 chart (its day is never rolled over)
+        noon = self.engine.get_chart(day.year, day.month, day.day, 12, method=self.method)
+        ganzhi = noon.get("干支", "")
+        return DayPlan(
+            day=day,
+            day_ganzhi=ganzhi[ganzhi.find("月") + 1:ganzhi.find("日")],
+            solar_term=noon.get("節氣", ""),
+            structure=noon.get("排局", ""),
+            best=picks[0],
+            alternatives=tuple(picks[1:1 + ALTERNATIVES])
+        )
+    
+    def plan_day(self, day: Date, topic_palace: Optional[int] = None,
+                 profile: Optional[Dict] = None) -> DayPlan:
+        """
+        Best shichen (and palace) of one day.
+        
+        Args:
+            day: Calendar day (Singapore time)
+            topic_palace: Restrict to one topic's palace (see PALACE_TOPICS);
+                None compares all nine palaces
+            profile: Optional BaZi profile; the score becomes the mean of the
+                QMDJ score and the BaZi alignment score
+        """
+        palaces = (topic_palace,) if topic_palace else tuple(PALACE_INFO)
+        key = (day, palaces, profile_hash(profile))
+        
+        with self._lock:
+            plan = self._days.get(key)
+            if plan is not None:
+                self._days.move_to_end(key)
+                return plan
+        
+        plan = self._evaluate(day, palaces, profile)
+        
+        with self._lock:
+            self._days[key] = plan
+            self._days.move_to_end(key)
+            while len(self._days) > self.cache_days:
+                self._days.popitem(last=False)
+        return plan
+    
+    def iter_month(self, year: int, month: int, topic_palace: Optional[int] = None,
+                   profile: Optional[Dict] = None,
+                   days: Optional[Iterable[int]] = None) -> Iterator[DayPlan]:
+        """Yield day plans in order; nothing is computed until a day is consumed"""
+        last_day = calendar.monthrange(year, month)[1]
+        for day_num in (days if days is not None else range(1, last_day + 1)):
+            if 1 <= day_num <= last_day:
+                yield self.plan_day(Date(year, month, day_num), topic_palace, profile)
+    
+    def plan_month(self, year: int, month: int, topic_palace: Optional[int] = None,
+                   profile: Optional[Dict] = None) -> List[DayPlan]:
+        """Every day of the month"""
+        return list(self.iter_month(year, month, topic_palace, profile))
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"days": len(self._days), "layouts": len(self._layouts),
+                    "max_days": self.cache_days}
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_shared_planners: Dict[int, MonthPlanner] = {}
+_shared_planners_lock = threading.Lock()
+
+
+def get_shared_planner(method: int = 1) -> MonthPlanner:
+    """Return the process-wide planner for a method, creating it once"""
+    planner = _shared_planners.get(method)
+    if planner is None:
+        with _shared_planners_lock:
+            planner = _shared_planners.setdefault(method, MonthPlanner(method))
+    return planner
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+    
+    today = datetime.now(SGT).date()
+    planner = MonthPlanner()
+    
+    started = time.perf_counter()
+    plans = planner.plan_month(today.year, today.month, topic_palace=4)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Wealth calendar for {today:%Y-%m}: {len(plans)} days in {elapsed:.0f} ms")
+    for plan in plans[:7]:
+        row = plan.as_dict()
+        print(f"  {row['date']} {row['day_ganzhi']}日 best {row['start']}-{row['end']} "
+              f"{row['chinese_hour']} score {row['score']} ({row['verdict']})")
+    
+    started = time.perf_counter()
+    planner.plan_month(today.year, today.month)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"All palaces, same month: {elapsed:.0f} ms (layouts shared) - {planner.stats()}")
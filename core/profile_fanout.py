@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Profile Fan-out Scoring v1.0
+Score many BaZi profiles against one QMDJ chart
+
+This module provides:
+1. ChartElements - a chart decoded once into per-palace element counts
+2. ProfileSignature - useful gods packed as (primary, secondary, unfavorable mask)
+3. score_profiles() / score_profiles_for_chart() - best palace and BaZi
+   alignment score for every profile in a batch
+4. profile_hash() - compact code of a profile for reading ids
+
+Scores follow calculate_bazi_alignment_score (bazi_calculator_core) on the
+heaven stem, earth stem, door and star of each palace. Profiles sharing a
+signature share one pass over the nine palaces; the unfavorable-element
+penalty is a table lookup by 5-bit mask, so a batch of thousands of
+profiles costs a few hundred distinct signatures at most.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, NamedTuple
+
+from .qmdj_engine import (
+    PALACE_INFO,
+    chart_id,
+    reading_id,
+    get_shared_engine,
+    get_stem_descriptor,
+    get_star_descriptor,
+    get_door_descriptor
+)
+from .bazi_calculator_core import get_alignment_verdict
+
+ELEMENTS = ("Wood", "Fire", "Earth", "Metal", "Water")
+ELEMENT_INDEX = {element: i for i, element in enumerate(ELEMENTS)}
+
+# Palace components carrying an element (deities have none)
+SCORED_COMPONENTS = ("heaven_stem", "earth_stem", "door", "star")
+
+# Weights of calculate_bazi_alignment_score
+BASE_SCORE = 5.0
+PRIMARY_WEIGHT = 1.5
+SECONDARY_WEIGHT = 1.0
+UNFAVORABLE_WEIGHT = 1.0
+
+NO_ELEMENT = -1
+_MASKS = 1 << len(ELEMENTS)
+
+
+class ProfileSignature(NamedTuple):
+    """Useful-god pattern of a profile; profiles with equal signatures score alike"""
+    primary: int
+    secondary: int
+    unfavorable: int
+
+
+def _element_mask(elements: Iterable[str]) -> int:
+    mask = 0
+    for element in elements or ():
+        if element in ELEMENT_INDEX:
+            mask |= 1 << ELEMENT_INDEX[element]
+    return mask
+
+
+def profile_signature(profile: Dict) -> ProfileSignature:
+    """
+    Pack a profile's useful gods.
+    
+    Accepts calculate_bazi_profile / generate_complete_bazi_export output
+    (useful_gods dict with primary, secondary, unfavorable) and the session
+    profile saved by the Settings and BaZi pages (useful_gods list plus an
+    unfavorable list).
+    """
+    useful = profile.get("useful_gods") or {}
+    if isinstance(useful, dict):
+        primary = useful.get("primary")
+        secondary = useful.get("secondary")
+        unfavorable = useful.get("unfavorable", [])
+    else:
+        primary = useful[0] if len(useful) > 0 else None
+        secondary = useful[1] if len(useful) > 1 else None
+        unfavorable = profile.get("unfavorable", [])
+    
+    return ProfileSignature(
+        ELEMENT_INDEX.get(primary, NO_ELEMENT),
+        ELEMENT_INDEX.get(secondary, NO_ELEMENT),
+        _element_mask(unfavorable)
+    )
+
+
+def structure_adjustment(profile: Dict) -> float:
+    """Special-structure bonus of calculate_bazi_alignment_score"""
+    structures = profile.get("special_structures")
+    if not isinstance(structures, dict):
+        structures = profile
+    
+    adjustment = 0.0
+    if structures.get("wealth_vault"):
+        adjustment += 0.5
+    if structures.get("nobleman_present", structures.get("nobleman")):
+        adjustment += 0.5
+    if structures.get("six_clashes"):
+        adjustment -= 1.0
+    return adjustment
+
+
+def profile_hash(profile: Optional[Dict]) -> int:
+    """
+    Packed code (1-5760) of everything in a profile that affects scoring:
+    signature and structure adjustment. Profiles with equal codes score
+    alike; 0 stands for no profile. Used in reading ids (see reading_id).
+    """
+    if not profile:
+        return 0
+    primary, secondary, unfavorable = profile_signature(profile)
+    adjustment = int(round((structure_adjustment(profile) + 1) * 2))
+    return 1 + (((primary + 1) * 6 + secondary + 1) * _MASKS + unfavorable) * 5 + adjustment
+
+
+# ============================================================================
+# CHART DECODING
+# ============================================================================
+
+class ChartElements:
+    """
+    Element counts of the scored components in each palace.
+    
+    counts[palace][element] is how many of heaven stem, earth stem, door
+    and star carry that element. unfavorable[palace][mask] is the summed
+    count over the elements in mask.
+    """
+    
+    def __init__(self, raw_chart: Dict):
+        self.counts: Dict[int, Tuple[int, ...]] = {}
+        self.unfavorable: Dict[int, Tuple[int, ...]] = {}
+        
+        for palace_num, info in PALACE_INFO.items():
+            name = info["chinese"]
+            # Same defaults as ChartProcessor for missing entries
+            elements = (
+                get_stem_descriptor(raw_chart.get("天盤", {}).get(name, "戊")).element,
+                get_stem_descriptor(raw_chart.get("地盤", {}).get(name, "戊")).element,
+                get_door_descriptor(raw_chart.get("門", {}).get(name, "開")).element,
+                get_star_descriptor(raw_chart.get("星", {}).get(name, "心")).element
+            )
+            counts = [0] * len(ELEMENTS)
+            for element in elements:
+                if element in ELEMENT_INDEX:
+                    counts[ELEMENT_INDEX[element]] += 1
+            
+            self.counts[palace_num] = tuple(counts)
+            self.unfavorable[palace_num] = tuple(
+                sum(counts[i] for i in range(len(ELEMENTS)) if mask >> i & 1)
+                for mask in range(_MASKS)
+            )
+    
+    def raw_scores(self, signature: ProfileSignature,
+                   palaces: Iterable[int]) -> Dict[int, float]:
+        """Unclamped alignment score per palace, before structure bonuses"""
+        primary, secondary, unfavorable = signature
+        # A component matches at most one rule: primary, then secondary, then unfavorable
+        if secondary == primary:
+            secondary = NO_ELEMENT
+        for element in (primary, secondary):
+            if element != NO_ELEMENT:
+                unfavorable &= ~(1 << element)
+        
+        scores = {}
+        for palace_num in palaces:
+            counts = self.counts[palace_num]
+            score = BASE_SCORE - UNFAVORABLE_WEIGHT * self.unfavorable[palace_num][unfavorable]
+            if primary != NO_ELEMENT:
+                score += PRIMARY_WEIGHT * counts[primary]
+            if secondary != NO_ELEMENT:
+                score += SECONDARY_WEIGHT * counts[secondary]
+            scores[palace_num] = score
+        return scores
+
+
+def _clamp(score: float) -> float:
+    return round(max(0, min(10, score)), 1)
+
+
+# ============================================================================
+# FAN-OUT SCORING
+# ============================================================================
+
+def score_profiles_for_chart(
+    raw_chart: Dict,
+    profiles: List[Dict],
+    palaces: Iterable[int] = range(1, 10),
+    include_palace_scores: bool = False
+) -> List[Dict]:
+    """
+    Score every profile against one chart.
+    
+    Args:
+        raw_chart: Raw chart from QMDJEngine.get_chart
+        profiles: BaZi profiles (see profile_signature); an "id" key is echoed back
+        palaces: Palaces eligible as best palace
+        include_palace_scores: Add each profile's score in every palace
+    
+    Returns:
+        One dict per profile, in input order, with profile_id, best_palace,
+        palace_name, score, verdict and reading_id (None when the chart has
+        no chart id)
+    """
+    palaces = tuple(palaces)
+    chart = ChartElements(raw_chart)
+    cid = chart_id(raw_chart)
+    
+    # One pass over the palaces per distinct signature
+    by_signature: Dict[ProfileSignature, Tuple[int, Dict[int, float]]] = {}
+    results = []
+    for index, profile in enumerate(profiles):
+        signature = profile_signature(profile)
+        entry = by_signature.get(signature)
+        if entry is None:
+            raw = chart.raw_scores(signature, palaces)
+            best = max(palaces, key=raw.__getitem__)
+            entry = by_signature[signature] = (best, raw)
+        best, raw = entry
+        
+        adjustment = structure_adjustment(profile)
+        score = _clamp(raw[best] + adjustment)
+        result = {
+            "profile_id": profile.get("id", index),
+            "best_palace": best,
+            "palace_name": PALACE_INFO[best]["chinese"],
+            "score": score,
+            "verdict": get_alignment_verdict(score),
+            "reading_id": None if cid is None else reading_id(cid, best, profile_hash(profile))
+        }
+        if include_palace_scores:
+            result["palace_scores"] = {p: _clamp(s + adjustment) for p, s in raw.items()}
+        results.append(result)
+    
+    return results
+
+
+def score_profiles(
+    date: datetime,
+    profiles: List[Dict],
+    method: int = 1,
+    chart_type: str = "hour",
+    palaces: Iterable[int] = range(1, 10),
+    include_palace_scores: bool = False
+) -> List[Dict]:
+    """Fetch one chart from the shared engine and score every profile against it"""
+    raw_chart = get_shared_engine().get_chart(
+        year=date.year,
+        month=date.month,
+        day=date.day,
+        hour=date.hour,
+        minute=date.minute,
+        method=method,
+        chart_type=chart_type
+    )
+    return score_profiles_for_chart(raw_chart, profiles, palaces, include_palace_scores)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import random
+    import time
+    
+    rng = random.Random(7)
+    team = []
+    for i in range(2000):
+        useful = rng.sample(ELEMENTS, 2)
+        team.append({
+            "id": f"member-{i}",
+            "useful_gods": useful,
+            "unfavorable": rng.sample([e for e in ELEMENTS if e not in useful], 2),
+            "wealth_vault": rng.random() < 0.3,
+            "nobleman": rng.random() < 0.2
+        })
+    
+    started = time.perf_counter()
+    scored = score_profiles(datetime.now(), team)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Scored {len(scored)} profiles in {elapsed:.1f} ms")
+    for row in scored[:5]:
+        print(f"  {row['profile_id']}: palace {row['best_palace']} ({row['palace_name']}) "
+              f"{row['score']} {row['verdict']}")
@@ -10,17 +10,46 @@ This module provides:
 4. Universal Schema v2.0 compliant output
 """
 
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple, Any
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date as Date, datetime, timedelta, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Any, NamedTuple
 import json
+import threading
+import time
+
+from .disk_cache import DiskCache, get_disk_cache
+from .metrics import stage_timer
+from .qmdj_plates import (
+    YUAN_NAMES,
+    LAYOUT_COUNT,
+    ChartLayout,
+    HourPillars,
+    chart_layout,
+    get_plates,
+    horse_stars,
+    layout_id,
+    layout_from_id,
+    plate_table_hash
+)
+from .sexagenary_calendar import HOUR_NAMES, SOLAR_TERMS, ganzhi_index, ganzhi_name, is_term_start
 
 # Singapore timezone
 SGT = timezone(timedelta(hours=8))
 
+# Bump when chart generation changes; part of every disk cache version
+ENGINE_VERSION = "1.1"
+
 # ============================================================================
 # CONSTANTS & MAPPINGS
 # ============================================================================
 
+# Plate methods (排盤方式): 1 = Chai Bu, 2 = Zhi Run
+METHOD_NAMES = {1: "拆補", 2: "置閏"}
+METHOD_CODES = {name: code for code, name in METHOD_NAMES.items()}
+
 # Luo Shu Magic Square - Palace Numbers to Trigram/Direction
 PALACE_INFO = {
     1: {"name": "Kan", "chinese": "坎", "direction": "N", "element": "Water"},
@@ -77,22 +106,6 @@ BRANCHES = {
     "亥": {"pinyin": "Hai", "element": "Water", "animal": "Pig"}
 }
 
-# Chinese Hour (Shichen) mapping
-CHINESE_HOURS = {
-    (23, 1): ("子", "Zi", "Rat"),
-    (1, 3): ("丑", "Chou", "Ox"),
-    (3, 5): ("寅", "Yin", "Tiger"),
-    (5, 7): ("卯", "Mao", "Rabbit"),
-    (7, 9): ("辰", "Chen", "Dragon"),
-    (9, 11): ("巳", "Si", "Snake"),
-    (11, 13): ("午", "Wu", "Horse"),
-    (13, 15): ("未", "Wei", "Goat"),
-    (15, 17): ("申", "Shen", "Monkey"),
-    (17, 19): ("酉", "You", "Rooster"),
-    (19, 21): ("戌", "Xu", "Dog"),
-    (21, 23): ("亥", "Hai", "Pig")
-}
-
 # Nine Stars - kinqimen Chinese → Joey Yap English
 STAR_MAPPING = {
     "蓬": {"english": "Canopy", "chinese": "天蓬", "element": "Water", "nature": "Inauspicious"},
@@ -162,13 +175,17 @@ ELEMENT_CONTROLS = {
 
 def get_chinese_hour(hour: int) -> Tuple[str, str, str]:
     """Convert Western hour (0-23) to Chinese hour (Shichen)"""
-    for (start, end), (chinese, pinyin, animal) in CHINESE_HOURS.items():
-        if start == 23:  # Special case for Zi hour spanning midnight
-            if hour >= 23 or hour < 1:
-                return chinese, pinyin, animal
-        elif start <= hour < end:
-            return chinese, pinyin, animal
-    return "子", "Zi", "Rat"  # Default
+    return HOUR_NAMES[hour % 24]
+
+
+def shichen_hour(hour: int) -> int:
+    """
+    First whole hour of the shichen containing hour (1, 3, ... 21).
+    23 and 0 stay distinct: late Zi belongs to the next day's pillar.
+    """
+    if hour in (0, 23):
+        return hour
+    return hour - (hour + 1) % 2
 
 
 def calculate_strength(component_element: str, palace_element: str) -> Tuple[str, int]:
@@ -215,19 +232,456 @@ def strength_to_friendly(strength: str, score: int) -> Tuple[str, str]:
 
 def get_stem_info(stem_char: str) -> Dict:
     """Get detailed info for a Heavenly Stem"""
+    stem = get_stem_descriptor(stem_char)
+    return {
+        "chinese": stem.chinese,
+        "pinyin": stem.pinyin,
+        "element": stem.element,
+        "polarity": stem.polarity
+    }
+
+
+# ============================================================================
+# COMPONENT DESCRIPTORS
+# ============================================================================
+# Immutable descriptors for every stem, star, door, deity and strength are
+# built once at import. Components are serialized from them once per palace
+# element into shared read-only mappings (_palace_component); every reading
+# gets its own dict copy from palace_component.
+
+class StrengthDescriptor(NamedTuple):
+    status: str
+    score: int
+    friendly: str
+    advice: str
+
+
+class StemDescriptor(NamedTuple):
+    character: str
+    chinese: str
+    pinyin: str
+    element: str
+    polarity: str
+
+
+class StarDescriptor(NamedTuple):
+    code: str
+    name: str
+    chinese: str
+    element: str
+    nature: str
+
+
+class DoorDescriptor(NamedTuple):
+    code: str
+    name: str
+    friendly_name: str
+    chinese: str
+    element: str
+    nature: str
+
+
+class DeityDescriptor(NamedTuple):
+    code: str
+    name: str
+    chinese: str
+    nature: str
+    function: str
+
+
+@lru_cache(maxsize=None)
+def get_strength_descriptor(component_element: str, palace_element: str) -> StrengthDescriptor:
+    """Strength of a component element inside a palace element"""
+    status, score = calculate_strength(component_element, palace_element)
+    friendly, advice = strength_to_friendly(status, score)
+    return StrengthDescriptor(status, score, friendly, advice)
+
+
+@lru_cache(maxsize=None)
+def get_stem_descriptor(stem_char: str) -> StemDescriptor:
+    """Descriptor for a stem given as Chinese character or pinyin"""
     if stem_char in STEMS:
-        info = STEMS[stem_char].copy()
-        info["chinese"] = stem_char
-        return info
+        info = STEMS[stem_char]
+        return StemDescriptor(stem_char, stem_char, info["pinyin"], info["element"], info["polarity"])
     
     # Try to find by pinyin
     for chinese, info in STEMS.items():
         if info["pinyin"].lower() == stem_char.lower():
-            result = info.copy()
-            result["chinese"] = chinese
+            return StemDescriptor(stem_char, chinese, info["pinyin"], info["element"], info["polarity"])
+    
+    return StemDescriptor(stem_char, stem_char, "Unknown", "Unknown", "Unknown")
+
+
+@lru_cache(maxsize=None)
+def get_star_descriptor(star_char: str) -> StarDescriptor:
+    info = STAR_MAPPING.get(star_char)
+    if info is None:
+        return StarDescriptor(star_char, "Unknown", f"天{star_char}", "Earth", "Neutral")
+    return StarDescriptor(star_char, info["english"], info["chinese"], info["element"], info["nature"])
+
+
+@lru_cache(maxsize=None)
+def get_door_descriptor(door_char: str) -> DoorDescriptor:
+    info = DOOR_MAPPING.get(door_char)
+    if info is None:
+        return DoorDescriptor(door_char, "Unknown", "Unknown", f"{door_char}門", "Earth", "Neutral")
+    english_name = info["english"]
+    return DoorDescriptor(
+        door_char, english_name, DOOR_FRIENDLY.get(english_name, english_name),
+        info["chinese"], info["element"], info["nature"]
+    )
+
+
+@lru_cache(maxsize=None)
+def get_deity_descriptor(deity_char: str) -> DeityDescriptor:
+    info = DEITY_MAPPING.get(deity_char)
+    if info is None:
+        return DeityDescriptor(deity_char, "Unknown", deity_char, "Neutral", "")
+    return DeityDescriptor(deity_char, info["english"], info["chinese"], info["nature"], info["function"])
+
+
+def stem_component(stem: StemDescriptor, strength: StrengthDescriptor) -> Dict:
+    """Serialize a stem component"""
+    return {
+        "character": stem.character,
+        "pinyin": stem.pinyin,
+        "chinese": stem.chinese,
+        "element": stem.element,
+        "polarity": stem.polarity,
+        "strength_in_palace": strength.status,
+        "strength_score": strength.score,
+        "friendly_strength": strength.friendly,
+        "advice": strength.advice
+    }
+
+
+def star_component(star: StarDescriptor, strength: StrengthDescriptor) -> Dict:
+    """Serialize a star component"""
+    return {
+        "name": star.name,
+        "chinese": star.chinese,
+        "element": star.element,
+        "nature": star.nature,
+        "strength_in_palace": strength.status,
+        "strength_score": strength.score,
+        "friendly_strength": strength.friendly,
+        "advice": strength.advice
+    }
+
+
+def door_component(door: DoorDescriptor, strength: StrengthDescriptor) -> Dict:
+    """Serialize a door component"""
+    return {
+        "name": door.name,
+        "friendly_name": door.friendly_name,
+        "chinese": door.chinese,
+        "element": door.element,
+        "nature": door.nature,
+        "strength_in_palace": strength.status,
+        "strength_score": strength.score,
+        "friendly_strength": strength.friendly,
+        "advice": strength.advice
+    }
+
+
+def deity_component(deity: DeityDescriptor) -> Dict:
+    """Serialize a deity component"""
+    return {
+        "name": deity.name,
+        "chinese": deity.chinese,
+        "nature": deity.nature,
+        "function": deity.function
+    }
+
+
+@lru_cache(maxsize=None)
+def _palace_component(kind: str, char: str, palace_element: str) -> Mapping:
+    """
+    Read-only component for a raw chart character in a palace element,
+    built once per (kind, char, palace element).
+    """
+    if kind == "deity":
+        return MappingProxyType(deity_component(get_deity_descriptor(char)))
+    
+    if kind == "stem":
+        descriptor = get_stem_descriptor(char)
+        serialize = stem_component
+    elif kind == "star":
+        descriptor = get_star_descriptor(char)
+        serialize = star_component
+    else:
+        descriptor = get_door_descriptor(char)
+        serialize = door_component
+    
+    return MappingProxyType(serialize(descriptor, get_strength_descriptor(descriptor.element, palace_element)))
+
+
+def palace_component(kind: str, char: str, palace_element: str) -> Dict:
+    """Component dict for a raw chart character; each reading gets its own copy"""
+    return dict(_palace_component(kind, char, palace_element))
+
+
+def score_components(heaven_stem: Dict, earth_stem: Dict, star: Dict, door: Dict) -> Dict:
+    """Total the component strength scores and map them to a 1-10 score and verdict"""
+    total_score = (
+        heaven_stem["strength_score"] +
+        earth_stem["strength_score"] +
+        star["strength_score"] +
+        door["strength_score"]
+    )
+    
+    # Normalize to 1-10 scale
+    normalized_score = round(((total_score + 12) / 24) * 9 + 1, 1)
+    normalized_score = max(1, min(10, normalized_score))
+    
+    # Generate verdict
+    if normalized_score >= 8:
+        verdict = "Very Favorable"
+        verdict_type = "success"
+    elif normalized_score >= 6:
+        verdict = "Favorable"
+        verdict_type = "success"
+    elif normalized_score >= 4:
+        verdict = "Neutral"
+        verdict_type = "info"
+    elif normalized_score >= 2:
+        verdict = "Challenging"
+        verdict_type = "warning"
+    else:
+        verdict = "Very Challenging"
+        verdict_type = "warning"
+    
+    return {
+        "component_total": total_score,
+        "normalized": normalized_score,
+        "verdict": verdict,
+        "verdict_type": verdict_type
+    }
+
+
+def _build_descriptors() -> None:
+    """Create every known descriptor up front"""
+    elements = list(ELEMENT_PRODUCES)
+    for component_element in elements + ["Unknown"]:
+        for palace_element in elements:
+            get_strength_descriptor(component_element, palace_element)
+    for stem_char in STEMS:
+        get_stem_descriptor(stem_char)
+    for star_char in STAR_MAPPING:
+        get_star_descriptor(star_char)
+    for door_char in DOOR_MAPPING:
+        get_door_descriptor(door_char)
+    for deity_char in DEITY_MAPPING:
+        get_deity_descriptor(deity_char)
+    for info in PALACE_INFO.values():
+        for stem_char in STEMS:
+            _palace_component("stem", stem_char, info["element"])
+        for star_char in STAR_MAPPING:
+            _palace_component("star", star_char, info["element"])
+        for door_char in DOOR_MAPPING:
+            _palace_component("door", door_char, info["element"])
+        for deity_char in DEITY_MAPPING:
+            _palace_component("deity", deity_char, info["element"])
+
+
+_build_descriptors()
+
+
+# ============================================================================
+# CHART CACHE
+# ============================================================================
+
+# Default number of charts kept by the shared engine
+DEFAULT_CACHE_SIZE = 2048
+
+# Default kinqimen time budget (seconds) for the shared engine
+DEFAULT_KINQIMEN_TIMEOUT = 5.0
+
+# Cache sizes for Day, Month and Year charts (one entry per period and method)
+PERIOD_CACHE_SIZES = {"day": 4096, "month": 512, "year": 128}
+
+
+class ChartCache:
+    """
+    Thread-safe LRU cache of raw charts.
+    Cached charts are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._data: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            chart = self._data.get(key)
+            if chart is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return chart
+    
+    def put(self, key: Tuple, chart: Dict) -> None:
+        with self._lock:
+            self._data[key] = chart
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# ============================================================================
+# KINQIMEN CIRCUIT BREAKER
+# ============================================================================
+
+# Consecutive kinqimen failures (errors or timeouts) before the breaker opens
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Seconds the breaker stays open before one trial call is let through
+DEFAULT_COOLDOWN_SECONDS = 60.0
+
+# Chart paths recorded in _metadata["calculation_path"]
+PATH_KINQIMEN = "kinqimen"
+PATH_FALLBACK_UNAVAILABLE = "fallback_unavailable"
+PATH_FALLBACK_ERROR = "fallback_error"
+PATH_FALLBACK_TIMEOUT = "fallback_timeout"
+PATH_FALLBACK_CIRCUIT_OPEN = "fallback_circuit_open"
+PATH_PERIOD_TABLES = "period_tables"
+
+
+class CircuitBreaker:
+    """
+    Failure counter guarding calls into kinqimen.
+    
+    closed    - calls go through; consecutive failures are counted
+    open      - calls are refused until the cooldown has passed
+    half_open - one trial call is allowed; success closes, failure reopens
+    """
+    
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Return True if a kinqimen call may be attempted now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+
+# ============================================================================
+# REQUEST COALESCING
+# ============================================================================
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation.
+    
+    The first caller for a key runs the computation; callers arriving while
+    it is in flight wait on the same future and receive the same result
+    (or exception). The key is released as soon as the call finishes.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+    
+    def do(self, key: Tuple, fn, timings: Optional[Dict] = None) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            with stage_timer("chart_coalesced_wait", timings):
+                return future.result()
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
             return result
+        finally:
+            with self._lock:
+                del self._calls[key]
     
-    return {"chinese": stem_char, "pinyin": "Unknown", "element": "Unknown", "polarity": "Unknown"}
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": self.calls,
+                "coalesced": self.coalesced
+            }
 
 
 # ============================================================================
@@ -238,10 +692,36 @@ class QMDJEngine:
     """
     Qi Men Dun Jia calculation engine.
     Wraps kinqimen library with fallback to mock calculations.
+    
+    Pass cache_size > 0 to keep an LRU cache of generated charts; Day,
+    Month and Year charts then get caches keyed by their own period.
+    Pass kinqimen_timeout (seconds) to bound each kinqimen call; slow or
+    failing calls are counted by a circuit breaker, and while it is open
+    charts come straight from the cache or the fallback.
+    
+    Pass a DiskCache to persist kinqimen charts across processes and
+    restarts (the shared engine uses get_disk_cache()).
+    
+    Concurrent requests for the same Hour chart are coalesced: one caller
+    computes it and the others share its result, so callers must treat
+    returned charts as read-only.
     """
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 0, kinqimen_timeout: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 disk_cache: Optional[DiskCache] = None):
         self.kinqimen_available = False
+        self.cache = ChartCache(cache_size) if cache_size > 0 else None
+        self.period_caches: Dict[str, ChartCache] = {
+            chart_type: ChartCache(size) for chart_type, size in PERIOD_CACHE_SIZES.items()
+        } if cache_size > 0 else {}
+        self.kinqimen_timeout = kinqimen_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.inflight = SingleFlight()
+        self.disk_cache = disk_cache
+        self._disk_version: Optional[str] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         self._try_import_kinqimen()
     
     def _try_import_kinqimen(self):
@@ -255,148 +735,215 @@ class QMDJEngine:
             self.kinqimen_available = False
             print(f"kinqimen not available: {e}. Using fallback calculations.")
     
+    @property
+    def disk_version(self) -> str:
+        """Disk cache version: engine version, plate table hash and kinqimen version"""
+        try:
+            from importlib.metadata import version
+            kinqimen_version = version("kinqimen") if self.kinqimen_available else "none"
+        except Exception:
+            kinqimen_version = "unknown"
+        return f"{ENGINE_VERSION}:{plate_table_hash()}:{kinqimen_version}"
+    
     def get_chart(self, year: int, month: int, day: int, hour: int, 
-                  minute: int = 0, method: int = 1) -> Dict:
+                  minute: int = 0, method: int = 1,
+                  timings: Optional[Dict] = None,
+                  timeout: Optional[float] = None,
+                  chart_type: str = "hour") -> Dict:
         """
         Generate QMDJ chart for given datetime.
         
         Args:
             year, month, day, hour, minute: DateTime components
             method: 1 = Chai Bu (拆補), 2 = Zhi Run (置閏)
+            timings: Optional dict that receives per-stage milliseconds
+            timeout: Time budget for kinqimen in seconds (default: engine setting)
+            chart_type: "hour", "day", "month" or "year"
         
         Returns:
-            Dict with full chart data in kinqimen format
+            Dict with full chart data in kinqimen format; _metadata records
+            calculation_mode and calculation_path
         """
-        if self.kinqimen_available:
+        if chart_type != "hour":
+            return self._get_period_chart(chart_type, year, month, day, hour, method, timings)
+        
+        # Every minute of a shichen gives the same chart; key (and compute) on
+        # its start. kinqimen may place a solar term at its exact moment, so on
+        # a day a term begins its charts keep the requested time.
+        if not (self.kinqimen_available and is_term_start(Date(year, month, day))):
+            hour, minute = shichen_hour(hour), 0
+        key = (year, month, day, hour, minute, method)
+        if self.cache is not None:
+            with stage_timer("chart_cache_lookup", timings):
+                chart = self.cache.get(key)
+            if chart is not None:
+                return chart
+        
+        def compute():
+            # Only kinqimen charts go to disk; table charts are cheaper to rebuild
+            use_disk = self.disk_cache is not None and self.kinqimen_available
+            chart = self._disk_get(key) if use_disk else None
+            if chart is None:
+                chart = self._compute_chart(year, month, day, hour, minute, method, timings, timeout)
+                if use_disk and chart["_metadata"]["calculation_path"] == PATH_KINQIMEN:
+                    self._disk_put(key, chart)
+            
+            # Fallback charts produced because kinqimen misbehaved are not cached,
+            # so the real chart is used once kinqimen recovers
+            path = chart["_metadata"]["calculation_path"]
+            if self.cache is not None and path in (PATH_KINQIMEN, PATH_FALLBACK_UNAVAILABLE):
+                self.cache.put(key, chart)
+            return chart
+        
+        return self.inflight.do(key, compute, timings)
+    
+    def _disk_get(self, key: Tuple) -> Optional[Dict]:
+        if self._disk_version is None:
+            self._disk_version = self.disk_version
+        return self.disk_cache.get("chart", self._disk_version, ",".join(map(str, key)))
+    
+    def _disk_put(self, key: Tuple, chart: Dict) -> None:
+        self.disk_cache.put("chart", self._disk_version, ",".join(map(str, key)), chart)
+    
+    def _compute_chart(self, year: int, month: int, day: int, hour: int,
+                       minute: int, method: int,
+                       timings: Optional[Dict] = None,
+                       timeout: Optional[float] = None) -> Dict:
+        """Calculate a chart with kinqimen, falling back when unavailable"""
+        if not self.kinqimen_available:
+            path = PATH_FALLBACK_UNAVAILABLE
+        elif not self.breaker.allow():
+            path = PATH_FALLBACK_CIRCUIT_OPEN
+        else:
             try:
-                qm = self.kinqimen.Qimen(year, month, day, hour, minute)
-                return qm.pan(method)
+                with stage_timer("kinqimen_pan", timings):
+                    chart = self._call_kinqimen(
+                        year, month, day, hour, minute, method,
+                        timeout if timeout is not None else self.kinqimen_timeout
+                    )
+                self.breaker.record_success()
+                return self._tag(chart, "kinqimen", PATH_KINQIMEN)
+            except FutureTimeoutError:
+                self.breaker.record_failure()
+                print("kinqimen timed out. Using fallback.")
+                path = PATH_FALLBACK_TIMEOUT
             except Exception as e:
+                self.breaker.record_failure()
                 print(f"kinqimen error: {e}. Using fallback.")
+                path = PATH_FALLBACK_ERROR
         
-        return self._fallback_chart(year, month, day, hour, minute, method)
+        with stage_timer("fallback_generation", timings):
+            chart = self._fallback_chart(year, month, day, hour, minute, method)
+        return self._tag(chart, "fallback", path)
+    
+    def _call_kinqimen(self, year: int, month: int, day: int, hour: int,
+                       minute: int, method: int, timeout: Optional[float]) -> Dict:
+        """Run kinqimen, on a worker thread when a time budget is set"""
+        def pan():
+            return self.kinqimen.Qimen(year, month, day, hour, minute).pan(method)
+        
+        if timeout is None:
+            return pan()
+        
+        # A timed-out call keeps running on its worker; the result is discarded
+        return self._get_executor().submit(pan).result(timeout=timeout)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=4, thread_name_prefix="kinqimen"
+                    )
+        return self._executor
+    
+    @staticmethod
+    def _tag(chart: Dict, mode: str, path: str) -> Dict:
+        """Record which path produced the chart in chart["_metadata"]"""
+        meta = chart.setdefault("_metadata", {})
+        meta["calculation_mode"] = mode
+        meta["calculation_path"] = path
+        return chart
+    
+    def _get_period_chart(self, chart_type: str, year: int, month: int, day: int,
+                          hour: int, method: int, timings: Optional[Dict] = None) -> Dict:
+        """Day, Month or Year chart, cached once per period"""
+        pillars, layout = chart_layout(chart_type, year, month, day, hour)
+        cache = self.period_caches.get(chart_type)
+        key = (layout.period, method)
+        
+        if cache is not None:
+            with stage_timer("chart_cache_lookup", timings):
+                chart = cache.get(key)
+            if chart is not None:
+                return chart
+        
+        with stage_timer("fallback_generation", timings):
+            chart = self._table_chart(pillars, layout, method, hour)
+        self._tag(chart, "tables", PATH_PERIOD_TABLES)
+        
+        if cache is not None:
+            cache.put(key, chart)
+        return chart
     
     def _fallback_chart(self, year: int, month: int, day: int, 
                         hour: int, minute: int, method: int) -> Dict:
         """
         Generate fallback chart when kinqimen is unavailable.
-        Uses simplified calculations for demonstration.
+        Ju comes from the solar term and Yuan; plates are precomputed
+        tables (see qmdj_plates), so a chart is a few lookups.
+        Zhi Run (置閏) is approximated by the Chai Bu term boundaries.
         """
-        # Simplified Ju calculation based on date
-        # In reality, this requires solar term calculations
-        day_num = (year * 365 + month * 30 + day + hour) % 9 + 1
-        is_yang = (month <= 6)  # Simplified: first half = Yang Dun
-        
-        structure = "陽遁" if is_yang else "陰遁"
-        ju_num = day_num if is_yang else (10 - day_num) % 9 or 9
+        pillars, layout = chart_layout("hour", year, month, day, hour)
+        return self._table_chart(pillars, layout, method, hour)
+    
+    def _table_chart(self, pillars: HourPillars, layout: ChartLayout,
+                     method: int, hour: int) -> Dict:
+        """Assemble a kinqimen-format chart from the precomputed plate tables"""
+        plates = get_plates(layout.is_yang, layout.ju, layout.ganzhi)
         
-        # Generate palace arrangements based on Ju number
-        earth_plate = self._generate_earth_plate(ju_num, is_yang)
-        sky_plate = self._generate_sky_plate(ju_num, is_yang, hour)
-        stars = self._generate_stars(ju_num, hour)
-        doors = self._generate_doors(ju_num, hour)
-        deities = self._generate_deities(ju_num, hour)
+        structure = "陽遁" if layout.is_yang else "陰遁"
+        ju_num = layout.ju
+        paiju = f"{structure}第{ju_num}局"
+        if layout.yuan is not None:
+            paiju += f"{YUAN_NAMES[layout.yuan]}元"
         
-        # Get Chinese hour
-        chinese_hour, hour_pinyin, hour_animal = get_chinese_hour(hour)
+        # Get Chinese hour (Hour charts only)
+        if layout.chart_type == "hour":
+            chinese_hour, hour_pinyin, hour_animal = get_chinese_hour(hour)
+            hour_label = f"{chinese_hour}時 ({hour_pinyin})"
+        else:
+            hour_label = ""
         
         return {
-            "排盤方式": {1: "拆補", 2: "置閏"}.get(method, "拆補"),
-            "干支": f"{year}年{month}月{day}日{hour}時",
-            "旬首": "甲子",  # Simplified
-            "旬空": "戌亥",  # Simplified
-            "局日": "甲己日",  # Simplified
-            "排局": f"{structure}第{ju_num}局",
-            "節氣": self._get_solar_term(month, day),
+            "排盤方式": METHOD_NAMES.get(method, "拆補"),
+            "干支": pillars.ganzhi_to(layout.chart_type),
+            "旬首": plates.xun,
+            "旬空": plates.void,
+            "局日": ganzhi_name(pillars.day - pillars.day % 5),
+            "排局": paiju,
+            "節氣": SOLAR_TERMS[pillars.term],
             "值符值使": {
-                "值符天干": ["甲子", "戊"],
-                "值符星宮": ["心", "乾"],
-                "值使門宮": ["開", "乾"]
-            },
-            "天乙": "乾",
-            "天盤": sky_plate,
-            "地盤": earth_plate,
-            "門": doors,
-            "星": stars,
-            "神": deities,
-            "馬星": {
-                "天馬": "申",
-                "丁馬": "巳",
-                "驛馬": "寅"
+                "值符天干": [plates.xun, plates.xun_stem],
+                "值符星宮": [plates.chief_star, plates.chief_star_palace],
+                "值使門宮": [plates.chief_door, plates.chief_door_palace]
             },
+            "天乙": plates.chief_star_palace,
+            "天盤": plates.sky,
+            "地盤": plates.earth,
+            "門": plates.doors,
+            "星": plates.stars,
+            "神": plates.deities,
+            "馬星": horse_stars(pillars.month, layout.ganzhi),
             "長生運": {},
             "_metadata": {
                 "calculation_mode": "fallback",
+                "chart_type": layout.chart_type,
                 "structure": structure,
                 "ju_number": ju_num,
-                "chinese_hour": f"{chinese_hour}時 ({hour_pinyin})"
+                "chinese_hour": hour_label
             }
         }
-    
-    def _generate_earth_plate(self, ju_num: int, is_yang: bool) -> Dict:
-        """Generate Earth Plate stem arrangement"""
-        stems_yang = list("戊己庚辛壬癸丁丙乙")
-        stems_yin = list("戊乙丙丁癸壬辛庚己")
-        stems = stems_yang if is_yang else stems_yin
-        
-        # Rotate based on Ju number
-        start_idx = (ju_num - 1) % 9
-        rotated = stems[start_idx:] + stems[:start_idx]
-        
-        palaces = ["坎", "坤", "震", "巽", "中", "乾", "兌", "艮", "離"]
-        return dict(zip(palaces, rotated))
-    
-    def _generate_sky_plate(self, ju_num: int, is_yang: bool, hour: int) -> Dict:
-        """Generate Heaven Plate stem arrangement"""
-        # Simplified: rotate earth plate by hour offset
-        earth = self._generate_earth_plate(ju_num, is_yang)
-        stems = list(earth.values())
-        offset = hour % 9
-        rotated = stems[offset:] + stems[:offset]
-        return dict(zip(earth.keys(), rotated))
-    
-    def _generate_stars(self, ju_num: int, hour: int) -> Dict:
-        """Generate Nine Stars arrangement"""
-        stars_order = list("蓬芮沖輔禽心柱任英")
-        palaces = ["坎", "坤", "震", "巽", "中", "乾", "兌", "艮", "離"]
-        
-        # Rotate based on ju and hour
-        offset = (ju_num + hour) % 9
-        rotated = stars_order[offset:] + stars_order[:offset]
-        return dict(zip(palaces, rotated))
-    
-    def _generate_doors(self, ju_num: int, hour: int) -> Dict:
-        """Generate Eight Doors arrangement"""
-        doors_order = list("休死傷杜中開驚生景")
-        palaces = ["坎", "坤", "震", "巽", "中", "乾", "兌", "艮", "離"]
-        
-        offset = (ju_num + hour) % 9
-        rotated = doors_order[offset:] + doors_order[:offset]
-        return dict(zip(palaces, rotated))
-    
-    def _generate_deities(self, ju_num: int, hour: int) -> Dict:
-        """Generate Eight Deities arrangement"""
-        deities_yang = list("符蛇陰合勾雀地天")
-        deities_yin = list("符蛇陰合虎玄地天")
-        palaces = ["坎", "坤", "震", "巽", "乾", "兌", "艮", "離"]  # No center
-        
-        is_yang = ju_num <= 5
-        deities = deities_yang if is_yang else deities_yin
-        
-        offset = (ju_num + hour) % 8
-        rotated = deities[offset:] + deities[:offset]
-        return dict(zip(palaces, rotated))
-    
-    def _get_solar_term(self, month: int, day: int) -> str:
-        """Get approximate solar term"""
-        solar_terms = [
-            "小寒", "大寒", "立春", "雨水", "驚蟄", "春分",
-            "清明", "穀雨", "立夏", "小滿", "芒種", "夏至",
-            "小暑", "大暑", "立秋", "處暑", "白露", "秋分",
-            "寒露", "霜降", "立冬", "小雪", "大雪", "冬至"
-        ]
-        idx = ((month - 1) * 2 + (1 if day > 15 else 0)) % 24
-        return solar_terms[idx]
 
 
 # ============================================================================
@@ -406,11 +953,14 @@ class QMDJEngine:
 class ChartProcessor:
     """Process raw kinqimen output into Ming Qimen format"""
     
-    def __init__(self, raw_chart: Dict, selected_palace: int = 5):
+    def __init__(self, raw_chart: Dict, selected_palace: int = 5,
+                 formations: Optional[Dict[int, List[Dict]]] = None):
         self.raw = raw_chart
         self.palace_num = selected_palace
         self.palace_info = PALACE_INFO[selected_palace]
         self.palace_element = self.palace_info["element"]
+        self._formations = formations
+        self.chart_id = chart_id(raw_chart)
     
     def get_palace_name(self) -> str:
         """Get palace name in Chinese"""
@@ -418,126 +968,28 @@ class ChartProcessor:
     
     def get_heaven_stem(self) -> Dict:
         """Extract and process Heaven Stem for selected palace"""
-        palace_name = self.get_palace_name()
-        sky_plate = self.raw.get("天盤", {})
-        stem_char = sky_plate.get(palace_name, "戊")
-        
-        stem_info = get_stem_info(stem_char)
-        strength, score = calculate_strength(stem_info["element"], self.palace_element)
-        friendly, advice = strength_to_friendly(strength, score)
-        
-        return {
-            "character": stem_char,
-            "pinyin": stem_info["pinyin"],
-            "chinese": stem_info["chinese"],
-            "element": stem_info["element"],
-            "polarity": stem_info["polarity"],
-            "strength_in_palace": strength,
-            "strength_score": score,
-            "friendly_strength": friendly,
-            "advice": advice
-        }
+        stem_char = self.raw.get("天盤", {}).get(self.get_palace_name(), "戊")
+        return palace_component("stem", stem_char, self.palace_element)
     
     def get_earth_stem(self) -> Dict:
         """Extract and process Earth Stem for selected palace"""
-        palace_name = self.get_palace_name()
-        earth_plate = self.raw.get("地盤", {})
-        stem_char = earth_plate.get(palace_name, "戊")
-        
-        stem_info = get_stem_info(stem_char)
-        strength, score = calculate_strength(stem_info["element"], self.palace_element)
-        friendly, advice = strength_to_friendly(strength, score)
-        
-        return {
-            "character": stem_char,
-            "pinyin": stem_info["pinyin"],
-            "chinese": stem_info["chinese"],
-            "element": stem_info["element"],
-            "polarity": stem_info["polarity"],
-            "strength_in_palace": strength,
-            "strength_score": score,
-            "friendly_strength": friendly,
-            "advice": advice
-        }
+        stem_char = self.raw.get("地盤", {}).get(self.get_palace_name(), "戊")
+        return palace_component("stem", stem_char, self.palace_element)
     
     def get_star(self) -> Dict:
         """Extract and process Star for selected palace"""
-        palace_name = self.get_palace_name()
-        stars = self.raw.get("星", {})
-        star_char = stars.get(palace_name, "心")
-        
-        star_info = STAR_MAPPING.get(star_char, {
-            "english": "Unknown",
-            "chinese": f"天{star_char}",
-            "element": "Earth",
-            "nature": "Neutral"
-        })
-        
-        strength, score = calculate_strength(star_info["element"], self.palace_element)
-        friendly, advice = strength_to_friendly(strength, score)
-        
-        return {
-            "name": star_info["english"],
-            "chinese": star_info["chinese"],
-            "element": star_info["element"],
-            "nature": star_info["nature"],
-            "strength_in_palace": strength,
-            "strength_score": score,
-            "friendly_strength": friendly,
-            "advice": advice
-        }
+        star_char = self.raw.get("星", {}).get(self.get_palace_name(), "心")
+        return palace_component("star", star_char, self.palace_element)
     
     def get_door(self) -> Dict:
         """Extract and process Door for selected palace"""
-        palace_name = self.get_palace_name()
-        doors = self.raw.get("門", {})
-        door_char = doors.get(palace_name, "開")
-        
-        door_info = DOOR_MAPPING.get(door_char, {
-            "english": "Unknown",
-            "chinese": f"{door_char}門",
-            "element": "Earth",
-            "nature": "Neutral"
-        })
-        
-        # Apply friendly name substitution
-        english_name = door_info["english"]
-        friendly_name = DOOR_FRIENDLY.get(english_name, english_name)
-        
-        strength, score = calculate_strength(door_info["element"], self.palace_element)
-        friendly_strength, advice = strength_to_friendly(strength, score)
-        
-        return {
-            "name": english_name,
-            "friendly_name": friendly_name,
-            "chinese": door_info["chinese"],
-            "element": door_info["element"],
-            "nature": door_info["nature"],
-            "strength_in_palace": strength,
-            "strength_score": score,
-            "friendly_strength": friendly_strength,
-            "advice": advice
-        }
+        door_char = self.raw.get("門", {}).get(self.get_palace_name(), "開")
+        return palace_component("door", door_char, self.palace_element)
     
     def get_deity(self) -> Dict:
         """Extract and process Deity for selected palace"""
-        palace_name = self.get_palace_name()
-        deities = self.raw.get("神", {})
-        deity_char = deities.get(palace_name, "符")
-        
-        deity_info = DEITY_MAPPING.get(deity_char, {
-            "english": "Unknown",
-            "chinese": deity_char,
-            "nature": "Neutral",
-            "function": ""
-        })
-        
-        return {
-            "name": deity_info["english"],
-            "chinese": deity_info["chinese"],
-            "nature": deity_info["nature"],
-            "function": deity_info["function"]
-        }
+        deity_char = self.raw.get("神", {}).get(self.get_palace_name(), "符")
+        return palace_component("deity", deity_char, self.palace_element)
     
     def get_structure_info(self) -> Dict:
         """Extract chart structure info"""
@@ -547,10 +999,7 @@ class ChartProcessor:
         structure = "Yang Dun" if is_yang else "Yin Dun"
         structure_chinese = "陽遁" if is_yang else "陰遁"
         
-        # Extract Ju number
-        import re
-        ju_match = re.search(r'(\d+)', paiju)
-        ju_num = int(ju_match.group(1)) if ju_match else 1
+        ju_num = parse_ju(paiju)
         
         return {
             "structure": structure,
@@ -561,8 +1010,26 @@ class ChartProcessor:
             "gangzhi": self.raw.get("干支", "")
         }
     
-    def get_full_palace_data(self) -> Dict:
-        """Get complete processed data for selected palace"""
+    def get_scores(self) -> Dict:
+        """Component total, normalized score and verdict (no summary or formations)"""
+        return score_components(
+            self.get_heaven_stem(), self.get_earth_stem(), self.get_star(), self.get_door()
+        )
+    
+    def get_formations(self) -> List[Dict]:
+        """Formations (格局) in the selected palace"""
+        if self._formations is None:
+            from .formations import detect_formations
+            self._formations = detect_formations(self.raw)
+        return self._formations[self.palace_num]
+    
+    def get_full_palace_data(self, include_raw: bool = True) -> Dict:
+        """
+        Get complete processed data for selected palace.
+        
+        With include_raw=False the "raw_chart" key is left out; callers
+        attach a "chart_ref" instead (see make_chart_ref).
+        """
         topic_info = PALACE_TOPICS[self.palace_num]
         structure = self.get_structure_info()
         
@@ -571,41 +1038,18 @@ class ChartProcessor:
         star = self.get_star()
         door = self.get_door()
         deity = self.get_deity()
+        formations = self.get_formations()
         
-        # Calculate total component score
-        total_score = (
-            heaven_stem["strength_score"] +
-            earth_stem["strength_score"] +
-            star["strength_score"] +
-            door["strength_score"]
-        )
-        
-        # Normalize to 1-10 scale
-        normalized_score = round(((total_score + 12) / 24) * 9 + 1, 1)
-        normalized_score = max(1, min(10, normalized_score))
-        
-        # Generate verdict
-        if normalized_score >= 8:
-            verdict = "Very Favorable"
-            verdict_type = "success"
-        elif normalized_score >= 6:
-            verdict = "Favorable"
-            verdict_type = "success"
-        elif normalized_score >= 4:
-            verdict = "Neutral"
-            verdict_type = "info"
-        elif normalized_score >= 2:
-            verdict = "Challenging"
-            verdict_type = "warning"
-        else:
-            verdict = "Very Challenging"
-            verdict_type = "warning"
+        scores = score_components(heaven_stem, earth_stem, star, door)
+        normalized_score = scores["normalized"]
+        verdict = scores["verdict"]
+        verdict_type = scores["verdict_type"]
         
         # Generate summary and advice
-        summary = self._generate_summary(heaven_stem, door, star, deity)
+        summary = self._generate_summary(heaven_stem, door, star, deity, formations)
         advice = self._generate_advice(door, star, normalized_score)
         
-        return {
+        result = {
             "palace": {
                 "number": self.palace_num,
                 "name": self.palace_info["name"],
@@ -620,11 +1064,15 @@ class ChartProcessor:
                 "date": "",  # To be filled by caller
                 "time": "",  # To be filled by caller
                 "chinese_hour": self.raw.get("_metadata", {}).get("chinese_hour", ""),
+                "calculation_path": self.raw.get("_metadata", {}).get("calculation_path", ""),
+                "chart_type": self.raw.get("_metadata", {}).get("chart_type", "hour"),
                 "method": structure["method"],
                 "structure": structure["structure_chinese"],
                 "ju_number": structure["ju_number"],
                 "solar_term": structure["solar_term"],
-                "gangzhi": structure["gangzhi"]
+                "gangzhi": structure["gangzhi"],
+                "chart_id": self.chart_id,
+                "reading_id": None if self.chart_id is None else reading_id(self.chart_id, self.palace_num)
             },
             "components": {
                 "heaven_stem": heaven_stem,
@@ -633,23 +1081,22 @@ class ChartProcessor:
                 "door": door,
                 "deity": deity
             },
-            "scores": {
-                "component_total": total_score,
-                "normalized": normalized_score,
-                "verdict": verdict,
-                "verdict_type": verdict_type
-            },
+            "scores": scores,
             "guidance": {
                 "verdict": verdict,
                 "type": verdict_type,
                 "summary": summary,
                 "advice": advice
             },
-            "raw_chart": self.raw
+            "formations": formations
         }
+        if include_raw:
+            result["raw_chart"] = self.raw
+        return result
     
     def _generate_summary(self, heaven_stem: Dict, door: Dict, 
-                          star: Dict, deity: Dict) -> str:
+                          star: Dict, deity: Dict,
+                          formations: Optional[List[Dict]] = None) -> str:
         """Generate human-readable summary"""
         door_name = door.get("friendly_name", door.get("name", "Unknown"))
         star_name = star.get("name", "Unknown")
@@ -659,11 +1106,18 @@ class ChartProcessor:
         star_nature = star.get("nature", "Neutral")
         
         if door_nature == "Auspicious" and star_nature == "Auspicious":
-            return f"{door_name} Door with {star_name} Star creates a favorable combination. {deity_name} Spirit adds supportive energy."
+            summary = f"{door_name} Door with {star_name} Star creates a favorable combination. {deity_name} Spirit adds supportive energy."
         elif door_nature == "Inauspicious" or star_nature == "Inauspicious":
-            return f"{door_name} Door with {star_name} Star suggests caution. Consider timing and approach carefully."
+            summary = f"{door_name} Door with {star_name} Star suggests caution. Consider timing and approach carefully."
         else:
-            return f"{door_name} Door with {star_name} Star indicates balanced energy. Proceed with awareness."
+            summary = f"{door_name} Door with {star_name} Star indicates balanced energy. Proceed with awareness."
+        
+        # Mention the first formation (catalog order puts stem patterns first)
+        if formations:
+            f = formations[0]
+            summary += f" {f['chinese']} {f['name']}: {f['description']}"
+        
+        return summary
     
     def _generate_advice(self, door: Dict, star: Dict, score: float) -> str:
         """Generate actionable advice"""
@@ -690,6 +1144,151 @@ class ChartProcessor:
             return f"{base_advice} Consider waiting for more favorable conditions."
 
 
+# ============================================================================
+# SHARED ENGINE
+# ============================================================================
+
+_shared_engine: Optional[QMDJEngine] = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_shared_engine() -> QMDJEngine:
+    """Return the process-wide engine (with chart cache), creating it once"""
+    global _shared_engine
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = QMDJEngine(
+                    cache_size=DEFAULT_CACHE_SIZE,
+                    kinqimen_timeout=DEFAULT_KINQIMEN_TIMEOUT,
+                    disk_cache=get_disk_cache()
+                )
+    return _shared_engine
+
+
+# ============================================================================
+# CONTENT IDS
+# ============================================================================
+
+# Chart ids: method (1, 2) x plate layout (qmdj_plates.layout_id)
+CHART_ID_COUNT = len(METHOD_NAMES) * LAYOUT_COUNT
+
+# Reading ids per profile code: every (chart id, palace) pair
+READING_ID_SPAN = CHART_ID_COUNT * 9
+
+_JU_NUMERALS = {str(n): n for n in range(1, 10)}
+_JU_NUMERALS.update({c: n for n, c in enumerate("一二三四五六七八九", 1)})
+
+
+def parse_ju(paiju: str) -> int:
+    """Ju number of an 排局 string ("陽遁第5局上元" or kinqimen's "陽遁五局上元")"""
+    for char in reversed(paiju.split("局")[0]):
+        if char in _JU_NUMERALS:
+            return _JU_NUMERALS[char]
+    return 1
+
+
+def chart_id(raw_chart: Dict) -> Optional[int]:
+    """
+    Content-addressed id (0-2159) of a chart: method, Dun, Ju and the
+    stem-branch of the chart's own pillar (the hour for Hour charts).
+    
+    Equal ids mean equal plates, void (旬空) and the 驛馬 and 丁馬 horse
+    branches, so scores, formations and the grid image are equal too.
+    The id does not fix 天馬 (taken from the month branch) or the solar
+    term (節氣); anything keyed on it must not rely on those fields.
+    None when the chart lacks a structure or stem-branch.
+    """
+    paiju = raw_chart.get("排局", "")
+    gz = ganzhi_index(raw_chart.get("干支", "")[-3:-1])
+    if not paiju or gz is None:
+        return None
+    method = METHOD_CODES.get(raw_chart.get("排盤方式", ""), 1)
+    return (method - 1) * LAYOUT_COUNT + layout_id("陽" in paiju, parse_ju(paiju), gz)
+
+
+def chart_id_parts(chart_id: int) -> Tuple[int, bool, int, int]:
+    """Inverse of chart_id(): (method, is_yang, ju, ganzhi index)"""
+    method_index, plate_id = divmod(chart_id, LAYOUT_COUNT)
+    return (method_index + 1,) + layout_from_id(plate_id)
+
+
+def reading_id(chart_id: int, palace: int, profile_hash: int = 0) -> int:
+    """
+    Content-addressed id of a reading: chart id, palace and profile code
+    (profile_fanout.profile_hash; 0 = no profile). Readings without a
+    profile get ids below READING_ID_SPAN.
+    """
+    return profile_hash * READING_ID_SPAN + chart_id * 9 + palace - 1
+
+
+def reading_id_parts(reading_id: int) -> Tuple[int, int, int]:
+    """Inverse of reading_id(): (chart id, palace, profile hash)"""
+    profile_hash, rest = divmod(reading_id, READING_ID_SPAN)
+    chart, palace_index = divmod(rest, 9)
+    return chart, palace_index + 1, profile_hash
+
+
+# ============================================================================
+# CHART REFERENCES
+# ============================================================================
+
+def chart_key(date: datetime, method: int = 1, chart_type: str = "hour") -> Tuple:
+    """
+    Effective identity of the chart for a moment: every datetime with the
+    same key gets the same chart (same shichen for Hour charts, same
+    period for Day, Month and Year charts).
+    
+    On a day a solar term begins, Hour keys keep the minute, since a term
+    starting partway through a shichen changes the Ju (see get_chart).
+    """
+    if chart_type == "hour":
+        if is_term_start(date.date()):
+            return ("hour", date.year, date.month, date.day, date.hour, date.minute, method)
+        return ("hour", date.year, date.month, date.day, shichen_hour(date.hour), method)
+    _, layout = chart_layout(chart_type, date.year, date.month, date.day, date.hour)
+    return (chart_type, layout.period, method)
+
+
+def set_reading_time(readings: Dict[int, Dict], date: datetime) -> None:
+    """Update the display date and time of already generated readings in place"""
+    for reading in readings.values():
+        reading["metadata"]["date"] = date.strftime("%Y-%m-%d")
+        reading["metadata"]["time"] = date.strftime("%H:%M")
+
+
+def make_chart_ref(date: datetime, method: int = 1, chart_type: str = "hour") -> Dict:
+    """Small, JSON-safe reference to the chart a reading was built from"""
+    return {"datetime": date.strftime("%Y-%m-%d %H:%M"), "method": method, "chart_type": chart_type}
+
+
+def resolve_raw_chart(reading: Dict, engine: Optional[QMDJEngine] = None) -> Dict:
+    """
+    Return the raw chart behind a reading.
+    
+    Readings that embed "raw_chart" return it directly; slim readings are
+    resolved from their "chart_ref" through the engine (and its cache).
+    """
+    if "raw_chart" in reading:
+        return reading["raw_chart"]
+    
+    ref = reading.get("chart_ref")
+    if not ref:
+        return {}
+    
+    date = datetime.strptime(ref["datetime"], "%Y-%m-%d %H:%M")
+    engine = engine or get_shared_engine()
+    return engine.get_chart(
+        year=date.year,
+        month=date.month,
+        day=date.day,
+        hour=date.hour,
+        minute=date.minute,
+        method=ref.get("method", 1),
+        chart_type=ref.get("chart_type", "hour")
+    )
+
+
 # ============================================================================
 # MAIN INTERFACE FUNCTION
 # ============================================================================
@@ -698,7 +1297,12 @@ def generate_qmdj_reading(
     date: datetime,
     palace: int = 5,
     method: int = 1,
-    timezone_offset: int = 8
+    timezone_offset: int = 8,
+    engine: Optional[QMDJEngine] = None,
+    include_timings: bool = False,
+    timeout: Optional[float] = None,
+    include_raw_chart: bool = True,
+    chart_type: str = "hour"
 ) -> Dict:
     """
     Main function to generate a complete QMDJ reading.
@@ -708,59 +1312,125 @@ def generate_qmdj_reading(
         palace: Palace number (1-9) to analyze
         method: 1 = Chai Bu, 2 = Zhi Run
         timezone_offset: Hours offset from UTC (default 8 for Singapore)
+        engine: Engine to use (default: the shared, cached engine)
+        include_timings: Attach per-stage milliseconds as metadata["timings_ms"]
+        timeout: kinqimen time budget in seconds (default: engine setting)
+        include_raw_chart: Embed the raw chart; when False a "chart_ref" is
+            attached instead (resolve with resolve_raw_chart)
+        chart_type: "hour", "day", "month" or "year"
     
     Returns:
         Complete processed chart data ready for display and export
     """
-    engine = QMDJEngine()
+    timings = {} if include_timings else None
+    
+    with stage_timer("total", timings):
+        with stage_timer("engine_construction", timings):
+            engine = engine or get_shared_engine()
+        
+        # Get raw chart
+        raw_chart = engine.get_chart(
+            year=date.year,
+            month=date.month,
+            day=date.day,
+            hour=date.hour,
+            minute=date.minute,
+            method=method,
+            timings=timings,
+            timeout=timeout,
+            chart_type=chart_type
+        )
+        
+        # Process for selected palace
+        with stage_timer("chart_processing", timings):
+            processor = ChartProcessor(raw_chart, palace)
+            result = processor.get_full_palace_data(include_raw=include_raw_chart)
+        
+        with stage_timer("metadata_formatting", timings):
+            # Add date/time metadata
+            result["metadata"]["date"] = date.strftime("%Y-%m-%d")
+            result["metadata"]["time"] = date.strftime("%H:%M")
+            
+            # Add Chinese hour if not already set
+            if not result["metadata"]["chinese_hour"]:
+                ch_char, ch_pinyin, ch_animal = get_chinese_hour(date.hour)
+                result["metadata"]["chinese_hour"] = f"{ch_char}時 ({ch_pinyin} - {ch_animal})"
+            
+            if not include_raw_chart:
+                result["chart_ref"] = make_chart_ref(date, method, chart_type)
     
-    # Get raw chart
+    if timings is not None:
+        result["metadata"]["timings_ms"] = timings
+    
+    return result
+
+
+def generate_all_palace_readings(date: datetime, method: int = 1,
+                                 engine: Optional[QMDJEngine] = None,
+                                 include_raw_chart: bool = True,
+                                 chart_type: str = "hour") -> Dict[int, Dict]:
+    """
+    Generate readings for all 9 palaces from a single chart calculation.
+    
+    Args:
+        date: datetime object for the reading
+        method: 1 = Chai Bu, 2 = Zhi Run
+        engine: Engine to use (default: the shared, cached engine)
+        include_raw_chart: Embed the raw chart; when False each reading
+            carries a "chart_ref" instead
+        chart_type: "hour", "day", "month" or "year"
+    
+    Returns:
+        Dict of palace number (1-9) -> processed reading, same shape as
+        generate_qmdj_reading() output
+    """
+    with stage_timer("engine_construction"):
+        engine = engine or get_shared_engine()
     raw_chart = engine.get_chart(
         year=date.year,
         month=date.month,
         day=date.day,
         hour=date.hour,
         minute=date.minute,
-        method=method
+        method=method,
+        chart_type=chart_type
     )
     
-    # Process for selected palace
-    processor = ChartProcessor(raw_chart, palace)
-    result = processor.get_full_palace_data()
+    date_str = date.strftime("%Y-%m-%d")
+    time_str = date.strftime("%H:%M")
+    ch_char, ch_pinyin, ch_animal = get_chinese_hour(date.hour)
     
-    # Add date/time metadata
-    result["metadata"]["date"] = date.strftime("%Y-%m-%d")
-    result["metadata"]["time"] = date.strftime("%H:%M")
+    chart_ref = None if include_raw_chart else make_chart_ref(date, method, chart_type)
     
-    # Add Chinese hour if not already set
-    if not result["metadata"]["chinese_hour"]:
-        ch_char, ch_pinyin, ch_animal = get_chinese_hour(date.hour)
-        result["metadata"]["chinese_hour"] = f"{ch_char}時 ({ch_pinyin} - {ch_animal})"
+    from .formations import detect_formations
+    formations = detect_formations(raw_chart)
     
-    return result
+    readings = {}
+    for palace_num in range(1, 10):
+        with stage_timer("chart_processing"):
+            result = ChartProcessor(raw_chart, palace_num, formations).get_full_palace_data(
+                include_raw=include_raw_chart
+            )
+        with stage_timer("metadata_formatting"):
+            result["metadata"]["date"] = date_str
+            result["metadata"]["time"] = time_str
+            if not result["metadata"]["chinese_hour"]:
+                result["metadata"]["chinese_hour"] = f"{ch_char}時 ({ch_pinyin} - {ch_animal})"
+            if chart_ref is not None:
+                result["chart_ref"] = dict(chart_ref)
+        readings[palace_num] = result
+    
+    return readings
 
 
-def get_all_palaces_summary(date: datetime, method: int = 1) -> List[Dict]:
+def summarize_palace_readings(readings: Dict[int, Dict]) -> List[Dict]:
     """
-    Get summary of all 9 palaces for overview/recommendation.
+    Build palace summaries from already processed readings.
     
     Returns list of palace summaries sorted by score (best first).
     """
-    engine = QMDJEngine()
-    raw_chart = engine.get_chart(
-        year=date.year,
-        month=date.month,
-        day=date.day,
-        hour=date.hour,
-        minute=date.minute,
-        method=method
-    )
-    
     summaries = []
-    for palace_num in range(1, 10):
-        processor = ChartProcessor(raw_chart, palace_num)
-        data = processor.get_full_palace_data()
-        
+    for palace_num, data in readings.items():
         summaries.append({
             "palace": palace_num,
             "name": data["palace"]["name"],
@@ -777,6 +1447,17 @@ def get_all_palaces_summary(date: datetime, method: int = 1) -> List[Dict]:
     return summaries
 
 
+def get_all_palaces_summary(date: datetime, method: int = 1) -> List[Dict]:
+    """
+    Get summary of all 9 palaces for overview/recommendation.
+    
+    Returns list of palace summaries sorted by score (best first).
+    """
+    return summarize_palace_readings(
+        generate_all_palace_readings(date, method, include_raw_chart=False)
+    )
+
+
 # ============================================================================
 # TEST
 # ============================================================================
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - QMDJ Plate Tables v1.0
+Table-driven plate arrangement for the fallback engine
+
+This module provides:
+1. The solar term (節氣) → Ju mapping and Upper/Middle/Lower Yuan
+2. Precomputed plate sets for every Yin/Yang Dun, Ju and ganzhi
+3. arrange_hour_plates() - Ju and plates for a moment in a few lookups
+4. chart_layout() - Hour, Day, Month and Year charts on the same plates
+
+Plates follow the rotating-plate (轉盤) method: the Chief star follows the
+hour stem, the Chief door advances one palace per hour from the Xun head,
+and the center palace lodges in Kun (寄坤). Solar terms come from
+sexagenary_calendar (20th/21st century formula), so term boundaries are
+day-accurate only.
+
+Day, Month and Year charts reuse the same plate tables, driven by the
+day, month or year ganzhi instead of the hour:
+- Day: Dun and Upper Yuan Ju of the day's solar term
+- Month: Yin Dun; Ju 7/1/4 for 子午卯酉/寅申巳亥/辰戌丑未 years
+- Year: Yin Dun; Ju 1/4/7 for the Upper/Middle/Lower sixty-year Yuan
+"""
+
+from datetime import date as Date, timedelta
+from functools import lru_cache
+import hashlib
+from typing import Dict, Optional, Tuple, NamedTuple
+
+from .sexagenary_calendar import STEM_CHARS, BRANCH_CHARS, ganzhi_name, four_pillars
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Solar term → (Yang Dun, (Upper, Middle, Lower) Yuan Ju numbers)
+TERM_JU = (
+    (True, (2, 8, 5)), (True, (3, 9, 6)), (True, (8, 5, 2)), (True, (9, 6, 3)),
+    (True, (1, 7, 4)), (True, (3, 9, 6)), (True, (4, 1, 7)), (True, (5, 2, 8)),
+    (True, (4, 1, 7)), (True, (5, 2, 8)), (True, (6, 3, 9)), (False, (9, 3, 6)),
+    (False, (8, 2, 5)), (False, (7, 1, 4)), (False, (2, 5, 8)), (False, (1, 4, 7)),
+    (False, (9, 3, 6)), (False, (7, 1, 4)), (False, (6, 9, 3)), (False, (5, 8, 2)),
+    (False, (6, 9, 3)), (False, (5, 8, 2)), (False, (4, 7, 1)), (True, (1, 7, 4))
+)
+
+YUAN_NAMES = ("上", "中", "下")
+
+# Palace number (Luo Shu) → Chinese palace name as used in kinqimen charts
+PALACE_NAMES = ("", "坎", "坤", "震", "巽", "中", "乾", "兌", "艮", "離")
+
+# Outer palaces in clockwise order, starting from Kan (N)
+RING = (1, 8, 3, 4, 9, 2, 7, 6)
+RING_POSITION = {palace: i for i, palace in enumerate(RING)}
+
+# Original (home) palaces of stars and doors
+HOME_STARS = {1: "蓬", 2: "芮", 3: "沖", 4: "輔", 5: "禽", 6: "心", 7: "柱", 8: "任", 9: "英"}
+HOME_DOORS = {1: "休", 2: "死", 3: "傷", 4: "杜", 6: "開", 7: "驚", 8: "生", 9: "景"}
+
+# Earth plate sequence: six Yi (六儀) then three Qi (三奇)
+EARTH_SEQUENCE = "戊己庚辛壬癸丁丙乙"
+
+# Hidden stem of each Xun (甲子戊, 甲戌己, 甲申庚, 甲午辛, 甲辰壬, 甲寅癸)
+XUN_HIDDEN_STEMS = "戊己庚辛壬癸"
+
+# Post Horse by branch trine (申子辰→寅, 巳酉丑→亥, 寅午戌→申, 亥卯未→巳),
+# indexed by branch % 4
+POST_HORSE = (2, 11, 8, 5)
+
+# Chart types, shortest period first
+CHART_TYPES = ("hour", "day", "month", "year")
+
+# Month chart Ju by year branch % 3 (子午卯酉, 辰戌丑未, 寅申巳亥)
+MONTH_CHART_JU = (7, 4, 1)
+
+# Year chart Ju by sixty-year Yuan (Upper Yuan began 1864)
+YEAR_CHART_JU = (1, 4, 7)
+YEAR_CHART_EPOCH = 1864
+
+DEITIES_YANG = "符蛇陰合勾雀地天"
+DEITIES_YIN = "符蛇陰合虎玄地天"
+
+
+# ============================================================================
+# YUAN
+# ============================================================================
+
+def yuan_index(day_idx: int) -> int:
+    """Upper/Middle/Lower Yuan (0/1/2) from the branch of the 符頭 day"""
+    futou_branch = (day_idx - day_idx % 5) % 12
+    return (0, 2, 1)[futou_branch % 3]
+
+
+# ============================================================================
+# PLATE TABLES
+# ============================================================================
+
+class PlateSet(NamedTuple):
+    """Arranged plates for one Dun, Ju and ganzhi (shared, read-only)"""
+    earth: Dict[str, str]
+    sky: Dict[str, str]
+    stars: Dict[str, str]
+    doors: Dict[str, str]
+    deities: Dict[str, str]
+    xun: str           # Xun head, e.g. 甲子
+    xun_stem: str      # Hidden stem of the Xun head
+    void: str          # 旬空 branches
+    chief_star: str
+    chief_star_palace: str
+    chief_door: str
+    chief_door_palace: str
+
+
+def _earth_palaces(is_yang: bool, ju: int) -> Dict[str, int]:
+    """Earth plate as stem → palace number"""
+    step = 1 if is_yang else -1
+    return {
+        stem: (ju - 1 + step * k) % 9 + 1
+        for k, stem in enumerate(EARTH_SEQUENCE)
+    }
+
+
+def _rotate(homes: Dict[int, str], home: int, target: int) -> Dict[str, str]:
+    """Move the ring item at home to target, carrying the others along"""
+    shift = RING_POSITION[target] - RING_POSITION[home]
+    return {
+        PALACE_NAMES[RING[(RING_POSITION[p] + shift) % 8]]: homes[p]
+        for p in RING
+    }
+
+
+def _arrange(is_yang: bool, ju: int, gz: int) -> PlateSet:
+    """Arrange all plates for one Dun, Ju and ganzhi index"""
+    stem_palace = _earth_palaces(is_yang, ju)
+    earth_by_number = {palace: stem for stem, palace in stem_palace.items()}
+    
+    xun = gz - gz % 10
+    xun_stem = XUN_HIDDEN_STEMS[xun // 10]
+    chief_home = stem_palace[xun_stem]
+    home = 2 if chief_home == 5 else chief_home
+    
+    # Chief star follows the stem of the ganzhi (甲 hides under its Xun stem)
+    stem_char = STEM_CHARS[gz % 10]
+    if stem_char == "甲":
+        stem_char = xun_stem
+    star_target = stem_palace[stem_char]
+    if star_target == 5:
+        star_target = 2
+    
+    stars = _rotate(HOME_STARS, home, star_target)
+    stars["中"] = HOME_STARS[5]
+    sky = _rotate(earth_by_number, home, star_target)
+    sky["中"] = earth_by_number[5]
+    
+    # Chief door advances one palace per step from the Xun head
+    step = 1 if is_yang else -1
+    door_target = (chief_home - 1 + step * (gz % 10)) % 9 + 1
+    if door_target == 5:
+        door_target = 2
+    doors = _rotate(HOME_DOORS, home, door_target)
+    
+    # Deities start with 值符 on the Chief star, clockwise in Yang Dun
+    sequence = DEITIES_YANG if is_yang else DEITIES_YIN
+    start = RING_POSITION[star_target]
+    deities = {
+        PALACE_NAMES[RING[(start + step * i) % 8]]: deity
+        for i, deity in enumerate(sequence)
+    }
+    
+    xun_branch = xun % 12
+    return PlateSet(
+        earth={PALACE_NAMES[p]: earth_by_number[p] for p in range(1, 10)},
+        sky=sky,
+        stars=stars,
+        doors=doors,
+        deities=deities,
+        xun=ganzhi_name(xun),
+        xun_stem=xun_stem,
+        void=BRANCH_CHARS[(xun_branch + 10) % 12] + BRANCH_CHARS[(xun_branch + 11) % 12],
+        chief_star=HOME_STARS[chief_home],
+        chief_star_palace=PALACE_NAMES[star_target],
+        chief_door=HOME_DOORS[home],
+        chief_door_palace=PALACE_NAMES[door_target]
+    )
+
+
+# PLATE_TABLE[(is_yang, ju)][ganzhi index] -> PlateSet, built at import
+PLATE_TABLE: Dict[Tuple[bool, int], Tuple[PlateSet, ...]] = {
+    (is_yang, ju): tuple(_arrange(is_yang, ju, gz) for gz in range(60))
+    for is_yang in (True, False)
+    for ju in range(1, 10)
+}
+
+
+# Number of distinct plate layouts (2 Dun x 9 Ju x 60 ganzhi)
+LAYOUT_COUNT = 2 * 9 * 60
+
+
+def get_plates(is_yang: bool, ju: int, gz: int) -> PlateSet:
+    """Precomputed plates for a Dun, Ju and sixty-cycle index"""
+    return PLATE_TABLE[(is_yang, ju)][gz]
+
+
+@lru_cache(maxsize=None)
+def plate_table_hash() -> str:
+    """Short digest of the plate tables; changes whenever the arrangement does"""
+    digest = hashlib.sha1(repr(sorted(PLATE_TABLE.items())).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def layout_id(is_yang: bool, ju: int, gz: int) -> int:
+    """Integer id (0-1079) of a plate layout: Yang Dun first, then Ju, then ganzhi"""
+    return ((0 if is_yang else 9) + ju - 1) * 60 + gz
+
+
+def layout_from_id(plate_id: int) -> Tuple[bool, int, int]:
+    """Inverse of layout_id(): (is_yang, ju, gz)"""
+    dun_ju, gz = divmod(plate_id, 60)
+    return dun_ju < 9, dun_ju % 9 + 1, gz
+
+
+# ============================================================================
+# HOUR CHARTS
+# ============================================================================
+
+class HourPillars(NamedTuple):
+    """Calendar facts needed to lay out an hour chart"""
+    year: int
+    month: int
+    day: int
+    hour: int
+    term: int
+    is_yang: bool
+    ju: int
+    yuan: int
+    solar_year: int
+    day_number: int  # Ordinal of the chart day
+    
+    @property
+    def ganzhi(self) -> str:
+        """Four pillars in kinqimen format, e.g. 甲辰年丙子月壬午日丁未時"""
+        return self.ganzhi_to("hour")
+    
+    def ganzhi_to(self, chart_type: str) -> str:
+        """Pillars down to the chart type's level, e.g. 甲辰年丙子月 for a Month chart"""
+        parts = (
+            (self.year, "年", "year"),
+            (self.month, "月", "month"),
+            (self.day, "日", "day"),
+            (self.hour, "時", "hour")
+        )
+        text = ""
+        for index, suffix, level in parts:
+            text += ganzhi_name(index) + suffix
+            if level == chart_type:
+                break
+        return text
+
+
+@lru_cache(maxsize=8192)
+def hour_pillars(year: int, month: int, day: int, hour: int) -> HourPillars:
+    """Pillars, solar term and Ju for a clock time (23:00 starts the next day)"""
+    p = four_pillars(year, month, day, hour)
+    yuan = yuan_index(p.day)
+    is_yang, ju_numbers = TERM_JU[p.term]
+    
+    return HourPillars(
+        year=p.year,
+        month=p.month,
+        day=p.day,
+        hour=p.hour,
+        term=p.term,
+        is_yang=is_yang,
+        ju=ju_numbers[yuan],
+        yuan=yuan,
+        solar_year=p.solar_year,
+        day_number=Date(year, month, day).toordinal() + (hour >= 23)
+    )
+
+
+def arrange_hour_plates(year: int, month: int, day: int, hour: int) -> Tuple[HourPillars, PlateSet]:
+    """Pillars and precomputed plates for an hour chart"""
+    pillars = hour_pillars(year, month, day, hour)
+    return pillars, get_plates(pillars.is_yang, pillars.ju, pillars.hour)
+
+
+def horse_stars(month_gz: int, chart_gz: int) -> Dict[str, str]:
+    """Sky, Ding and Post Horse (天馬, 丁馬, 驛馬) branches for a chart"""
+    month_branch = month_gz % 12
+    xun = chart_gz - chart_gz % 10
+    return {
+        "天馬": BRANCH_CHARS[(2 * (month_branch % 6) + 2) % 12],
+        "丁馬": BRANCH_CHARS[(xun + 3) % 12],
+        "驛馬": BRANCH_CHARS[POST_HORSE[chart_gz % 12 % 4]]
+    }
+
+
+# ============================================================================
+# CHART LAYOUTS
+# ============================================================================
+
+class ChartLayout(NamedTuple):
+    """Which plates a chart uses and the period it is valid for"""
+    chart_type: str
+    period: Tuple         # Cache key of the chart's natural period
+    is_yang: bool
+    ju: int
+    ganzhi: int           # Sixty-cycle index driving the plates
+    yuan: Optional[int]   # Hour charts only
+
+
+def chart_layout(chart_type: str, year: int, month: int, day: int,
+                 hour: int) -> Tuple[HourPillars, ChartLayout]:
+    """
+    Pillars and plate layout for an Hour, Day, Month or Year chart.
+    
+    Day, Month and Year charts depend only on their period, so the
+    returned layout.period identifies every moment sharing the chart.
+    """
+    if chart_type == "hour":
+        pillars = hour_pillars(year, month, day, hour)
+        return pillars, ChartLayout(
+            "hour", (pillars.day_number, hour), pillars.is_yang, pillars.ju,
+            pillars.hour, pillars.yuan
+        )
+    
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Unknown chart type: {chart_type}")
+    
+    # Period charts are read from the chart day at noon (23:00 starts the next day)
+    chart_day = Date(year, month, day)
+    if hour >= 23:
+        chart_day += timedelta(days=1)
+    pillars = hour_pillars(chart_day.year, chart_day.month, chart_day.day, 12)
+    
+    if chart_type == "day":
+        is_yang, ju_numbers = TERM_JU[pillars.term]
+        layout = ChartLayout("day", (pillars.day_number,), is_yang, ju_numbers[0],
+                             pillars.day, None)
+    elif chart_type == "month":
+        ju = MONTH_CHART_JU[pillars.year % 12 % 3]
+        layout = ChartLayout("month", (pillars.solar_year, pillars.month % 12), False, ju,
+                             pillars.month, None)
+    else:
+        ju = YEAR_CHART_JU[(pillars.solar_year - YEAR_CHART_EPOCH) // 60 % 3]
+        layout = ChartLayout("year", (pillars.solar_year,), False, ju,
+                             pillars.year, None)
+    
+    return pillars, layout
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Report Builder v1.0
+Printable client reports, one or thousands at a time
+
+This module provides:
+1. ReportJob / Report - a (client, datetime, palace, profile) job and its file
+2. build_report() - one HTML or PDF report (grid image, palace details, BaZi)
+3. build_reports() - a batch spread over a process pool, with progress
+4. write_reports_zip() - every report of a batch in one archive
+
+HTML is filled from a string.Template with the grid PNG embedded; PDF is
+drawn with matplotlib's PDF backend on an A4 figure. Jobs are grouped by
+chart before they are handed to workers, so jobs sharing a chart land in
+the same process and reuse its cached chart, reading and grid image.
+"""
+
+import base64
+import html
+import io
+import os
+import re
+import textwrap
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from string import Template
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, NamedTuple, BinaryIO
+
+from matplotlib.figure import Figure
+from matplotlib.image import imread
+
+from .qmdj_engine import (
+    chart_key,
+    generate_qmdj_reading,
+    resolve_raw_chart
+)
+from .chart_image import render_reading_grid, _CJK_FONT
+from .profile_fanout import score_profiles_for_chart
+from .formations import formation_names
+
+# Supported output formats
+REPORT_FORMATS = {
+    "html": {"label": "HTML", "extension": "html", "mime": "text/html"},
+    "pdf": {"label": "PDF", "extension": "pdf", "mime": "application/pdf"}
+}
+
+# Batches smaller than this are rendered in the calling process
+MIN_POOL_JOBS = 8
+
+# Jobs handed to a worker at a time (whole charts are never split)
+CHUNK_SIZE = 16
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# A4 portrait, inches
+PDF_PAGE_SIZE = (8.27, 11.69)
+
+# Called with (reports done, reports total)
+ProgressCallback = Callable[[int, int], None]
+
+
+class ReportJob(NamedTuple):
+    """
+    One report to produce.
+    
+    profile accepts calculate_bazi_profile output or the session profile
+    of the Settings/BaZi pages; None leaves the BaZi section out.
+    """
+    client: str
+    when: datetime
+    palace: int = 5
+    profile: Optional[Dict] = None
+    method: int = 1
+
+
+class Report(NamedTuple):
+    """A finished report file"""
+    job: ReportJob
+    filename: str
+    mime: str
+    data: bytes
+
+
+def _slug(text: str) -> str:
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", text).strip("_")
+    return slug or "client"
+
+
+def report_filename(job: ReportJob, fmt: str, index: Optional[int] = None) -> str:
+    """client_YYYYMMDD_HHMM_pN.ext, prefixed with the batch position when given"""
+    name = f"{_slug(job.client)}_{job.when:%Y%m%d_%H%M}_p{job.palace}"
+    if index is not None:
+        name = f"{index + 1:04d}_{name}"
+    return f"{name}.{REPORT_FORMATS[fmt]['extension']}"
+
+
+# ============================================================================
+# REPORT CONTENT
+# ============================================================================
+
+def _profile_lines(profile: Dict) -> List[Tuple[str, str]]:
+    """(label, value) rows for either profile shape"""
+    day_master = profile.get("day_master", "")
+    if isinstance(day_master, dict):
+        strength = day_master.get("strength", "")
+        day_master = f"{day_master.get('chinese', '')} {day_master.get('pinyin', '')} " \
+                     f"({day_master.get('polarity', '')} {day_master.get('element', '')})"
+    else:
+        strength = profile.get("strength", "")
+        day_master = f"{day_master} ({profile.get('polarity', '')} {profile.get('element', '')})"
+    
+    useful = profile.get("useful_gods") or {}
+    if isinstance(useful, dict):
+        favorable = [e for e in (useful.get("primary"), useful.get("secondary")) if e]
+        unfavorable = useful.get("unfavorable", [])
+    else:
+        favorable = list(useful)
+        unfavorable = profile.get("unfavorable", [])
+    
+    return [
+        ("Day Master", day_master.strip()),
+        ("Strength", str(strength)),
+        ("Useful elements", ", ".join(favorable) or "-"),
+        ("Unfavorable elements", ", ".join(unfavorable) or "-")
+    ]
+
+
+def _report_content(job: ReportJob) -> Dict:
+    """Reading, grid image and BaZi alignment for one job (all from shared caches)"""
+    reading = generate_qmdj_reading(job.when, palace=job.palace, method=job.method,
+                                    include_raw_chart=False)
+    content = {"reading": reading, "png": render_reading_grid(reading),
+               "profile": None, "alignment": None}
+    
+    if job.profile:
+        raw_chart = resolve_raw_chart(reading)
+        content["profile"] = _profile_lines(job.profile)
+        content["alignment"] = score_profiles_for_chart(raw_chart, [job.profile],
+                                                        palaces=(job.palace,))[0]
+    return content
+
+
+# ============================================================================
+# HTML
+# ============================================================================
+
+HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Ming Qimen Report - $client</title>
+<style>
+body { font-family: "Noto Sans CJK SC", "PingFang SC", "Microsoft YaHei", sans-serif;
+       color: #222; max-width: 820px; margin: 24px auto; }
+h1 { margin-bottom: 0; }
+.subtitle { color: #666; margin-top: 4px; }
+.grid { width: 100%; max-width: 600px; display: block; margin: 16px auto; }
+.verdict { font-size: 1.2em; font-weight: bold; }
+table { border-collapse: collapse; width: 100%; margin: 8px 0 16px; }
+th, td { border: 1px solid #ddd; padding: 6px 8px; text-align: left; }
+th { background: #f5f5f5; width: 30%; }
+@media print { body { margin: 0; } .page { page-break-after: always; } }
+</style>
+</head>
+<body>
+<div class="page">
+<h1>Ming Qimen 明奇门 Report</h1>
+<p class="subtitle">$client &middot; $when &middot; $chinese_hour &middot; $method $structure $ju_number局 &middot; $solar_term</p>
+<img class="grid" src="data:image/png;base64,$grid" alt="Nine palace grid">
+<h2>$icon $topic &middot; Palace $palace_number $palace_name ($direction, $element)</h2>
+<p class="verdict">$verdict &middot; $score/10</p>
+<table>
+$components
+</table>
+<h3>Formations</h3>
+<p>$formations</p>
+<h3>Guidance</h3>
+<p>$summary</p>
+<p><b>$advice</b></p>
+$bazi
+<p class="subtitle">Generated $generated</p>
+</div>
+</body>
+</html>
+""")
+
+
+def _html_rows(rows: Iterable[Tuple[str, str]]) -> str:
+    return "\n".join(f"<tr><th>{html.escape(label)}</th><td>{html.escape(value)}</td></tr>"
+                     for label, value in rows)
+
+
+def _component_rows(reading: Dict) -> List[Tuple[str, str]]:
+    comp = reading["components"]
+    return [
+        ("Heaven Stem 天盤", f"{comp['heaven_stem']['character']} {comp['heaven_stem']['pinyin']} "
+                            f"({comp['heaven_stem']['element']}, {comp['heaven_stem']['strength_in_palace']})"),
+        ("Earth Stem 地盤", f"{comp['earth_stem']['character']} {comp['earth_stem']['pinyin']} "
+                           f"({comp['earth_stem']['element']}, {comp['earth_stem']['strength_in_palace']})"),
+        ("Star 星", f"{comp['star']['chinese']} {comp['star']['name']} ({comp['star']['nature']})"),
+        ("Door 門", f"{comp['door']['chinese']} {comp['door']['friendly_name']} ({comp['door']['nature']})"),
+        ("Deity 神", f"{comp['deity']['chinese']} {comp['deity']['name']} ({comp['deity']['nature']})")
+    ]
+
+
+def render_report_html(job: ReportJob, content: Dict) -> str:
+    """Fill the HTML template for one job"""
+    reading = content["reading"]
+    meta = reading["metadata"]
+    palace = reading["palace"]
+    
+    bazi = ""
+    if content["profile"]:
+        alignment = content["alignment"]
+        rows = content["profile"] + [("Alignment", f"{alignment['score']}/10 {alignment['verdict']}")]
+        bazi = f"<h3>BaZi Profile</h3>\n<table>\n{_html_rows(rows)}\n</table>"
+    
+    esc = html.escape
+    return HTML_TEMPLATE.substitute(
+        client=esc(job.client),
+        when=f"{job.when:%Y-%m-%d %H:%M}",
+        chinese_hour=esc(meta["chinese_hour"]),
+        method=esc(meta["method"]),
+        structure=esc(meta["structure"]),
+        ju_number=meta["ju_number"],
+        solar_term=esc(meta["solar_term"]),
+        grid=base64.b64encode(content["png"]).decode("ascii"),
+        icon=palace["icon"],
+        topic=esc(palace["topic"]),
+        palace_number=palace["number"],
+        palace_name=esc(f"{palace['chinese']} {palace['name']}"),
+        direction=esc(palace["direction"]),
+        element=esc(palace["element"]),
+        verdict=esc(reading["scores"]["verdict"]),
+        score=reading["scores"]["normalized"],
+        components=_html_rows(_component_rows(reading)),
+        formations=esc(formation_names(reading.get("formations", [])) or "None"),
+        summary=esc(reading["guidance"]["summary"]),
+        advice=esc(reading["guidance"]["advice"]),
+        bazi=bazi,
+        generated=datetime.now().strftime("%Y-%m-%d %H:%M")
+    )
+
+
+# ============================================================================
+# PDF
+# ============================================================================
+
+_CJK_CHARS = re.compile(r"[\u2e80-\u9fff\uf900-\ufaff\uff00-\uffef]+")
+
+
+def _pdf_text(text: str) -> str:
+    """Drop Chinese characters when no CJK font is installed (they would render as boxes)"""
+    if _CJK_FONT:
+        return text
+    return re.sub(r"\s{2,}", " ", _CJK_CHARS.sub("", text)).strip()
+
+
+def render_report_pdf(job: ReportJob, content: Dict) -> bytes:
+    """Draw one job as a single A4 page with the PDF backend"""
+    reading = content["reading"]
+    meta = reading["metadata"]
+    palace = reading["palace"]
+    scores = reading["scores"]
+    font = {"family": _CJK_FONT} if _CJK_FONT else {}
+    
+    figure = Figure(figsize=PDF_PAGE_SIZE)
+    figure.text(0.5, 0.965, _pdf_text(f"Ming Qimen Report - {job.client}"),
+                ha="center", fontsize=16, fontweight="bold", **font)
+    figure.text(0.5, 0.945, _pdf_text(
+        f"{job.when:%Y-%m-%d %H:%M}  |  {meta['chinese_hour']}  |  {meta['method']} "
+        f"{meta['structure']} Ju {meta['ju_number']}  |  {meta['solar_term']}"
+    ), ha="center", fontsize=9, color="#555555", **font)
+    
+    grid = figure.add_axes((0.2, 0.56, 0.6, 0.37))
+    grid.imshow(imread(io.BytesIO(content["png"]), format="png"))
+    grid.axis("off")
+    
+    lines = [
+        (f"{palace['topic']} - Palace {palace['number']} {palace['name']} "
+         f"({palace['direction']}, {palace['element']})", 12, "bold"),
+        (f"{scores['verdict']}  {scores['normalized']}/10", 11, "bold")
+    ]
+    lines += [(f"{label}: {value}", 9, "normal") for label, value in _component_rows(reading)]
+    
+    names = [f["chinese"] + " " + f["name"] if _CJK_FONT else f["name"]
+             for f in reading.get("formations", [])]
+    lines.append((f"Formations: {', '.join(names) or 'None'}", 9, "normal"))
+    for paragraph in (reading["guidance"]["summary"], reading["guidance"]["advice"]):
+        for line in textwrap.wrap(_pdf_text(paragraph), 95):
+            lines.append((line, 9, "normal"))
+    
+    if content["profile"]:
+        alignment = content["alignment"]
+        lines.append(("BaZi Profile", 11, "bold"))
+        lines += [(f"{label}: {value}", 9, "normal") for label, value in content["profile"]]
+        lines.append((f"Alignment: {alignment['score']}/10 {alignment['verdict']}", 9, "normal"))
+    
+    y = 0.53
+    for text, size, weight in lines:
+        figure.text(0.08, y, _pdf_text(text), fontsize=size, fontweight=weight, **font)
+        y -= 0.024 if size > 9 else 0.019
+    
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="pdf")
+    return buffer.getvalue()
+
+
+# ============================================================================
+# BATCHES
+# ============================================================================
+
+def build_report(job: ReportJob, fmt: str = "html", index: Optional[int] = None) -> Report:
+    """Render one report in the calling process"""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    
+    content = _report_content(job)
+    if fmt == "html":
+        data = render_report_html(job, content).encode("utf-8")
+    else:
+        data = render_report_pdf(job, content)
+    return Report(job, report_filename(job, fmt, index), REPORT_FORMATS[fmt]["mime"], data)
+
+
+def _render_chunk(fmt: str, items: List[Tuple[int, ReportJob]]) -> List[Tuple[int, Report]]:
+    """Worker entry point: render a chunk of (batch index, job) pairs"""
+    return [(index, build_report(job, fmt, index)) for index, job in items]
+
+
+def _chunks(jobs: List[ReportJob], chunk_size: int) -> List[List[Tuple[int, ReportJob]]]:
+    """Group jobs by chart, then pack whole groups into chunks of about chunk_size"""
+    groups: Dict[Tuple, List[Tuple[int, ReportJob]]] = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault(chart_key(job.when, job.method), []).append((index, job))
+    
+    chunks, current = [], []
+    for group in groups.values():
+        current.extend(group)
+        if len(current) >= chunk_size:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_reports(
+    jobs: Iterable[ReportJob],
+    fmt: str = "html",
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> List[Report]:
+    """
+    Render a batch of reports.
+    
+    Args:
+        jobs: Reports to produce
+        fmt: "html" or "pdf"
+        workers: Worker processes (default: DEFAULT_WORKERS); 1 renders inline
+        progress: Called with (done, total) as reports finish
+        chunk_size: Jobs per worker task
+    
+    Returns:
+        Reports in job order; file names are prefixed with the batch position
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {fmt}")
+    
+    jobs = list(jobs)
+    total = len(jobs)
+    workers = workers or DEFAULT_WORKERS
+    results: List[Optional[Report]] = [None] * total
+    done = 0
+    
+    if progress:
+        progress(0, total)
+    
+    if workers > 1 and total >= MIN_POOL_JOBS:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_render_chunk, fmt, chunk)
+                           for chunk in _chunks(jobs, chunk_size)]
+                for future in as_completed(futures):
+                    for index, report in future.result():
+                        results[index] = report
+                        done += 1
+                    if progress:
+                        progress(done, total)
+        except (BrokenProcessPool, OSError) as e:
+            # No usable pool (sandboxed or resource-limited host): finish inline
+            print(f"Report pool unavailable, rendering inline: {e}")
+    
+    for index, job in enumerate(jobs):
+        if results[index] is None:
+            results[index] = build_report(job, fmt, index)
+            done += 1
+            if progress:
+                progress(done, total)
+    
+    return results
+
+
+def write_reports_zip(reports: Iterable[Report], fileobj: BinaryIO) -> None:
+    """Write reports into a ZIP archive"""
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for report in reports:
+            archive.writestr(report.filename, report.data)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from datetime import timedelta
+    from .qmdj_engine import SGT
+    from .bazi_engine import get_bazi_profile
+    
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "pdf"
+    start = datetime.now(SGT).replace(minute=0, second=0, microsecond=0)
+    profile = get_bazi_profile(1990, 5, 1, 10)
+    batch = [ReportJob(f"Client {i}", start + timedelta(hours=2 * (i % 6)), 1 + i % 9,
+                       profile if i % 2 else None)
+             for i in range(36)]
+    
+    for workers in (1, DEFAULT_WORKERS):
+        started = time.perf_counter()
+        reports = build_reports(batch, fmt, workers=workers)
+        elapsed = (time.perf_counter() - started) * 1000
+        size = sum(len(report.data) for report in reports)
+        print(f"{len(reports)} {fmt} reports with {workers} worker(s): "
+              f"{elapsed:.0f} ms, {size // 1024} KB")
@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Universal Schema v2.0
+Export documents for the Analyst Engine, built and validated in bulk
+
+This module provides:
+1. build_document() / iter_documents() - Universal Schema v2.0 documents
+   straight from processed readings and BaZi profiles
+2. validate_document() / validate_documents() - a validator compiled from
+   SCHEMA once at import, with a batch mode for bulk ingest
+3. tracking_row() - the flat tracking row of a document (TRACKING_FIELDS)
+
+Documents are built in a single pass over the reading; the BaZi alignment
+comes from profile_fanout, so a batch decodes each chart once and packs
+the profile once. SCHEMA is a nested description of the document; at
+import it is turned into a tree of small check functions, so validating
+a document is one walk over it with no spec interpretation.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, NamedTuple
+
+from .qmdj_engine import (
+    PATH_KINQIMEN,
+    PATH_PERIOD_TABLES,
+    PALACE_INFO,
+    reading_id,
+    resolve_raw_chart
+)
+from .profile_fanout import (
+    ChartElements,
+    profile_hash,
+    profile_signature,
+    structure_adjustment
+)
+from .bazi_calculator_core import get_alignment_verdict
+
+SCHEMA_VERSION = "2.0"
+SCHEMA_NAME = "QMDJ_BaZi_Integrated_Data_Schema"
+
+METHOD_LABELS = {"拆補": "Chai Bu", "置閏": "Zhi Run"}
+
+# Columns of the tracking row (CSV export of one document)
+TRACKING_FIELDS = [
+    "reading_id", "chart_id", "date_time", "palace", "formation",
+    "qmdj_score", "bazi_score", "verdict", "status"
+]
+
+# Errors reported per document before the rest are skipped
+MAX_ERRORS_PER_DOCUMENT = 20
+
+
+# ============================================================================
+# BUILDER
+# ============================================================================
+
+def _bazi_section(profile: Dict) -> Dict:
+    """bazi_data from calculate_bazi_profile output or a Settings/BaZi page profile"""
+    day_master = profile.get("day_master", "")
+    if isinstance(day_master, dict):
+        stem = f"{day_master.get('pinyin', '')} {day_master.get('chinese', '')}".strip()
+        element = day_master.get("element", "")
+        polarity = day_master.get("polarity", "")
+        strength = day_master.get("strength", "")
+        strength_score = day_master.get("strength_score", 5)
+        source = "BaZi Calculator"
+    else:
+        stem = day_master
+        element = profile.get("element", "")
+        polarity = profile.get("polarity", "")
+        strength = profile.get("strength", "")
+        strength_score = profile.get("strength_score", 5)
+        source = "User Profile"
+    
+    useful = profile.get("useful_gods") or {}
+    if isinstance(useful, dict):
+        primary, secondary = useful.get("primary") or "", useful.get("secondary") or ""
+        unfavorable = list(useful.get("unfavorable", []))
+    else:
+        primary = useful[0] if len(useful) > 0 else ""
+        secondary = useful[1] if len(useful) > 1 else ""
+        unfavorable = list(profile.get("unfavorable", []))
+    
+    structures = profile.get("special_structures")
+    if not isinstance(structures, dict):
+        structures = profile
+    
+    return {
+        "chart_source": source,
+        "day_master": {
+            "stem": stem,
+            "element": element,
+            "polarity": polarity,
+            "strength": strength,
+            "strength_score": strength_score
+        },
+        "useful_gods": {"primary": primary, "secondary": secondary},
+        "unfavorable_elements": {
+            "primary": unfavorable[0] if unfavorable else "",
+            "all": unfavorable
+        },
+        "special_structures": {
+            "wealth_vault": bool(structures.get("wealth_vault", False)),
+            "nobleman_present": bool(structures.get("nobleman_present", structures.get("nobleman", False))),
+            "six_clashes": bool(structures.get("six_clashes", False))
+        }
+    }
+
+
+def build_document(
+    reading: Dict,
+    profile: Optional[Dict] = None,
+    purpose: str = "Forecasting",
+    chart: Optional[ChartElements] = None,
+    exported_at: Optional[str] = None
+) -> Dict:
+    """
+    Universal Schema v2.0 document for one reading.
+    
+    Args:
+        reading: Processed reading (full or slim)
+        profile: Optional BaZi profile (either shape, see profile_signature)
+        purpose: Free-text purpose recorded in the metadata
+        chart: Decoded chart of the reading, when the caller already has it
+        exported_at: Export timestamp (default: now)
+    """
+    meta = reading["metadata"]
+    palace = reading["palace"]
+    comp = reading["components"]
+    scores = reading["scores"]
+    palace_num = palace["number"]
+    
+    chart_id = meta.get("chart_id")
+    doc_reading_id = meta.get("reading_id")
+    qmdj_score = scores["normalized"]
+    alignment = None
+    bazi = None
+    
+    if profile:
+        if chart is None:
+            chart = ChartElements(resolve_raw_chart(reading))
+        raw = chart.raw_scores(profile_signature(profile), (palace_num,))[palace_num]
+        alignment = round(max(0, min(10, raw + structure_adjustment(profile))), 1)
+        bazi = _bazi_section(profile)
+        if chart_id is not None:
+            doc_reading_id = reading_id(chart_id, palace_num, profile_hash(profile))
+    
+    combined = qmdj_score if alignment is None else round((qmdj_score + alignment) / 2, 1)
+    calculation_path = meta.get("calculation_path", "")
+    date_time = f"{meta['date']} {meta['time']}"
+    formations = reading.get("formations", [])
+    
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "schema_name": SCHEMA_NAME,
+        "metadata": {
+            "date_time": date_time,
+            "timezone": "UTC+8",
+            "method": METHOD_LABELS.get(meta["method"], meta["method"]),
+            "chart_type": meta.get("chart_type", "hour"),
+            "purpose": purpose,
+            "analysis_type": "QMDJ_BAZI_INTEGRATED" if bazi else "QMDJ_ONLY",
+            "exported_at": exported_at or datetime.now().isoformat(),
+            "chart_id": chart_id,
+            "reading_id": doc_reading_id
+        },
+        "qmdj_data": {
+            "palace_analyzed": {
+                "number": palace_num,
+                "name": palace["name"],
+                "chinese": palace["chinese"],
+                "direction": palace["direction"],
+                "element": palace["element"],
+                "topic": palace["topic"]
+            },
+            "chart": {
+                "structure": meta["structure"],
+                "ju_number": meta["ju_number"],
+                "solar_term": meta["solar_term"],
+                "gangzhi": meta.get("gangzhi", ""),
+                "chinese_hour": meta["chinese_hour"],
+                "calculation_path": calculation_path
+            },
+            "components": {
+                "heaven_stem": {
+                    "character": comp["heaven_stem"]["character"],
+                    "element": comp["heaven_stem"]["element"],
+                    "strength": comp["heaven_stem"]["strength_in_palace"]
+                },
+                "earth_stem": {
+                    "character": comp["earth_stem"]["character"],
+                    "element": comp["earth_stem"]["element"],
+                    "strength": comp["earth_stem"]["strength_in_palace"]
+                },
+                "star": {
+                    "name": comp["star"]["name"],
+                    "chinese": comp["star"]["chinese"],
+                    "element": comp["star"]["element"],
+                    "nature": comp["star"]["nature"]
+                },
+                "door": {
+                    "name": comp["door"]["friendly_name"],
+                    "chinese": comp["door"]["chinese"],
+                    "element": comp["door"]["element"],
+                    "nature": comp["door"]["nature"]
+                },
+                "deity": {
+                    "name": comp["deity"]["name"],
+                    "chinese": comp["deity"]["chinese"],
+                    "nature": comp["deity"]["nature"]
+                }
+            },
+            "formations": [
+                {"key": f["key"], "name": f["name"], "chinese": f["chinese"], "nature": f["nature"]}
+                for f in formations
+            ]
+        },
+        "bazi_data": bazi,
+        "synthesis": {
+            "qmdj_score": qmdj_score,
+            "component_total": scores["component_total"],
+            "bazi_alignment_score": alignment,
+            "bazi_alignment_verdict": None if alignment is None else get_alignment_verdict(alignment),
+            "combined_verdict_score": combined,
+            "verdict": scores["verdict"],
+            "confidence": "HIGH" if calculation_path in (PATH_KINQIMEN, PATH_PERIOD_TABLES) else "MEDIUM",
+            "primary_action": reading["guidance"]["advice"],
+            "summary": reading["guidance"]["summary"]
+        },
+        "tracking": {
+            "chart_id": chart_id,
+            "reading_id": doc_reading_id,
+            "outcome_status": "PENDING",
+            "outcome_notes": "",
+            "feedback_date": ""
+        }
+    }
+
+
+def iter_documents(readings: Iterable[Dict], profile: Optional[Dict] = None,
+                   purpose: str = "Forecasting") -> Iterator[Dict]:
+    """Documents for many readings; each chart is decoded once per batch"""
+    charts: Dict[object, ChartElements] = {}
+    exported_at = datetime.now().isoformat()
+    for reading in readings:
+        chart = None
+        if profile:
+            key = reading["metadata"].get("chart_id")
+            chart = charts.get(key) if key is not None else None
+            if chart is None:
+                chart = ChartElements(resolve_raw_chart(reading))
+                if key is not None:
+                    charts[key] = chart
+        yield build_document(reading, profile, purpose, chart, exported_at)
+
+
+def tracking_row(document: Dict) -> Dict:
+    """Flat row of a document for CSV tracking sheets"""
+    qmdj = document["qmdj_data"]
+    synthesis = document["synthesis"]
+    alignment = synthesis["bazi_alignment_score"]
+    names = ", ".join(f"{f['chinese']} {f['name']}" for f in qmdj["formations"])
+    return {
+        "reading_id": document["metadata"]["reading_id"],
+        "chart_id": document["metadata"]["chart_id"],
+        "date_time": document["metadata"]["date_time"],
+        "palace": qmdj["palace_analyzed"]["number"],
+        "formation": names or "Unknown",
+        "qmdj_score": synthesis["qmdj_score"],
+        "bazi_score": "N/A" if alignment is None else alignment,
+        "verdict": synthesis["verdict"],
+        "status": document["tracking"]["outcome_status"]
+    }
+
+
+# ============================================================================
+# SCHEMA
+# ============================================================================
+
+class Field(NamedTuple):
+    """A leaf value: exact types, optional null, allowed values or range"""
+    types: Tuple[type, ...]
+    nullable: bool = False
+    choices: Optional[Tuple] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+
+class Obj(NamedTuple):
+    """An object with required keys (extra keys are allowed)"""
+    fields: Dict
+    nullable: bool = False
+
+
+class ListOf(NamedTuple):
+    """A list whose items all match one spec"""
+    item: object
+
+
+STR = (str,)
+INT = (int,)
+NUMBER = (int, float)
+BOOL = (bool,)
+
+ELEMENT_CHOICES = ("Wood", "Fire", "Earth", "Metal", "Water")
+
+_STEM = Obj({"character": Field(STR), "element": Field(STR, choices=ELEMENT_CHOICES),
+             "strength": Field(STR)})
+_NAMED = {"name": Field(STR), "chinese": Field(STR), "nature": Field(STR)}
+
+SCHEMA = Obj({
+    "schema_version": Field(STR, choices=(SCHEMA_VERSION,)),
+    "schema_name": Field(STR),
+    "metadata": Obj({
+        "date_time": Field(STR),
+        "timezone": Field(STR),
+        "method": Field(STR),
+        "chart_type": Field(STR, choices=("hour", "day", "month", "year")),
+        "purpose": Field(STR),
+        "analysis_type": Field(STR, choices=("QMDJ_ONLY", "QMDJ_BAZI_INTEGRATED")),
+        "exported_at": Field(STR),
+        "chart_id": Field(INT, nullable=True, minimum=0),
+        "reading_id": Field(INT, nullable=True, minimum=0)
+    }),
+    "qmdj_data": Obj({
+        "palace_analyzed": Obj({
+            "number": Field(INT, choices=tuple(PALACE_INFO)),
+            "name": Field(STR),
+            "chinese": Field(STR),
+            "direction": Field(STR),
+            "element": Field(STR, choices=ELEMENT_CHOICES),
+            "topic": Field(STR)
+        }),
+        "chart": Obj({
+            "structure": Field(STR),
+            "ju_number": Field(INT, minimum=1, maximum=9),
+            "solar_term": Field(STR),
+            "gangzhi": Field(STR),
+            "chinese_hour": Field(STR),
+            "calculation_path": Field(STR)
+        }),
+        "components": Obj({
+            "heaven_stem": _STEM,
+            "earth_stem": _STEM,
+            "star": Obj(dict(_NAMED, element=Field(STR, choices=ELEMENT_CHOICES))),
+            "door": Obj(dict(_NAMED, element=Field(STR, choices=ELEMENT_CHOICES))),
+            "deity": Obj(_NAMED)
+        }),
+        "formations": ListOf(Obj({"key": Field(STR), "name": Field(STR),
+                                  "chinese": Field(STR), "nature": Field(STR)}))
+    }),
+    "bazi_data": Obj({
+        "chart_source": Field(STR),
+        "day_master": Obj({
+            "stem": Field(STR),
+            "element": Field(STR),
+            "polarity": Field(STR),
+            "strength": Field(STR),
+            "strength_score": Field(NUMBER)
+        }),
+        "useful_gods": Obj({"primary": Field(STR), "secondary": Field(STR)}),
+        "unfavorable_elements": Obj({"primary": Field(STR), "all": ListOf(Field(STR))}),
+        "special_structures": Obj({"wealth_vault": Field(BOOL), "nobleman_present": Field(BOOL),
+                                   "six_clashes": Field(BOOL)})
+    }, nullable=True),
+    "synthesis": Obj({
+        "qmdj_score": Field(NUMBER, minimum=0, maximum=10),
+        "component_total": Field(NUMBER),
+        "bazi_alignment_score": Field(NUMBER, nullable=True, minimum=0, maximum=10),
+        "bazi_alignment_verdict": Field(STR, nullable=True),
+        "combined_verdict_score": Field(NUMBER, minimum=0, maximum=10),
+        "verdict": Field(STR),
+        "confidence": Field(STR, choices=("HIGH", "MEDIUM", "LOW")),
+        "primary_action": Field(STR),
+        "summary": Field(STR)
+    }),
+    "tracking": Obj({
+        "chart_id": Field(INT, nullable=True, minimum=0),
+        "reading_id": Field(INT, nullable=True, minimum=0),
+        "outcome_status": Field(STR),
+        "outcome_notes": Field(STR),
+        "feedback_date": Field(STR)
+    })
+})
+
+
+# ============================================================================
+# VALIDATOR
+# ============================================================================
+
+# A compiled check appends "path: problem" strings to the error list
+Check = Callable[[object, List[str]], None]
+
+
+def _type_names(types: Tuple[type, ...]) -> str:
+    return " or ".join(t.__name__ for t in types)
+
+
+def _compile_field(spec: Field, path: str) -> Check:
+    types = frozenset(spec.types)
+    expected = _type_names(spec.types)
+    nullable, choices = spec.nullable, spec.choices
+    minimum, maximum = spec.minimum, spec.maximum
+    
+    def check(value, errors: List[str]) -> None:
+        if value is None:
+            if not nullable:
+                errors.append(f"{path}: must not be null")
+            return
+        # Exact type match, so True/False never pass as numbers
+        if type(value) not in types:
+            errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+            return
+        if choices is not None and value not in choices:
+            errors.append(f"{path}: {value!r} is not one of {list(choices)}")
+        if minimum is not None and value < minimum:
+            errors.append(f"{path}: {value} is below {minimum}")
+        if maximum is not None and value > maximum:
+            errors.append(f"{path}: {value} is above {maximum}")
+    return check
+
+
+def _compile_object(spec: Obj, path: str) -> Check:
+    children = tuple(
+        (key, _compile(child, f"{path}.{key}" if path else key))
+        for key, child in spec.fields.items()
+    )
+    nullable = spec.nullable
+    label = path or "document"
+    
+    def check(value, errors: List[str]) -> None:
+        if value is None:
+            if not nullable:
+                errors.append(f"{label}: must not be null")
+            return
+        if type(value) is not dict:
+            errors.append(f"{label}: expected object, got {type(value).__name__}")
+            return
+        for key, child in children:
+            if key in value:
+                child(value[key], errors)
+            else:
+                errors.append(f"{label}: missing {key!r}")
+    return check
+
+
+def _compile_list(spec: ListOf, path: str) -> Check:
+    item_check = _compile(spec.item, f"{path}[]")
+    
+    def check(value, errors: List[str]) -> None:
+        if type(value) is not list:
+            errors.append(f"{path}: expected list, got {type(value).__name__}")
+            return
+        for item in value:
+            item_check(item, errors)
+    return check
+
+
+def _compile(spec, path: str = "") -> Check:
+    if isinstance(spec, Field):
+        return _compile_field(spec, path)
+    if isinstance(spec, Obj):
+        return _compile_object(spec, path)
+    if isinstance(spec, ListOf):
+        return _compile_list(spec, path)
+    raise TypeError(f"Unknown schema node at {path or 'document'}: {spec!r}")
+
+
+# Compiled once at import
+_CHECK_DOCUMENT = _compile(SCHEMA)
+
+
+class ValidationReport(NamedTuple):
+    """Outcome of a batch validation"""
+    total: int
+    valid: int
+    errors: Dict[int, List[str]]  # document index -> problems (invalid documents only)
+    
+    @property
+    def invalid(self) -> int:
+        return self.total - self.valid
+    
+    def as_dict(self) -> Dict:
+        return {"total": self.total, "valid": self.valid, "invalid": self.invalid,
+                "errors": {str(index): problems for index, problems in self.errors.items()}}
+
+
+def validate_document(document) -> List[str]:
+    """Problems found in one document (empty when valid)"""
+    errors: List[str] = []
+    _CHECK_DOCUMENT(document, errors)
+    return errors[:MAX_ERRORS_PER_DOCUMENT]
+
+
+def is_valid_document(document) -> bool:
+    return not validate_document(document)
+
+
+def validate_documents(documents: Iterable, max_reported: int = 1000) -> ValidationReport:
+    """
+    Validate a batch (any iterable, consumed lazily).
+    
+    Args:
+        documents: Documents to check
+        max_reported: Invalid documents whose problems are kept in the report
+    """
+    check = _CHECK_DOCUMENT
+    total = valid = 0
+    reported: Dict[int, List[str]] = {}
+    for index, document in enumerate(documents):
+        errors: List[str] = []
+        check(document, errors)
+        total += 1
+        if not errors:
+            valid += 1
+        elif len(reported) < max_reported:
+            reported[index] = errors[:MAX_ERRORS_PER_DOCUMENT]
+    return ValidationReport(total, valid, reported)
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+    from datetime import timedelta
+    from .qmdj_engine import SGT, generate_all_palace_readings
+    from .bazi_engine import get_bazi_profile
+    
+    profile = get_bazi_profile(1990, 5, 1, 10)
+    start = datetime.now(SGT).replace(minute=0, second=0, microsecond=0)
+    readings = []
+    for step in range(120):
+        batch = generate_all_palace_readings(start + timedelta(hours=2 * step), include_raw_chart=False)
+        readings.extend(batch.values())
+    
+    started = time.perf_counter()
+    documents = list(iter_documents(readings, profile))
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Built {len(documents)} documents in {elapsed:.0f} ms")
+    
+    documents[3]["synthesis"]["qmdj_score"] = "high"
+    del documents[5]["metadata"]["chart_type"]
+    
+    started = time.perf_counter()
+    report = validate_documents(documents)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"Validated {report.total} documents in {elapsed:.1f} ms "
+          f"({report.total / elapsed * 1000:.0f}/s): {report.valid} valid")
+    for index, problems in report.errors.items():
+        print(f"  #{index}: {problems}")
+    print(tracking_row(documents[0]))
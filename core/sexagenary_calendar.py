@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Sexagenary Calendar v1.0
+Stem-branch (干支) pillars as integers, shared by the QMDJ and BaZi engines
+
+This module provides:
+1. Integer stem-branch codes (0-59, 0 = 甲子) and name conversions
+2. 24-entry hour tables: branch, shichen names and hour pillar per day stem
+3. Solar term (節氣) dates and a shared per-year term lookup
+4. Scalar pillar functions and four_pillars() for a clock time
+5. Array batch functions for runs of consecutive days
+
+A pillar code g has stem g % 10 and branch g % 12; ganzhi() combines a
+stem and branch of equal parity back into a code. Day pillars are one
+addition from the date ordinal, hour pillars one table lookup from the day
+pillar, so callers never scan name tables.
+
+Solar terms use the century approximation formula (C constants for the
+20th and 21st centuries, plus its published per-year corrections) and are
+day-accurate only. The 子 hour starting at 23:00 belongs to the next day
+in QMDJ charts; four_pillars(late_zi_next_day=False) keeps it on the same
+day, as the BaZi engine does.
+"""
+
+from array import array
+from bisect import bisect_right
+from datetime import date as Date, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+STEM_CHARS = "甲乙丙丁戊己庚辛壬癸"
+BRANCH_CHARS = "子丑寅卯辰巳午未申酉戌亥"
+
+BRANCH_PINYIN = ("Zi", "Chou", "Yin", "Mao", "Chen", "Si",
+                 "Wu", "Wei", "Shen", "You", "Xu", "Hai")
+BRANCH_ANIMALS = ("Rat", "Ox", "Tiger", "Rabbit", "Dragon", "Snake",
+                  "Horse", "Goat", "Monkey", "Rooster", "Dog", "Pig")
+
+# 24 solar terms, starting from 小寒 (early January)
+SOLAR_TERMS = (
+    "小寒", "大寒", "立春", "雨水", "驚蟄", "春分",
+    "清明", "穀雨", "立夏", "小滿", "芒種", "夏至",
+    "小暑", "大暑", "立秋", "處暑", "白露", "秋分",
+    "寒露", "霜降", "立冬", "小雪", "大雪", "冬至"
+)
+
+# C constants of the term date formula by century, same order as SOLAR_TERMS
+_TERM_C = {
+    19: (
+        6.11, 20.84, 4.6295, 19.4599, 6.3826, 21.4155,
+        5.59, 20.888, 6.318, 21.86, 6.5, 22.2,
+        7.928, 23.65, 8.35, 23.95, 8.44, 23.822,
+        9.098, 24.218, 8.218, 23.08, 7.9, 22.6
+    ),
+    20: (
+        5.4055, 20.12, 3.87, 18.73, 5.63, 20.646,
+        4.81, 20.1, 5.52, 21.04, 5.678, 21.37,
+        7.108, 22.83, 7.5, 23.13, 7.646, 23.042,
+        8.318, 23.438, 7.438, 22.36, 7.18, 21.94
+    )
+}
+_TERM_D = 0.2422
+
+# Years where the formula misses the China Standard Time date found from
+# the Sun's apparent longitude: (year, term) -> days to add. Terms within
+# ten minutes of midnight are corrected only where the formula's published
+# exception list agrees.
+_TERM_CORRECTIONS = {
+    (1902, 10): 1, (1914, 2): -1, (1914, 23): 1, (1915, 4): -1, (1922, 13): 1,
+    (1925, 12): 1, (1928, 11): 1, (1942, 17): 1, (1947, 23): 1, (1978, 21): 1,
+    (1980, 23): 1, (1982, 0): 1, (1984, 23): 1, (2002, 14): 1, (2008, 9): 1,
+    (2019, 0): -1, (2021, 23): -1, (2026, 3): -1, (2089, 19): 1, (2089, 20): 1
+}
+
+# Day pillar of date ordinal 0: 1900-01-01 (ordinal 693596) was 甲戌 (10)
+_DAY_ORDINAL_OFFSET = (10 - Date(1900, 1, 1).toordinal()) % 60
+
+# Branch of the shichen containing each clock hour (23:00-00:59 is 子)
+HOUR_BRANCH = tuple(((hour + 1) // 2) % 12 for hour in range(24))
+
+# (chinese, pinyin, animal) of each clock hour's shichen
+HOUR_NAMES = tuple(
+    (BRANCH_CHARS[branch], BRANCH_PINYIN[branch], BRANCH_ANIMALS[branch])
+    for branch in HOUR_BRANCH
+)
+
+
+# ============================================================================
+# CODES AND NAMES
+# ============================================================================
+
+def ganzhi(stem: int, branch: int) -> int:
+    """Sixty-cycle code from stem and branch indices (same parity)"""
+    return (6 * stem - 5 * branch) % 60
+
+
+def ganzhi_name(index: int) -> str:
+    """Two-character name of a sixty-cycle index (0 = 甲子)"""
+    return STEM_CHARS[index % 10] + BRANCH_CHARS[index % 12]
+
+
+def ganzhi_index(name: str) -> Optional[int]:
+    """Inverse of ganzhi_name(): sixty-cycle index of a stem-branch pair, or None"""
+    if len(name) != 2 or name[0] not in STEM_CHARS or name[1] not in BRANCH_CHARS:
+        return None
+    stem, branch = STEM_CHARS.index(name[0]), BRANCH_CHARS.index(name[1])
+    if stem % 2 != branch % 2:
+        return None
+    return ganzhi(stem, branch)
+
+
+# Hour pillar of each clock hour, by day stem % 5 (甲己, 乙庚, 丙辛, 丁壬, 戊癸)
+HOUR_GANZHI = tuple(
+    tuple(ganzhi((group * 2 + branch) % 10, branch) for branch in HOUR_BRANCH)
+    for group in range(5)
+)
+
+
+# ============================================================================
+# SOLAR TERMS
+# ============================================================================
+
+@lru_cache(maxsize=256)
+def solar_term_dates(year: int) -> Tuple[Tuple[int, int], ...]:
+    """
+    (month, day) of each of the 24 solar terms in a year. Years outside
+    1900-2099 use the nearest century's constants.
+    """
+    century, y = divmod(year, 100)
+    constants = _TERM_C[min(max(century, 19), 20)]
+    dates = []
+    for i, c in enumerate(constants):
+        # Terms before 春分 use the previous year's leap count; a century
+        # year only counts when it is itself a leap year (2000, not 1900)
+        leap = (y - 1) // 4 if i < 4 else y // 4
+        if leap < 0 and year % 400:
+            leap = 0
+        day = int(y * _TERM_D + c) - leap + _TERM_CORRECTIONS.get((year, i), 0)
+        dates.append((i // 2 + 1, day))
+    return tuple(dates)
+
+
+@lru_cache(maxsize=256)
+def _term_keys(year: int) -> Tuple[int, ...]:
+    """Term start dates of a year as month * 32 + day, for bisecting"""
+    return tuple(month * 32 + day for month, day in solar_term_dates(year))
+
+
+def solar_term_index(day: Date) -> int:
+    """Index into SOLAR_TERMS of the term in effect on a day"""
+    # Before 小寒: still 冬至 of the previous year
+    return (bisect_right(_term_keys(day.year), day.month * 32 + day.day) - 1) % 24
+
+
+def is_term_start(day: Date) -> bool:
+    """True when a solar term begins on the day"""
+    return solar_term_index(day) != solar_term_index(day - timedelta(days=1))
+
+
+def solar_year(day: Date, term: int) -> int:
+    """Gregorian number of the year that started at the last 立春"""
+    before_lichun = day.month <= 2 and (term < 2 or term == 23)
+    return day.year - 1 if before_lichun else day.year
+
+
+# ============================================================================
+# PILLARS
+# ============================================================================
+
+def year_index(year: int) -> int:
+    """Sixty-cycle index of a solar year"""
+    return (year - 4) % 60
+
+
+def month_index(year_idx: int, term: int) -> int:
+    """Sixty-cycle index of the solar month (寅 month starts at 立春)"""
+    offset = ((term - 2) // 2) % 12  # 0 = 寅 month
+    stem = ((year_idx % 5) * 2 + 2 + offset) % 10
+    return ganzhi(stem, (offset + 2) % 12)
+
+
+def day_index(day: Date) -> int:
+    """Sixty-cycle index of a calendar day"""
+    return (day.toordinal() + _DAY_ORDINAL_OFFSET) % 60
+
+
+def hour_index(day_idx: int, hour: int) -> int:
+    """Sixty-cycle index of the double hour starting the given clock hour"""
+    return HOUR_GANZHI[day_idx % 5][hour]
+
+
+def hour_branch(hour: int) -> int:
+    """Branch index of the shichen containing a clock hour (0-23)"""
+    return HOUR_BRANCH[hour]
+
+
+class FourPillars(NamedTuple):
+    """Sixty-cycle codes of a moment's pillars (hour is None when unknown)"""
+    year: int
+    month: int
+    day: int
+    hour: Optional[int]
+    term: int
+    solar_year: int
+
+
+def four_pillars(year: int, month: int, day: int, hour: Optional[int] = None,
+                 late_zi_next_day: bool = True) -> FourPillars:
+    """
+    Pillars of a clock time. The year and month follow the solar terms of
+    the civil day; with late_zi_next_day, 23:00 takes the next day's pillar.
+    """
+    civil = Date(year, month, day)
+    term = solar_term_index(civil)
+    year_number = solar_year(civil, term)
+    year_idx = year_index(year_number)
+    
+    day_idx = day_index(civil)
+    if hour is not None and hour >= 23 and late_zi_next_day:
+        day_idx = (day_idx + 1) % 60
+    
+    return FourPillars(
+        year=year_idx,
+        month=month_index(year_idx, term),
+        day=day_idx,
+        hour=None if hour is None else HOUR_GANZHI[day_idx % 5][hour],
+        term=term,
+        solar_year=year_number
+    )
+
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+def day_indices(first: Date, days: int) -> array:
+    """Day pillar codes of days consecutive dates (array of unsigned bytes)"""
+    start = day_index(first)
+    cycle = bytes((start + i) % 60 for i in range(60))
+    whole, rest = divmod(days, 60)
+    return array("B", cycle * whole + cycle[:rest])
+
+
+def term_indices(first: Date, days: int) -> array:
+    """Solar term index of days consecutive dates, one bisect per term change"""
+    result = array("B")
+    if days <= 0:
+        return result
+    last = first + timedelta(days=days - 1)
+    
+    # Term start ordinals from 冬至 of the year before, in order
+    starts = []
+    for year in range(first.year - 1, last.year + 1):
+        for term, (month, day) in enumerate(solar_term_dates(year)):
+            starts.append((Date(year, month, day).toordinal(), term))
+    
+    ordinal = first.toordinal()
+    end = ordinal + days
+    position = bisect_right(starts, (ordinal, 24)) - 1
+    while ordinal < end:
+        term = starts[position][1]
+        boundary = starts[position + 1][0] if position + 1 < len(starts) else end
+        run = min(boundary, end) - ordinal
+        result.extend([term] * run)
+        ordinal += run
+        position += 1
+    return result
+
+
+def hour_indices(day_idx: array, hour: int) -> array:
+    """Hour pillar codes at one clock hour for an array of day pillar codes"""
+    row = [HOUR_GANZHI[group][hour] for group in range(5)]
+    return array("B", [row[d % 5] for d in day_idx])
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+    
+    p = four_pillars(2024, 12, 30, 14)
+    print(f"2024-12-30 14:00: {ganzhi_name(p.year)}年{ganzhi_name(p.month)}月"
+          f"{ganzhi_name(p.day)}日{ganzhi_name(p.hour)}時 ({SOLAR_TERMS[p.term]})")
+    
+    # Known term dates (China Standard Time) in both centuries
+    known = {
+        (1950, 2): (2, 4), (1982, 0): (1, 6), (1984, 23): (12, 22), (1990, 2): (2, 4),
+        (1990, 23): (12, 22), (1999, 23): (12, 22), (2000, 0): (1, 6), (2000, 2): (2, 4),
+        (2000, 3): (2, 19), (2019, 0): (1, 5), (2021, 23): (12, 21), (2024, 2): (2, 4),
+        (2026, 3): (2, 18)
+    }
+    for (year, term), expected in known.items():
+        assert solar_term_dates(year)[term] == expected, (year, SOLAR_TERMS[term])
+    assert four_pillars(1990, 2, 3, 12)[:2] == (ganzhi_index("己巳"), ganzhi_index("丁丑"))
+    print(f"{len(known)} known term dates match")
+    
+    # Batch results match the scalar functions
+    first = Date(1900, 1, 1)
+    count = 365 * 200
+    started = time.perf_counter()
+    days, terms = day_indices(first, count), term_indices(first, count)
+    elapsed = (time.perf_counter() - started) * 1000
+    for i in range(0, count, 97):
+        day = first + timedelta(days=i)
+        assert days[i] == day_index(day) and terms[i] == solar_term_index(day), day
+    print(f"{count} days of day/term codes in {elapsed:.1f} ms (batch matches scalar)")
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Ming Qimen 明奇门 - Shichen Snapshot Service v1.0
+Process-wide "current cosmic energy" for the dashboard
+
+This module provides:
+1. A background refresher that computes the current and next shichen charts
+2. Immutable snapshots (read-only mappings and tuples) published by reference
+3. get_snapshot_service() - one shared service per process
+
+The refresher prepares the upcoming shichen a little before each boundary
+and swaps the published snapshot in a single reference assignment, so
+sessions read it without taking a lock and never wait on the engine.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Dict, Optional, Any, NamedTuple
+
+from .qmdj_engine import (
+    SGT,
+    generate_all_palace_readings,
+    summarize_palace_readings
+)
+
+# How long before a shichen boundary the next chart is computed
+DEFAULT_LEAD_SECONDS = 120
+
+# Delay before retrying after a failed refresh
+RETRY_SECONDS = 30
+
+SHICHEN_LENGTH = timedelta(hours=2)
+
+
+# ============================================================================
+# SNAPSHOT TYPES
+# ============================================================================
+
+class ShichenWindow(NamedTuple):
+    """Chart data for one shichen (two-hour period)"""
+    start: datetime
+    end: datetime
+    chinese_hour: str
+    structure: str
+    ju_number: int
+    solar_term: str
+    summaries: tuple  # Palace summaries, best first (read-only mappings)
+    
+    def contains(self, moment: datetime) -> bool:
+        return self.start <= moment < self.end
+
+
+class ShichenSnapshot(NamedTuple):
+    """Immutable view of the current and next shichen"""
+    generated_at: datetime
+    method: int
+    current: ShichenWindow
+    next: ShichenWindow
+    
+    def window_for(self, moment: datetime) -> Optional[ShichenWindow]:
+        """Return whichever window covers the given moment, if any"""
+        if self.current.contains(moment):
+            return self.current
+        if self.next.contains(moment):
+            return self.next
+        return None
+
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def shichen_start(moment: datetime) -> datetime:
+    """Start of the shichen containing moment (shichen begin on odd hours)"""
+    base = moment.replace(minute=0, second=0, microsecond=0)
+    return base - timedelta(hours=(moment.hour + 1) % 2)
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def compute_window(start: datetime, method: int = 1) -> ShichenWindow:
+    """Compute the chart and palace summaries for the shichen starting at start"""
+    readings = generate_all_palace_readings(start, method, include_raw_chart=False)
+    meta = readings[5]["metadata"]
+    
+    return ShichenWindow(
+        start=start,
+        end=start + SHICHEN_LENGTH,
+        chinese_hour=meta["chinese_hour"],
+        structure=meta["structure"],
+        ju_number=meta["ju_number"],
+        solar_term=meta["solar_term"],
+        summaries=_freeze(summarize_palace_readings(readings))
+    )
+
+
+# ============================================================================
+# SNAPSHOT SERVICE
+# ============================================================================
+
+class ShichenSnapshotService:
+    """
+    Background refresher publishing ShichenSnapshot objects.
+    
+    Readers call get_snapshot(); the returned object is never mutated,
+    so it can be shared across threads and sessions freely.
+    """
+    
+    def __init__(self, method: int = 1, lead_seconds: int = DEFAULT_LEAD_SECONDS):
+        self.method = method
+        self.lead_seconds = lead_seconds
+        self._snapshot: Optional[ShichenSnapshot] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    def get_snapshot(self) -> Optional[ShichenSnapshot]:
+        """Latest published snapshot (None until the first refresh finishes)"""
+        return self._snapshot
+    
+    def start(self) -> None:
+        """Start the refresher thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="shichen-snapshot", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the refresher thread"""
+        self._stop.set()
+    
+    def refresh_now(self) -> ShichenSnapshot:
+        """Compute and publish a snapshot for the current time"""
+        now = datetime.now(SGT)
+        start = shichen_start(now)
+        snapshot = ShichenSnapshot(
+            generated_at=now,
+            method=self.method,
+            current=compute_window(start, self.method),
+            next=compute_window(start + SHICHEN_LENGTH, self.method)
+        )
+        self._snapshot = snapshot
+        return snapshot
+    
+    def _sleep_until(self, moment: datetime) -> bool:
+        """Sleep until moment; returns False if the service was stopped"""
+        delay = (moment - datetime.now(SGT)).total_seconds()
+        if delay > 0:
+            return not self._stop.wait(delay)
+        return not self._stop.is_set()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                snapshot = self._snapshot
+                now = datetime.now(SGT)
+                if snapshot is None or snapshot.window_for(now) is None:
+                    snapshot = self.refresh_now()
+                
+                # Prepare the shichen after next shortly before the boundary
+                boundary = snapshot.next.start
+                if not self._sleep_until(boundary - timedelta(seconds=self.lead_seconds)):
+                    return
+                upcoming = compute_window(boundary + SHICHEN_LENGTH, self.method)
+                prepared = ShichenSnapshot(
+                    generated_at=datetime.now(SGT),
+                    method=self.method,
+                    current=snapshot.next,
+                    next=upcoming
+                )
+                
+                # Publish exactly at the boundary
+                if not self._sleep_until(boundary):
+                    return
+                self._snapshot = prepared
+            except Exception as e:
+                print(f"Snapshot refresh error: {e}. Retrying in {RETRY_SECONDS}s.")
+                if self._stop.wait(RETRY_SECONDS):
+                    return
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_services: Dict[int, ShichenSnapshotService] = {}
+_services_lock = threading.Lock()
+
+
+def get_snapshot_service(method: int = 1) -> ShichenSnapshotService:
+    """Return the process-wide snapshot service for a method, starting it once"""
+    service = _services.get(method)
+    if service is None:
+        with _services_lock:
+            service = _services.get(method)
+            if service is None:
+                service = ShichenSnapshotService(method)
+                service.start()
+                _services[method] = service
+    return service
+
+
+# ============================================================================
+# TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    service = ShichenSnapshotService()
+    snap = service.refresh_now()
+    for label, window in (("Current", snap.current), ("Next", snap.next)):
+        best = window.summaries[0]
+        print(f"{label}: {window.start:%H:%M}-{window.end:%H:%M} {window.chinese_hour} "
+              f"{window.structure} Ju {window.ju_number} | Best: {best['topic']} ({best['score']}/10)")
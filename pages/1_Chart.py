@@ -12,12 +12,20 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.qmdj_engine import (
-    generate_qmdj_reading,
+    generate_all_palace_readings,
+    summarize_palace_readings,
+    resolve_raw_chart,
+    chart_key,
+    set_reading_time,
     get_all_palaces_summary,
     PALACE_INFO,
     PALACE_TOPICS,
     strength_to_friendly
 )
+from core.qmdj_plates import CHART_TYPES
+from core.chart_image import render_palace_grid
+from core.audit_log import audit_reading
+from core.history_store import get_history_store
 
 st.set_page_config(
     page_title="Chart | Ming Qimen",
@@ -51,13 +59,17 @@ if 'analyses' not in st.session_state:
 # Sync time from dashboard if available
 if 'shared_date' not in st.session_state:
     st.session_state.shared_date = get_singapore_time().date()
-    
+
 if 'shared_time' not in st.session_state:
     st.session_state.shared_time = get_singapore_time().strftime("%H:%M")
 
 if 'selected_palace' not in st.session_state:
     st.session_state.selected_palace = 5
 
+# All nine palace readings for the last generated (time, method)
+if 'chart_bundle' not in st.session_state:
+    st.session_state.chart_bundle = None
+
 # ============================================================================
 # PAGE HEADER
 # ============================================================================
@@ -136,6 +148,11 @@ for idx, (palace_num, info) in enumerate(topic_options):
         ):
             st.session_state.selected_palace = palace_num
             selected_topic = palace_num
+            
+            # Switch to the precomputed palace reading (no engine call)
+            bundle = st.session_state.chart_bundle
+            if bundle and st.session_state.current_chart:
+                st.session_state.current_chart = bundle["readings"][palace_num]
             st.rerun()
 
 # Show selected topic description
@@ -152,7 +169,7 @@ st.markdown("---")
 
 st.markdown("### 📈 Generate Reading")
 
-method_col, gen_col = st.columns([1, 2])
+method_col, type_col, gen_col = st.columns([1, 1, 2])
 
 with method_col:
     method = st.radio(
@@ -162,6 +179,14 @@ with method_col:
         help="Chai Bu is the most commonly used method"
     )
 
+with type_col:
+    chart_type = st.selectbox(
+        "Chart 盤",
+        options=list(CHART_TYPES),
+        format_func=lambda x: {"hour": "時 Hour", "day": "日 Day", "month": "月 Month", "year": "年 Year"}[x],
+        help="Day, Month and Year charts cover longer periods for planning"
+    )
+
 with gen_col:
     generate_clicked = st.button(
         "🔮 Get Your Reading",
@@ -173,27 +198,58 @@ with gen_col:
 # SHOW READING
 # ============================================================================
 
+# Times in the same shichen (or period) share a chart; key the bundle on that
+bundle_key = chart_key(reading_datetime, method, chart_type)
+display_time = reading_datetime.strftime("%Y-%m-%d %H:%M")
+
+# Same chart, new time: only the displayed time changes (no engine call)
+bundle = st.session_state.chart_bundle
+if bundle and bundle["key"] == bundle_key and bundle["display_time"] != display_time:
+    set_reading_time(bundle["readings"], reading_datetime)
+    bundle["display_time"] = display_time
+
 if generate_clicked:
-    with st.spinner("Calculating your Qi Men chart..."):
-        reading = generate_qmdj_reading(
-            date=reading_datetime,
-            palace=selected_topic,
-            method=method
-        )
-        st.session_state.current_chart = reading
-        
-        # Add to history
-        history_entry = {
-            "date": reading["metadata"]["date"],
-            "time": reading["metadata"]["time"],
-            "palace": reading["palace"]["number"],
-            "topic": reading["palace"]["topic"],
-            "score": reading["scores"]["normalized"],
-            "verdict": reading["scores"]["verdict"],
-            "door": reading["components"]["door"]["name"],
-            "star": reading["components"]["star"]["name"]
-        }
+    # One chart calculation per effective chart key covers all nine palaces
+    if not bundle or bundle["key"] != bundle_key:
+        with st.spinner("Calculating your Qi Men chart..."):
+            readings = generate_all_palace_readings(
+                reading_datetime, method, include_raw_chart=False, chart_type=chart_type
+            )
+            bundle = {
+                "key": bundle_key,
+                "display_time": display_time,
+                "readings": readings,
+                "summaries": summarize_palace_readings(readings)
+            }
+            st.session_state.chart_bundle = bundle
+    
+    reading = bundle["readings"][selected_topic]
+    st.session_state.current_chart = reading
+    
+    # Add to history
+    history_entry = {
+        "date": reading["metadata"]["date"],
+        "time": reading["metadata"]["time"],
+        "palace": reading["palace"]["number"],
+        "topic": reading["palace"]["topic"],
+        "score": reading["scores"]["normalized"],
+        "verdict": reading["scores"]["verdict"],
+        "door": reading["components"]["door"]["name"],
+        "star": reading["components"]["star"]["name"],
+        "chart_id": reading["metadata"]["chart_id"],
+        "reading_id": reading["metadata"]["reading_id"]
+    }
+    audit_reading(reading, "chart_page")
+    
+    # Regenerating the same reading on the same day does not add a duplicate
+    if not any(entry.get("reading_id") == history_entry["reading_id"]
+               and entry.get("date") == history_entry["date"]
+               for entry in st.session_state.analyses):
         st.session_state.analyses.append(history_entry)
+    
+    history_store = get_history_store()
+    if history_store is not None:
+        history_store.add(history_entry, "chart_page")
 
 # Display current chart
 if st.session_state.current_chart:
@@ -214,7 +270,7 @@ if st.session_state.current_chart:
     
     with header_cols[1]:
         st.markdown(f"**Structure:** {meta['structure']} Ju {meta['ju_number']}")
-        st.caption(f"Method: {meta['method']} | {meta['solar_term']}")
+        st.caption(f"Method: {meta['method']} | {meta['solar_term']} | {meta.get('chart_type', 'hour').title()} chart")
     
     with header_cols[2]:
         scores = reading["scores"]
@@ -234,63 +290,10 @@ if st.session_state.current_chart:
     
     st.markdown("### 🏛️ Nine Palace Grid")
     
-    # Build grid data
-    raw_chart = reading.get("raw_chart", {})
-    
-    # Luo Shu arrangement: [4,9,2], [3,5,7], [8,1,6]
-    grid_layout = [
-        [4, 9, 2],
-        [3, 5, 7],
-        [8, 1, 6]
-    ]
-    
-    for row in grid_layout:
-        cols = st.columns(3)
-        for col_idx, palace_num in enumerate(row):
-            with cols[col_idx]:
-                p_info = PALACE_INFO[palace_num]
-                t_info = PALACE_TOPICS[palace_num]
-                
-                # Get palace components from raw chart
-                palace_chinese = p_info["chinese"]
-                sky = raw_chart.get("天盤", {}).get(palace_chinese, "?")
-                earth = raw_chart.get("地盤", {}).get(palace_chinese, "?")
-                star = raw_chart.get("星", {}).get(palace_chinese, "?")
-                door = raw_chart.get("門", {}).get(palace_chinese, "?")
-                deity = raw_chart.get("神", {}).get(palace_chinese, "?") if palace_chinese != "中" else "-"
-                
-                # Highlight selected palace
-                is_selected = palace_num == selected_topic
-                border_style = "border: 3px solid #FFD700;" if is_selected else "border: 1px solid #444;"
-                bg_color = "background: linear-gradient(135deg, #1a237e 0%, #0d47a1 100%);" if is_selected else "background: #1e1e1e;"
-                
-                st.markdown(f"""
-                <div style="{bg_color} {border_style} border-radius: 10px; padding: 10px; margin: 5px 0; min-height: 180px;">
-                    <div style="text-align: center; font-weight: bold; color: #FFD700; font-size: 0.9em;">
-                        {t_info['icon']} {p_info['name']} ({palace_num})
-                    </div>
-                    <div style="text-align: center; color: #888; font-size: 0.7em; margin-bottom: 8px;">
-                        {p_info['direction']} | {p_info['element']}
-                    </div>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 4px; font-size: 0.85em;">
-                        <div style="text-align: center;">
-                            <span style="color: #90CAF9;">天</span> <span style="color: #fff;">{sky}</span>
-                        </div>
-                        <div style="text-align: center;">
-                            <span style="color: #A5D6A7;">神</span> <span style="color: #fff;">{deity}</span>
-                        </div>
-                        <div style="text-align: center;">
-                            <span style="color: #FFCC80;">星</span> <span style="color: #fff;">{star}</span>
-                        </div>
-                        <div style="text-align: center;">
-                            <span style="color: #CE93D8;">門</span> <span style="color: #fff;">{door}</span>
-                        </div>
-                    </div>
-                    <div style="text-align: center; margin-top: 8px;">
-                        <span style="color: #EF9A9A;">地</span> <span style="color: #fff;">{earth}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+    # Slim readings resolve the chart from the engine cache; the PNG is
+    # cached per (chart, palace), so reruns and topic switches reuse it
+    raw_chart = resolve_raw_chart(reading)
+    st.image(render_palace_grid(raw_chart, selected_topic), use_container_width=True)
     
     st.markdown("---")
     
@@ -385,8 +388,12 @@ if st.session_state.current_chart:
     st.markdown("---")
     st.markdown("### ⭐ Best Topics Right Now")
     
-    with st.spinner("Analyzing all palaces..."):
-        summaries = get_all_palaces_summary(reading_datetime, method)
+    bundle = st.session_state.chart_bundle
+    if bundle:
+        summaries = bundle["summaries"]
+    else:
+        with st.spinner("Analyzing all palaces..."):
+            summaries = get_all_palaces_summary(reading_datetime, method)
     
     rec_cols = st.columns(3)
     
@@ -422,6 +429,7 @@ if st.session_state.current_chart:
     with action_cols[2]:
         if st.button("🔄 New Reading", use_container_width=True):
             st.session_state.current_chart = None
+            st.session_state.chart_bundle = None
             st.rerun()
 
 else:
@@ -6,8 +6,45 @@ Streamlined: BaZi profile shown only in sidebar
 """
 
 import streamlit as st
+import pandas as pd
 import json
-from datetime import datetime
+import tempfile
+from datetime import datetime, timedelta, timezone, time
+import sys
+import os
+
+# Add core module to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.qmdj_engine import PALACE_TOPICS
+from core.schema import (
+    build_document,
+    iter_documents,
+    validate_document,
+    tracking_row,
+    TRACKING_FIELDS
+)
+from core.chart_image import render_reading_grid
+from core.bazi_engine import get_bazi_profile
+from core.report_builder import (
+    ReportJob,
+    build_reports,
+    write_reports_zip,
+    REPORT_FORMATS,
+    DEFAULT_WORKERS
+)
+from core.bulk_export import (
+    export_rows,
+    iter_csv,
+    iter_history_rows,
+    iter_reading_rows,
+    iter_range_readings,
+    EXPORT_FORMATS,
+    HISTORY_FIELDS,
+    READING_FIELDS
+)
+
+SGT = timezone(timedelta(hours=8))
 
 st.set_page_config(page_title="Export Center", page_icon="📤", layout="wide")
 
@@ -65,7 +102,9 @@ st.divider()
 # MAIN CONTENT - TABS
 # ============================================================
 
-tab1, tab2 = st.tabs(["📊 Current Reading", "❓ How to Use"])
+tab1, tab_bulk, tab_reports, tab2 = st.tabs(
+    ["📊 Current Reading", "📦 Bulk Export", "🖨️ Client Reports", "❓ How to Use"]
+)
 
 with tab1:
     # Check if we have a current chart
@@ -75,64 +114,11 @@ with tab1:
     if current_chart:
         st.success("✅ Chart data available for export")
         
-        # Build full export data
-        export_data = {
-            "schema_version": "2.0",
-            "schema_name": "QMDJ_BaZi_Integrated_Data_Schema",
-            "metadata": {
-                "date_time": current_chart.get("datetime", datetime.now().strftime("%Y-%m-%d %H:%M")),
-                "timezone": "UTC+8",
-                "method": "Chai Bu",
-                "purpose": current_chart.get("purpose", "Forecasting"),
-                "analysis_type": "QMDJ_BAZI_INTEGRATED" if user_profile else "QMDJ_ONLY",
-                "exported_at": datetime.now().isoformat()
-            },
-            "qmdj_data": current_chart.get("qmdj_data", {}),
-        }
-        
-        # Add BaZi data if profile exists
-        if user_profile:
-            export_data["bazi_data"] = {
-                "chart_source": "User Profile",
-                "day_master": {
-                    "stem": user_profile.get("day_master", ""),
-                    "element": user_profile.get("element", ""),
-                    "polarity": user_profile.get("polarity", ""),
-                    "strength": user_profile.get("strength", ""),
-                    "strength_score": user_profile.get("strength_score", 5)
-                },
-                "useful_gods": {
-                    "primary": user_profile.get("useful_gods", [""])[0] if user_profile.get("useful_gods") else "",
-                    "secondary": user_profile.get("useful_gods", ["", ""])[1] if len(user_profile.get("useful_gods", [])) > 1 else ""
-                },
-                "unfavorable_elements": {
-                    "primary": user_profile.get("unfavorable", [""])[0] if user_profile.get("unfavorable") else ""
-                },
-                "special_structures": {
-                    "wealth_vault": user_profile.get("wealth_vault", False),
-                    "nobleman_present": user_profile.get("nobleman", False)
-                }
-            }
-        else:
-            export_data["bazi_data"] = None
-        
-        # Synthesis placeholder
-        export_data["synthesis"] = {
-            "qmdj_score": current_chart.get("qmdj_score", 5),
-            "bazi_alignment_score": current_chart.get("bazi_score", 5) if user_profile else None,
-            "combined_verdict_score": current_chart.get("combined_score", 5),
-            "verdict": current_chart.get("verdict", "NEUTRAL"),
-            "confidence": "MEDIUM",
-            "primary_action": current_chart.get("recommendation", "Assess situation before acting")
-        }
-        
-        # Tracking
-        export_data["tracking"] = {
-            "db_row": f"{export_data['metadata']['date_time']},{current_chart.get('palace_number', 5)},{current_chart.get('formation', 'Unknown')},{export_data['synthesis']['qmdj_score']},{export_data['synthesis'].get('bazi_alignment_score', 'N/A')},{export_data['synthesis']['verdict']},PENDING",
-            "outcome_status": "PENDING",
-            "outcome_notes": "",
-            "feedback_date": ""
-        }
+        # Universal Schema v2.0 document, built straight from the reading
+        export_data = build_document(current_chart, user_profile)
+        problems = validate_document(export_data)
+        if problems:
+            st.warning("⚠️ Export does not match the schema: " + "; ".join(problems))
         
         # Preview
         st.subheader("📋 Export Preview")
@@ -162,15 +148,24 @@ with tab1:
         
         with col3:
             # CSV export for ML database
-            csv_row = export_data["tracking"]["db_row"]
+            csv_row = "".join(iter_csv([tracking_row(export_data)], TRACKING_FIELDS))
             st.download_button(
                 label="📊 Download CSV Row",
-                data=f"Date,Time,Palace,Formation,QMDJ_Score,BaZi_Score,Verdict,Status\n{csv_row}",
+                data=csv_row,
                 file_name=f"qmdj_row_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
                 mime="text/csv",
                 use_container_width=True
             )
         
+        # Grid image (shared with the Chart page's image cache)
+        st.download_button(
+            label="🖼️ Download Grid PNG",
+            data=render_reading_grid(current_chart),
+            file_name=f"qmdj_grid_{datetime.now().strftime('%Y%m%d_%H%M')}.png",
+            mime="image/png",
+            use_container_width=True
+        )
+        
         # BaZi status indicator
         st.markdown("---")
         if user_profile:
@@ -197,6 +192,179 @@ with tab1:
             if st.button("🔮 Set Up BaZi Profile"):
                 st.switch_page("pages/6_BaZi.py")
 
+with tab_bulk:
+    st.subheader("📦 Bulk Export")
+    st.caption("Stream reading history or a range of generated readings to NDJSON, JSON, CSV or Excel")
+    
+    source = st.radio(
+        "Data source",
+        options=["history", "range"],
+        format_func=lambda x: "📜 Reading History" if x == "history" else "🗓️ Readings for a Date Range",
+        horizontal=True
+    )
+    
+    bulk_format = st.selectbox(
+        "Format",
+        options=list(EXPORT_FORMATS.keys()),
+        format_func=lambda f: EXPORT_FORMATS[f]["label"],
+        key="bulk_export_format"
+    )
+    fmt_info = EXPORT_FORMATS[bulk_format]
+    
+    if source == "history":
+        analyses = st.session_state.get("analyses", [])
+        st.caption(f"{len(analyses)} readings in history")
+        rows = iter_history_rows(analyses) if analyses else None
+        fields = HISTORY_FIELDS
+        file_stem = "ming_qimen_history"
+    else:
+        today = datetime.now(SGT).date()
+        range_cols = st.columns(3)
+        with range_cols[0]:
+            start_date = st.date_input("From", value=today, key="bulk_start")
+        with range_cols[1]:
+            end_date = st.date_input("To", value=today + timedelta(days=1), key="bulk_end")
+        with range_cols[2]:
+            bulk_method = st.radio(
+                "Method",
+                options=[1, 2],
+                format_func=lambda x: "拆補 Chai Bu" if x == 1 else "置閏 Zhi Run",
+                key="bulk_method"
+            )
+        
+        bulk_palaces = st.multiselect(
+            "Topics",
+            options=list(PALACE_TOPICS.keys()),
+            default=list(PALACE_TOPICS.keys()),
+            format_func=lambda p: f"{PALACE_TOPICS[p]['icon']} {PALACE_TOPICS[p]['topic']}"
+        )
+        
+        as_documents = st.checkbox(
+            "Universal Schema v2.0 documents",
+            help="Full export documents (with your BaZi profile when set); CSV and Excel get the tracking rows"
+        )
+        
+        start_dt = datetime.combine(start_date, time(0, 0)).replace(tzinfo=SGT)
+        end_dt = datetime.combine(end_date, time(23, 0)).replace(tzinfo=SGT)
+        
+        if end_dt < start_dt or not bulk_palaces:
+            rows = None
+            st.warning("Choose a valid date range and at least one topic")
+        else:
+            readings = iter_range_readings(start_dt, end_dt, palaces=bulk_palaces, method=bulk_method)
+            if as_documents:
+                rows = iter_documents(readings, st.session_state.get("user_profile"))
+                if bulk_format in ("csv", "xlsx"):
+                    rows = map(tracking_row, rows)
+            else:
+                rows = iter_reading_rows(readings)
+        fields = TRACKING_FIELDS if as_documents else READING_FIELDS
+        file_stem = f"ming_qimen_readings_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+    
+    if rows is not None and st.button("⚙️ Prepare Export", use_container_width=True):
+        with tempfile.TemporaryFile() as export_file:
+            with st.spinner("Streaming export..."):
+                export_rows(rows, bulk_format, export_file, fields=fields, sheet_title="Ming Qimen")
+                export_file.seek(0)
+            
+            st.download_button(
+                label=f"📥 Download {fmt_info['label']}",
+                data=export_file,
+                file_name=f"{file_stem}.{fmt_info['extension']}",
+                mime=fmt_info["mime"],
+                type="primary",
+                use_container_width=True
+            )
+    elif rows is None and source == "history":
+        st.info("📭 No readings in history yet.")
+
+with tab_reports:
+    st.subheader("🖨️ Client Reports")
+    st.caption("Printable reports (grid, palace details, BaZi) for many clients at once, delivered as one ZIP")
+    
+    if "report_jobs" not in st.session_state:
+        now = datetime.now(SGT)
+        st.session_state.report_jobs = pd.DataFrame([{
+            "client": "Client A",
+            "date": now.date(),
+            "time": time(now.hour, 0),
+            "palace": 5,
+            "birth_date": None,
+            "birth_hour": None
+        }])
+    
+    edited_jobs = st.data_editor(
+        st.session_state.report_jobs,
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "client": st.column_config.TextColumn("Client", required=True),
+            "date": st.column_config.DateColumn("Date", required=True),
+            "time": st.column_config.TimeColumn("Time", required=True, format="HH:mm"),
+            "palace": st.column_config.SelectboxColumn(
+                "Topic", options=list(PALACE_TOPICS.keys()), required=True,
+                help=" | ".join(f"{p}: {t['topic']}" for p, t in PALACE_TOPICS.items())
+            ),
+            "birth_date": st.column_config.DateColumn("Birth date (optional)"),
+            "birth_hour": st.column_config.NumberColumn("Birth hour", min_value=0, max_value=23, step=1)
+        },
+        key="report_jobs_editor"
+    )
+    
+    report_cols = st.columns(3)
+    with report_cols[0]:
+        report_format = st.selectbox(
+            "Format",
+            options=list(REPORT_FORMATS.keys()),
+            format_func=lambda f: REPORT_FORMATS[f]["label"],
+            key="report_format"
+        )
+    with report_cols[1]:
+        report_method = st.radio(
+            "Method",
+            options=[1, 2],
+            format_func=lambda x: "拆補 Chai Bu" if x == 1 else "置閏 Zhi Run",
+            key="report_method"
+        )
+    with report_cols[2]:
+        report_workers = st.number_input("Worker processes", min_value=1, max_value=16,
+                                         value=DEFAULT_WORKERS, step=1)
+    
+    jobs = []
+    for row in edited_jobs.to_dict("records"):
+        if not row.get("client") or pd.isna(row.get("date")) or pd.isna(row.get("time")):
+            continue
+        profile = None
+        if not pd.isna(row.get("birth_date")):
+            birth = row["birth_date"]
+            birth_hour = 12 if pd.isna(row.get("birth_hour")) else int(row["birth_hour"])
+            profile = get_bazi_profile(birth.year, birth.month, birth.day, birth_hour)
+        when = datetime.combine(row["date"], row["time"]).replace(tzinfo=SGT)
+        jobs.append(ReportJob(row["client"], when, int(row["palace"] or 5), profile, report_method))
+    
+    st.caption(f"{len(jobs)} reports ready")
+    
+    if jobs and st.button("⚙️ Build Reports", use_container_width=True):
+        report_progress = st.progress(0.0, text="Rendering reports...")
+        reports = build_reports(
+            jobs, report_format, workers=int(report_workers),
+            progress=lambda done, total: report_progress.progress(
+                done / total, text=f"Rendered {done}/{total} reports")
+        )
+        
+        report_zip = tempfile.TemporaryFile()
+        write_reports_zip(reports, report_zip)
+        report_zip.seek(0)
+        
+        st.download_button(
+            label=f"📥 Download {len(reports)} {REPORT_FORMATS[report_format]['label']} Reports (ZIP)",
+            data=report_zip,
+            file_name=f"ming_qimen_reports_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+            mime="application/zip",
+            type="primary",
+            use_container_width=True
+        )
+
 with tab2:
     st.subheader("❓ How to Use Export Data")
     
@@ -213,11 +381,11 @@ with tab2:
     
     | Section | Contents |
     |---------|----------|
-    | `metadata` | Date, time, method, analysis type |
-    | `qmdj_data` | Palace, components, formations |
+    | `metadata` | Date, time, method, analysis type, chart and reading ids |
+    | `qmdj_data` | Palace, chart structure, components, formations |
     | `bazi_data` | Day Master, useful gods, structures |
     | `synthesis` | Scores (1-10), verdict, action |
-    | `tracking` | CSV row, outcome status |
+    | `tracking` | Chart and reading ids, outcome status |
     
     ### Workflow
     
@@ -239,7 +407,7 @@ with tab2:
         },
         "qmdj_data": {
             "palace_analyzed": {"name": "Qian", "number": 6},
-            "components": {"door": "Open", "star": "Heart"}
+            "components": {"door": {"name": "Open"}, "star": {"name": "Heart"}}
         },
         "bazi_data": {
             "day_master": {"stem": "Geng 庚", "strength": "Weak"}
@@ -247,7 +415,7 @@ with tab2:
         "synthesis": {
             "qmdj_score": 7,
             "bazi_alignment_score": 8,
-            "verdict": "AUSPICIOUS"
+            "verdict": "Favorable"
         }
     }
     
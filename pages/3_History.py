@@ -4,7 +4,23 @@ Ming Qimen 明奇门 - History Page v2.0
 
 import streamlit as st
 from datetime import datetime, timedelta, timezone
-import json
+import tempfile
+import sys
+import os
+
+# Add core module to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bulk_export import (
+    export_rows,
+    iter_history_rows,
+    EXPORT_FORMATS,
+    HISTORY_FIELDS
+)
+from core.history_store import get_history_store, import_history
+
+# Readings listed on the page (exports and stats cover the whole history)
+RECENT_LIMIT = 200
 
 st.set_page_config(
     page_title="History | Ming Qimen",
@@ -30,36 +46,69 @@ st.markdown("View your past readings")
 if 'analyses' not in st.session_state:
     st.session_state.analyses = []
 
-if st.session_state.analyses:
+# Persistent history when MING_QIMEN_HISTORY_DB is set, else this session's
+history_store = get_history_store()
+
+
+def add_to_session(entries):
+    """Import sink for session history: same (reading_id, date) rule as the Chart page"""
+    seen = {(a.get("reading_id"), a.get("date")) for a in st.session_state.analyses}
+    added = 0
+    for entry in entries:
+        key = (entry["reading_id"], entry["date"])
+        if key not in seen:
+            seen.add(key)
+            st.session_state.analyses.append(entry)
+            added += 1
+    return added
+
+
+def iter_all_entries():
+    if history_store is not None:
+        return history_store.iter_entries()
+    return iter(st.session_state.analyses)
+
+
+if history_store is not None:
+    summary = history_store.summary()
+    recent = list(history_store.iter_entries(limit=RECENT_LIMIT))
+else:
     analyses = st.session_state.analyses
-    
-    st.markdown(f"### Total Readings: {len(analyses)}")
+    scores = [a.get('score', 5) for a in analyses if a.get('score')]
+    topics = [a.get('topic', 'Unknown') for a in analyses]
+    summary = {
+        "total": len(analyses),
+        "average_score": sum(scores) / len(scores) if scores else None,
+        "favorable": len([s for s in scores if s >= 6]),
+        "scored": len(scores),
+        "top_topic": max(set(topics), key=topics.count) if topics else None
+    }
+    recent = list(reversed(analyses))[:RECENT_LIMIT]
+
+if summary["total"]:
+    st.markdown(f"### Total Readings: {summary['total']}")
     
     # Summary stats
     col1, col2, col3 = st.columns(3)
     
-    scores = [a.get('score', 5) for a in analyses if a.get('score')]
-    
     with col1:
-        if scores:
-            avg_score = sum(scores) / len(scores)
-            st.metric("Average Score", f"{avg_score:.1f}/10")
+        if summary["average_score"] is not None:
+            st.metric("Average Score", f"{summary['average_score']:.1f}/10")
     
     with col2:
-        favorable = len([s for s in scores if s >= 6])
-        st.metric("Favorable Readings", f"{favorable}/{len(scores)}")
+        st.metric("Favorable Readings", f"{summary['favorable']}/{summary['scored']}")
     
     with col3:
-        topics = [a.get('topic', 'Unknown') for a in analyses]
-        most_common = max(set(topics), key=topics.count) if topics else "N/A"
-        st.metric("Most Queried Topic", most_common)
+        st.metric("Most Queried Topic", summary["top_topic"] or "N/A")
     
     st.markdown("---")
     
     # History list
     st.markdown("### Recent Readings")
+    if summary["total"] > len(recent):
+        st.caption(f"Showing the latest {len(recent)} of {summary['total']}")
     
-    for i, analysis in enumerate(reversed(analyses)):
+    for i, analysis in enumerate(recent):
         score = analysis.get('score', 5)
         
         if score >= 6:
@@ -81,21 +130,46 @@ if st.session_state.analyses:
     st.markdown("---")
     
     # Actions
+    st.markdown("### 📥 Export History")
+    
+    export_format = st.selectbox(
+        "Format",
+        options=list(EXPORT_FORMATS.keys()),
+        format_func=lambda f: EXPORT_FORMATS[f]["label"],
+        key="history_export_format"
+    )
+    fmt_info = EXPORT_FORMATS[export_format]
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        json_str = json.dumps(analyses, indent=2, ensure_ascii=False, default=str)
-        st.download_button(
-            "📥 Export History (JSON)",
-            data=json_str,
-            file_name=f"ming_qimen_history_{get_singapore_time().strftime('%Y%m%d')}.json",
-            mime="application/json",
-            use_container_width=True
-        )
+        # Export only on request, not on every rerun of the page
+        if st.button(f"⚙️ Prepare Export ({fmt_info['label']})", use_container_width=True):
+            with tempfile.TemporaryFile() as export_file:
+                with st.spinner("Streaming export..."):
+                    export_rows(
+                        iter_history_rows(iter_all_entries()),
+                        export_format,
+                        export_file,
+                        fields=HISTORY_FIELDS,
+                        sheet_title="History"
+                    )
+                    export_file.seek(0)
+                
+                st.download_button(
+                    f"📥 Download History ({fmt_info['label']})",
+                    data=export_file,
+                    file_name=f"ming_qimen_history_{get_singapore_time().strftime('%Y%m%d')}.{fmt_info['extension']}",
+                    mime=fmt_info["mime"],
+                    type="primary",
+                    use_container_width=True
+                )
     
     with col2:
         if st.button("🗑️ Clear History", use_container_width=True):
             st.session_state.analyses = []
+            if history_store is not None:
+                history_store.clear()
             st.rerun()
 
 else:
@@ -104,5 +178,51 @@ else:
     if st.button("📊 Go to Chart", use_container_width=True):
         st.switch_page("pages/1_Chart.py")
 
+st.markdown("---")
+
+# Import
+st.markdown("### 📤 Import History")
+st.caption("History or reading exports (NDJSON / JSON), Universal Schema v2.0 documents "
+           "and audit log segments (.ndjson.gz). Readings already in history are skipped.")
+
+uploaded = st.file_uploader(
+    "Export file",
+    type=["json", "ndjson", "gz"],
+    key="history_import_file"
+)
+
+if uploaded is not None and st.button("📤 Import", use_container_width=True):
+    progress_bar = st.progress(0.0, text="Importing...")
+    
+    def show_progress(report, consumed):
+        fraction = min(consumed / uploaded.size, 1.0) if uploaded.size else 1.0
+        progress_bar.progress(
+            fraction,
+            text=f"{report.imported} imported, {report.duplicates} duplicates, {report.invalid} invalid"
+        )
+    
+    if history_store is not None:
+        sink = lambda entries: history_store.add_many(entries, "import")
+    else:
+        sink = add_to_session
+    
+    try:
+        report = import_history(uploaded, sink, progress=show_progress)
+    except Exception as e:
+        progress_bar.empty()
+        st.error(f"Import failed: {e}")
+    else:
+        progress_bar.progress(1.0, text="Import complete")
+        st.success(f"✅ Imported {report.imported} of {report.records} records "
+                   f"({report.duplicates} duplicates, {report.invalid} invalid)")
+        if report.errors:
+            with st.expander(f"⚠️ {report.invalid} records skipped"):
+                for error in report.errors:
+                    st.markdown(f"- {error}")
+                if report.invalid > len(report.errors):
+                    st.caption(f"...and {report.invalid - len(report.errors)} more")
+        if report.imported:
+            st.button("🔄 Refresh")
+
 st.markdown("---")
 st.caption("🌟 Ming Qimen 明奇门 | History v2.0")
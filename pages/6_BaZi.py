@@ -10,6 +10,13 @@ Features:
 
 import streamlit as st
 from datetime import datetime, date
+import sys
+import os
+
+# Add core module to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sexagenary_calendar import four_pillars
 
 # ============================================================
 # CONSTANTS
@@ -127,140 +134,15 @@ PROFILE_TYPES = {
     "Rob Wealth": "Competitor 劫财格"
 }
 
-# Hour branch mapping (using Chinese double-hour system)
-HOUR_BRANCHES = {
-    (23, 1): "Zi 子",
-    (1, 3): "Chou 丑",
-    (3, 5): "Yin 寅",
-    (5, 7): "Mao 卯",
-    (7, 9): "Chen 辰",
-    (9, 11): "Si 巳",
-    (11, 13): "Wu 午",
-    (13, 15): "Wei 未",
-    (15, 17): "Shen 申",
-    (17, 19): "You 酉",
-    (19, 21): "Xu 戌",
-    (21, 23): "Hai 亥"
-}
-
-# Simplified Solar Terms (approximate dates for month pillar)
-SOLAR_TERMS = [
-    (2, 4),   # Li Chun - Start of Yin month
-    (3, 6),   # Jing Zhe - Start of Mao month
-    (4, 5),   # Qing Ming - Start of Chen month
-    (5, 6),   # Li Xia - Start of Si month
-    (6, 6),   # Mang Zhong - Start of Wu month
-    (7, 7),   # Xiao Shu - Start of Wei month
-    (8, 8),   # Li Qiu - Start of Shen month
-    (9, 8),   # Bai Lu - Start of You month
-    (10, 8),  # Han Lu - Start of Xu month
-    (11, 7),  # Li Dong - Start of Hai month
-    (12, 7),  # Da Xue - Start of Zi month
-    (1, 6),   # Xiao Han - Start of Chou month
-]
-
-
 # ============================================================
 # CALCULATION FUNCTIONS
 # ============================================================
 
-def get_stem_index(stem_str):
-    """Get index of stem (0-9)"""
-    for i, s in enumerate(STEMS):
-        if stem_str in s or s.split()[0] == stem_str:
-            return i
-    return 0
-
-def get_branch_index(branch_str):
-    """Get index of branch (0-11)"""
-    for i, b in enumerate(BRANCHES):
-        if branch_str in b or b.split()[0] == branch_str:
-            return i
-    return 0
-
-def calculate_year_pillar(year):
-    """Calculate Year Pillar stem and branch"""
-    # Year stem: (year - 4) % 10
-    stem_index = (year - 4) % 10
-    # Year branch: (year - 4) % 12
-    branch_index = (year - 4) % 12
-    return STEMS[stem_index], BRANCHES[branch_index]
-
-def calculate_month_pillar(year, month, day):
-    """Calculate Month Pillar using solar terms"""
-    # Determine solar month (Yin = 0, Mao = 1, etc.)
-    solar_month = month - 2  # Default
-    
-    # Check if before or after solar term for the month
-    for i, (term_month, term_day) in enumerate(SOLAR_TERMS):
-        if month == term_month and day < term_day:
-            solar_month = (i - 1) % 12
-            break
-        elif month == term_month and day >= term_day:
-            solar_month = i
-            break
-    
-    # Adjust for Yin as first month
-    solar_month = (month - 2) % 12
-    if day < SOLAR_TERMS[solar_month % 12][1]:
-        solar_month = (solar_month - 1) % 12
-    
-    # Month branch
-    branch_index = (solar_month + 2) % 12  # Yin = index 2
-    
-    # Month stem depends on year stem
-    year_stem, _ = calculate_year_pillar(year)
-    year_stem_index = get_stem_index(year_stem)
-    
-    # Formula: (year_stem_index % 5) * 2 + solar_month + 2
-    stem_index = ((year_stem_index % 5) * 2 + solar_month + 2) % 10
-    
-    return STEMS[stem_index], BRANCHES[branch_index]
-
-def calculate_day_pillar(year, month, day):
-    """Calculate Day Pillar using simplified formula"""
-    # Reference date: Jan 1, 1900 was Jia Chen (stem=0, branch=4)
-    from datetime import date as dt
-    ref_date = dt(1900, 1, 1)
-    target_date = dt(year, month, day)
-    days_diff = (target_date - ref_date).days
-    
-    # Jan 1, 1900 = Jia Chen (stem 0, branch 4)
-    stem_index = (days_diff + 0) % 10
-    branch_index = (days_diff + 4) % 12
-    
-    return STEMS[stem_index], BRANCHES[branch_index]
-
-def calculate_hour_pillar(day_stem, hour, minute=0):
-    """Calculate Hour Pillar from day stem and birth hour"""
-    if hour is None:
+def pillar_names(gz):
+    """(stem, branch) display names of a sixty-cycle code, or (None, None)"""
+    if gz is None:
         return None, None
-    
-    # Adjust for minute (if >= 30 min, could affect boundary hours)
-    adjusted_hour = hour
-    
-    # Get hour branch
-    hour_branch = None
-    for (start, end), branch in HOUR_BRANCHES.items():
-        if start == 23:
-            if hour >= 23 or hour < end:
-                hour_branch = branch
-                break
-        elif start <= hour < end:
-            hour_branch = branch
-            break
-    
-    if not hour_branch:
-        hour_branch = BRANCHES[0]  # Default to Zi
-    
-    # Hour stem depends on day stem
-    day_stem_index = get_stem_index(day_stem)
-    hour_branch_index = get_branch_index(hour_branch)
-    
-    # Formula: (day_stem_index % 5) * 2 + hour_branch_index
-    stem_index = ((day_stem_index % 5) * 2 + hour_branch_index) % 10
-    
-    return STEMS[stem_index], hour_branch
+    return STEMS[gz % 10], BRANCHES[gz % 12]
 
 def get_ten_god(dm_element, dm_polarity, target_element, target_polarity):
     """Get Ten God relationship"""
@@ -494,15 +376,13 @@ if st.button("🔮 Calculate BaZi", type="primary", use_container_width=True):
         month = birth_date.month
         day = birth_date.day
         
-        # Calculate pillars
-        year_stem, year_branch = calculate_year_pillar(year)
-        month_stem, month_branch = calculate_month_pillar(year, month, day)
-        day_stem, day_branch = calculate_day_pillar(year, month, day)
-        
-        if not unknown_time:
-            hour_stem, hour_branch = calculate_hour_pillar(day_stem, birth_hour, birth_minute)
-        else:
-            hour_stem, hour_branch = None, None
+        # Calculate pillars (23:00 stays on the birth day, as in the BaZi engine)
+        codes = four_pillars(year, month, day, None if unknown_time else birth_hour,
+                             late_zi_next_day=False)
+        year_stem, year_branch = pillar_names(codes.year)
+        month_stem, month_branch = pillar_names(codes.month)
+        day_stem, day_branch = pillar_names(codes.day)
+        hour_stem, hour_branch = pillar_names(codes.hour)
         
         # Store pillars
         pillars = {
@@ -0,0 +1,183 @@
+"""
+Ming Qimen 明奇门 - Planner Page v1.0
+Best shichen and palace for each day of a month
+"""
+
+import streamlit as st
+from datetime import datetime, timedelta, timezone
+import calendar
+import sys
+import os
+
+# Add core module to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.qmdj_engine import PALACE_INFO, PALACE_TOPICS
+from core.month_planner import get_shared_planner
+
+st.set_page_config(
+    page_title="Planner | Ming Qimen",
+    page_icon="🗓️",
+    layout="wide"
+)
+
+SGT = timezone(timedelta(hours=8))
+
+# Days computed per "show more" step
+DAYS_PER_PAGE = 7
+
+def get_singapore_time():
+    return datetime.now(SGT)
+
+# Load CSS
+try:
+    with open("assets/style.css") as f:
+        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+except:
+    pass
+
+# ============================================================================
+# SESSION STATE
+# ============================================================================
+
+if 'planner_days_shown' not in st.session_state:
+    st.session_state.planner_days_shown = DAYS_PER_PAGE
+
+if 'planner_view' not in st.session_state:
+    st.session_state.planner_view = None
+
+# ============================================================================
+# PAGE HEADER
+# ============================================================================
+
+st.title("🗓️ Planner 择日")
+st.markdown("*The best time and direction for each day of the month*")
+
+# ============================================================================
+# INPUT SECTION
+# ============================================================================
+
+today = get_singapore_time().date()
+
+col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+
+with col1:
+    year = st.number_input("Year 年", min_value=1901, max_value=2099, value=today.year, step=1)
+
+with col2:
+    month = st.selectbox(
+        "Month 月",
+        options=list(range(1, 13)),
+        index=today.month - 1,
+        format_func=lambda m: calendar.month_name[m]
+    )
+
+with col3:
+    topic_options = [None] + list(PALACE_TOPICS.keys())
+    topic_palace = st.selectbox(
+        "Topic 主題",
+        options=topic_options,
+        format_func=lambda p: "🧭 Any topic (best palace)" if p is None
+            else f"{PALACE_TOPICS[p]['icon']} {PALACE_TOPICS[p]['topic']}"
+    )
+
+with col4:
+    method = st.selectbox(
+        "Method",
+        options=[1, 2],
+        format_func=lambda m: "Chai Bu 拆補" if m == 1 else "Zhi Run 置閏"
+    )
+
+profile = st.session_state.get("user_profile")
+use_profile = False
+if profile:
+    use_profile = st.checkbox(
+        f"👤 Include my BaZi profile ({profile.get('day_master', '')})",
+        value=True,
+        help="Blend the QMDJ score with your BaZi alignment score"
+    )
+
+# Start from the first week again whenever the view changes
+view = (year, month, topic_palace, method, use_profile)
+if st.session_state.planner_view != view:
+    st.session_state.planner_view = view
+    st.session_state.planner_days_shown = DAYS_PER_PAGE
+
+st.markdown("---")
+
+# ============================================================================
+# CALENDAR
+# ============================================================================
+
+planner = get_shared_planner(method)
+days_in_month = calendar.monthrange(year, month)[1]
+days_shown = min(st.session_state.planner_days_shown, days_in_month)
+
+# Only the visible days are evaluated; finished days stay cached in the planner
+plans = list(planner.iter_month(
+    year, month,
+    topic_palace=topic_palace,
+    profile=profile if use_profile else None,
+    days=range(1, days_shown + 1)
+))
+
+for plan in plans:
+    best = plan.best
+    palace = PALACE_INFO[best.palace]
+    topic = PALACE_TOPICS[best.palace]
+    is_today = plan.day == today
+    
+    score_color = "#4CAF50" if best.score >= 6 else "#FFC107" if best.score >= 4 else "#FF5722"
+    border = "2px solid #FFD700" if is_today else "1px solid #333"
+    
+    st.markdown(f"""
+    <div style="border: {border}; border-radius: 10px; padding: 10px 15px; margin-bottom: 8px;">
+        <div style="display: flex; justify-content: space-between; align-items: center;">
+            <div>
+                <b>{plan.day:%a %d %b}</b>
+                <span style="color: #888;"> {plan.day_ganzhi}日 • {plan.solar_term} • {plan.structure}</span>
+            </div>
+            <div style="color: {score_color}; font-weight: bold;">{best.score}/10</div>
+        </div>
+        <div style="margin-top: 4px;">
+            🕐 <b>{best.start:%H:%M}-{best.end:%H:%M}</b> {best.chinese_hour}時
+            &nbsp;•&nbsp; {topic['icon']} {topic['topic']} ({palace['chinese']} {palace['direction']})
+            &nbsp;•&nbsp; {best.verdict}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if plan.alternatives:
+        with st.expander("Other good windows", expanded=False):
+            for alt in plan.alternatives:
+                alt_topic = PALACE_TOPICS[alt.palace]
+                line = (f"{alt.start:%H:%M}-{alt.end:%H:%M} {alt.chinese_hour}時 • "
+                        f"{alt_topic['icon']} {alt_topic['topic']} • {alt.score}/10")
+                if alt.alignment_score is not None:
+                    line += f" (QMDJ {alt.qmdj_score}, BaZi {alt.alignment_score})"
+                st.markdown(line)
+
+if days_shown < days_in_month:
+    if st.button(f"⬇️ Show next {min(DAYS_PER_PAGE, days_in_month - days_shown)} days",
+                 use_container_width=True):
+        st.session_state.planner_days_shown += DAYS_PER_PAGE
+        st.rerun()
+
+# ============================================================
+# SIDEBAR
+# ============================================================
+with st.sidebar:
+    st.markdown("---")
+    if profile:
+        st.markdown("### 👤 Your BaZi")
+        st.markdown(f"**{profile.get('day_master', '')}**")
+        if profile.get('useful_gods'):
+            st.caption(f"Useful: {', '.join(profile['useful_gods'])}")
+    else:
+        st.info("No BaZi profile set")
+        if st.button("🔮 Set Up BaZi", key="sidebar_bazi"):
+            st.switch_page("pages/6_BaZi.py")
+
+# Footer
+st.markdown("---")
+st.caption("🌟 Ming Qimen 明奇门 | Planner v1.0")